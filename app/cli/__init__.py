@@ -0,0 +1 @@
+# Command line tools built on top of the application DALs and services.
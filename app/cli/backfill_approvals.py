@@ -0,0 +1,117 @@
+import asyncio
+import logging
+import os
+import sys
+from argparse import ArgumentParser, Namespace
+from typing import List, Optional, Tuple
+
+from web3 import AsyncWeb3
+from web3.eth import AsyncEth
+from web3.types import FilterParams
+
+from app.dal.approvals.approvals_backfill_store import ApprovalsBackfillStore, BackfillRow
+from app.dal.approvals.block_range_log_fetcher import BlockRangeLogFetcher
+from app.dal.approvals.offline_approvals_index import OfflineApprovalsIndex
+from app.utils.log_decoder import APPROVAL_EVENT_TOPIC, is_erc20_approval, reduce_compact_logs, to_compact_log
+
+logger = logging.getLogger(__name__)
+
+
+def get_block_ranges(from_block: int, to_block: int, range_size: int) -> List[Tuple[int, int]]:
+    return [(start, min(start + range_size - 1, to_block)) for start in range(from_block, to_block + 1, range_size)]
+
+
+def to_backfill_rows(logs) -> List[BackfillRow]:
+    latest = reduce_compact_logs(to_compact_log(log) for log in logs if is_erc20_approval(log))
+    return [
+        (owner_topic[12:], bytes.fromhex(token_address[2:]), spender_topic[12:], block_number, log_index or 0,
+         transaction_hash, data)
+        for block_number, log_index, transaction_hash, token_address, owner_topic, spender_topic, data
+        in latest.values()
+    ]
+
+
+async def backfill(w3: AsyncWeb3, store: ApprovalsBackfillStore, from_block: int, to_block: int, range_size: int,
+                   workers: int, shard_size: int) -> int:
+    """
+    Ingests every Approval log in [from_block, to_block] into `store` with `workers` concurrent range workers.
+    Ranges recorded by an earlier run are skipped. Returns the number of ranges ingested.
+    """
+    completed = store.completed_ranges()
+    pending = [block_range for block_range in get_block_ranges(from_block, to_block, range_size)
+               if block_range not in completed]
+    logger.info(f"Backfilling {len(pending)} ranges of {range_size} blocks ({len(completed)} already done)")
+    # Each range is fetched in shards that are bisected when the provider caps the number of results
+    fetcher = BlockRangeLogFetcher(lambda filter_params: w3.eth.get_logs(filter_params), shard_size=shard_size,
+                                   concurrency_limit=1, logger=logger)
+    filter_params: FilterParams = {"topics": [APPROVAL_EVENT_TOPIC]}
+    ranges = iter(pending)
+    done = 0
+
+    async def worker():
+        nonlocal done
+        for range_from, range_to in ranges:
+            logs = await fetcher.fetch(filter_params, range_from, range_to)
+            rows = to_backfill_rows(logs)
+            await asyncio.to_thread(store.save_range, range_from, range_to, rows)
+            done += 1
+            logger.info(f"Ingested blocks {range_from}-{range_to}: {len(logs)} logs, {len(rows)} approvals "
+                        f"({done}/{len(pending)})")
+
+    await asyncio.gather(*(worker() for _ in range(max(1, workers))))
+    return done
+
+
+def get_args() -> Namespace:
+    parser: ArgumentParser = ArgumentParser(
+        description="Backfill every ERC-20 Approval event into an offline approvals index."
+    )
+    parser.add_argument('--rpc-url', default=os.environ.get("ETH_RPC_URL"),
+                        help='JSON-RPC endpoint (default: $ETH_RPC_URL, else Infura with $INFURA_API_KEY)')
+    parser.add_argument('--from-block', type=int, default=0)
+    parser.add_argument('--to-block', type=int, help='Last block to ingest (default: head minus --confirmations)')
+    parser.add_argument('--confirmations', type=int, default=12)
+    parser.add_argument('--range-size', type=int, default=10_000, help='Blocks per checkpointed range')
+    parser.add_argument('--shard-size', type=int, default=2_000, help='Blocks per eth_getLogs call before bisection')
+    parser.add_argument('--workers', type=int, default=8, help='Concurrent range workers')
+    parser.add_argument('--state-db', default='approvals_backfill.sqlite3',
+                        help='SQLite staging database, also used to resume an interrupted backfill')
+    parser.add_argument('--output', default='approvals_index.bin', help='Offline index file to write')
+    parser.add_argument('--skip-build', action='store_true', help='Only ingest, do not write the index')
+    parser.add_argument('--build-only', action='store_true', help='Only write the index from the staging database')
+    return parser.parse_args()
+
+
+def get_provider(rpc_url: Optional[str]) -> AsyncWeb3:
+    if not rpc_url:
+        api_key = os.environ.get("INFURA_API_KEY")
+        if not api_key:
+            sys.exit("Exiting - pass --rpc-url or set ETH_RPC_URL or INFURA_API_KEY.")
+        rpc_url = f"https://mainnet.infura.io/v3/{api_key}"
+    return AsyncWeb3(AsyncWeb3.AsyncHTTPProvider(rpc_url), modules={"eth": (AsyncEth,)})
+
+
+async def run(args: Namespace) -> None:
+    store = ApprovalsBackfillStore(args.state_db)
+    if not args.build_only:
+        w3 = get_provider(args.rpc_url)
+        to_block = args.to_block if args.to_block is not None else await w3.eth.block_number - args.confirmations
+        await backfill(w3, store, args.from_block, to_block, args.range_size, args.workers, args.shard_size)
+    if args.skip_build:
+        return
+    # Only a gap-free prefix of ranges is advertised as indexed
+    indexed_to = store.contiguous_to_block(args.from_block)
+    if indexed_to is None:
+        sys.exit(f"Nothing ingested from block {args.from_block} yet.")
+    rows = store.iter_rows(args.from_block, indexed_to)
+    count = OfflineApprovalsIndex.build(args.output, rows, args.from_block, indexed_to)
+    print(f"Wrote {count} approvals indexed from block {args.from_block} to {indexed_to} to {args.output}")
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    asyncio.run(run(get_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+import csv
+import json
+import os
+import sys
+from argparse import ArgumentParser, Namespace
+from typing import Iterator, Optional, Tuple
+
+from app.dal.token_metadata.token_registry import TokenRegistry
+
+TokenRow = Tuple[str, str, Optional[int]]
+
+
+def read_token_list(path: str, chain_id: int) -> Iterator[TokenRow]:
+    """Reads a Uniswap-style token list (JSON with a `tokens` array) or a CSV with address,symbol,decimals columns."""
+    if path.endswith(".csv"):
+        with open(path, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                decimals = row.get("decimals")
+                yield row["address"], row["symbol"], int(decimals) if decimals not in (None, "") else None
+        return
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    for token in data["tokens"] if isinstance(data, dict) else data:
+        if token.get("chainId", chain_id) != chain_id:
+            continue
+        yield token["address"], token["symbol"], token.get("decimals")
+
+
+def get_args() -> Namespace:
+    parser: ArgumentParser = ArgumentParser(
+        description="Build the on-disk token metadata registry used for symbol lookups."
+    )
+    parser.add_argument('--input', required=True, action='append',
+                        help='Token list JSON or CSV file (can be repeated)')
+    parser.add_argument('--output', required=True, help='Registry file to write')
+    parser.add_argument('--chain-id', type=int, default=1, help='Only keep tokens of this chain (default: 1)')
+    parser.add_argument('--no-merge', action='store_true',
+                        help='Do not keep the entries of an existing registry at --output')
+    return parser.parse_args()
+
+
+def main():
+    args: Namespace = get_args()
+
+    tokens = {}
+    if not args.no_merge and os.path.exists(args.output):
+        existing = TokenRegistry(args.output)
+        for address, metadata in existing.items():
+            tokens[address.lower()] = (address, metadata.symbol, metadata.decimals)
+        existing.close()
+
+    for path in args.input:
+        try:
+            for address, symbol, decimals in read_token_list(path, args.chain_id):
+                tokens[address.lower()] = (address, symbol, decimals)
+        except (OSError, KeyError, ValueError) as e:
+            sys.exit(f"Error reading token list {path}: {e}")
+
+    count = TokenRegistry.build(args.output, tokens.values())
+    print(f"Wrote {count} tokens to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,296 @@
+import asyncio
+import csv
+import io
+import logging
+import os
+import sys
+import time
+from argparse import ArgumentParser, Namespace
+from typing import Final, IO, Iterable, Iterator, List, Optional, Set
+
+from app.dal.cache.shared_cache import close_cache_backend
+from app.dal.token_price.coingecko_token_price_dal import CoingeckoTokenPriceDAL
+from app.models.approvals.approvals import Approval
+from app.models.approvals.approvals_request import ApprovalsRequest
+from app.models.approvals.approvals_stream_event import ApprovalsStreamEvent
+from app.services.approvals_service import ApprovalsService
+from app.services.approvals_service_base import ApprovalsServiceBase
+from app.utils.approvals_json import encode_stream_event
+from app.utils.config_loader import config
+from app.utils.fair_scheduler import BATCH
+from app.utils.log_decoder import shutdown_process_pool
+
+FORMATS: Final = ("ndjson", "csv", "parquet")
+CSV_COLUMNS: Final = ("address", "token_symbol", "spender_address", "amount", "price_usd", "price_age_seconds",
+                      "error")
+
+logger = logging.getLogger(__name__)
+
+
+def read_addresses(lines: Iterable[str]) -> Iterator[str]:
+    """One address per line; blank lines, `#` comments and repeated addresses are skipped."""
+    seen: Set[str] = set()
+    for line in lines:
+        address = line.split("#", 1)[0].strip()
+        if address and address.lower() not in seen:
+            seen.add(address.lower())
+            yield address
+
+
+def read_done_addresses(path: str) -> Set[str]:
+    if not os.path.exists(path):
+        return set()
+    with open(path, encoding="utf-8") as f:
+        return {line.strip().lower() for line in f if line.strip()}
+
+
+def chunked(addresses: Iterable[str], size: int) -> Iterator[List[str]]:
+    chunk: List[str] = []
+    for address in addresses:
+        chunk.append(address)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def to_rows(event: ApprovalsStreamEvent) -> Iterator[tuple]:
+    """Flat rows of one address: one per approval, or a single row carrying the error."""
+    approvals: List[Approval] = event.approvals
+    for approval in approvals:
+        yield (event.address, approval.token_symbol, approval.spender_address, approval.amount, approval.price_usd,
+               approval.price_age_seconds, None)
+    if event.error is not None:
+        yield event.address, None, None, None, None, None, event.error
+
+
+class NdjsonWriter:
+    """One JSON object per address, in the same shape as the events of `/get_approvals/stream`."""
+
+    def __init__(self, stream: IO[bytes], include_prices: bool):
+        self._stream = stream
+        self._include_prices = include_prices
+
+    def write(self, events: List[ApprovalsStreamEvent]) -> None:
+        self._stream.write(b"".join(encode_stream_event(event, self._include_prices) + b"\n" for event in events))
+        self._stream.flush()
+
+    def close(self) -> None:
+        self._stream.close()
+
+
+class CsvWriter:
+    """One row per approval; addresses without approvals get no row unless they failed."""
+
+    def __init__(self, stream: IO[bytes], include_prices: bool, write_header: bool):
+        self._stream = stream
+        self._text = io.TextIOWrapper(stream, encoding="utf-8", newline="", write_through=True)
+        self._writer = csv.writer(self._text)
+        self._include_prices = include_prices
+        if write_header:
+            self._writer.writerow(self._columns(CSV_COLUMNS))
+
+    def _columns(self, row: tuple) -> tuple:
+        return row if self._include_prices else row[:4] + row[6:]
+
+    def write(self, events: List[ApprovalsStreamEvent]) -> None:
+        self._writer.writerows(self._columns(row) for event in events for row in to_rows(event))
+        self._text.flush()
+
+    def close(self) -> None:
+        self._text.close()
+
+
+class ParquetWriter:
+    """Same columns as the CSV output, one row group per written chunk. Needs the optional `pyarrow` package."""
+
+    def __init__(self, path: str, include_prices: bool):
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            sys.exit("Exiting - Parquet output needs pyarrow: pip install pyarrow")
+        self._pyarrow = pyarrow
+        self._include_prices = include_prices
+        fields = [pyarrow.field(name, pyarrow.string()) for name in CSV_COLUMNS[:4]]
+        if include_prices:
+            fields += [pyarrow.field(name, pyarrow.float64()) for name in CSV_COLUMNS[4:6]]
+        fields.append(pyarrow.field("error", pyarrow.string()))
+        self._schema = pyarrow.schema(fields)
+        self._writer = pyarrow.parquet.ParquetWriter(path, self._schema)
+
+    def write(self, events: List[ApprovalsStreamEvent]) -> None:
+        rows = [row if self._include_prices else row[:4] + row[6:] for event in events for row in to_rows(event)]
+        if not rows:
+            return
+        columns = list(zip(*rows))
+        self._writer.write_table(self._pyarrow.Table.from_arrays(
+            [self._pyarrow.array(column, type=field.type) for column, field in zip(columns, self._schema)],
+            schema=self._schema
+        ))
+
+    def close(self) -> None:
+        self._writer.close()
+
+
+def get_format(output: Optional[str], output_format: Optional[str]) -> str:
+    if output_format:
+        return output_format
+    extension = os.path.splitext(output or "")[1].lstrip(".").lower()
+    return {"csv": "csv", "parquet": "parquet", "pq": "parquet"}.get(extension, "ndjson")
+
+
+def get_parquet_part_path(output: str) -> str:
+    """Parquet files cannot be appended to, so a resumed run writes the next `<name>.<n>.parquet` part."""
+    root, extension = os.path.splitext(output)
+    if not os.path.exists(output):
+        return output
+    part = 1
+    while os.path.exists(f"{root}.{part}{extension}"):
+        part += 1
+    return f"{root}.{part}{extension}"
+
+
+def open_writer(output: Optional[str], output_format: str, include_prices: bool, resume: bool):
+    if output_format == "parquet":
+        if not output:
+            sys.exit("Exiting - Parquet output needs --output.")
+        return ParquetWriter(get_parquet_part_path(output) if resume else output, include_prices)
+    appending = resume and output is not None and os.path.exists(output) and os.path.getsize(output) > 0
+    stream = open(output, "ab" if resume else "wb") if output else os.fdopen(os.dup(sys.stdout.fileno()), "wb")
+    if output_format == "csv":
+        return CsvWriter(stream, include_prices, write_header=not appending)
+    return NdjsonWriter(stream, include_prices)
+
+
+class Progress:
+    """Periodic one-line progress report on stderr."""
+
+    def __init__(self, total: int, interval: float, stream: IO[str] = sys.stderr, clock=time.monotonic):
+        self.total = total
+        self.done = 0
+        self.approvals = 0
+        self.errors = 0
+        self._interval = interval
+        self._stream = stream
+        self._clock = clock
+        self._started = clock()
+        self._reported = self._started
+
+    def update(self, events: List[ApprovalsStreamEvent]) -> None:
+        self.done += len(events)
+        self.approvals += sum(len(event.approvals) for event in events)
+        self.errors += sum(event.error is not None for event in events)
+        if self._clock() - self._reported >= self._interval:
+            self.report()
+
+    def report(self) -> None:
+        now = self._clock()
+        self._reported = now
+        rate = self.done / max(now - self._started, 1e-9)
+        remaining = (self.total - self.done) / rate if rate else float("inf")
+        self._stream.write(f"{self.done}/{self.total} addresses, {self.approvals} approvals, {self.errors} errors, "
+                           f"{rate:.1f} addresses/s, ~{remaining:.0f}s left\n")
+        self._stream.flush()
+
+
+async def scan(service: ApprovalsServiceBase, addresses: List[str], writer, done_file: Optional[IO[str]],
+               progress: Progress, include_prices: bool, batch_size: int, concurrency: int) -> None:
+    """
+    Looks up `addresses` in chunks of `batch_size`, with `concurrency` chunks in flight so each chunk gets the
+    service's batched log prefetch. A chunk is written as soon as it finishes, in completion order, and only then
+    recorded in `done_file`, so at most `concurrency` chunks of results are held in memory. Failed addresses are
+    written with their error but not recorded, a resumed run retries them.
+    """
+    chunks = chunked(addresses, batch_size)
+
+    async def worker():
+        for chunk in chunks:
+            response = await service.get_latest_approvals(
+                ApprovalsRequest(addresses=chunk, include_prices=include_prices, priority=BATCH)
+            )
+            events = [ApprovalsStreamEvent.model_construct(address=address,
+                                                           approvals=response.approvalsByAddress.get(address, []),
+                                                           error=response.errorsByAddress.get(address))
+                      for address in chunk]
+            writer.write(events)
+            if done_file is not None:
+                done_file.writelines(f"{event.address}\n" for event in events if event.error is None)
+                done_file.flush()
+            progress.update(events)
+
+    await asyncio.gather(*(worker() for _ in range(max(1, concurrency))))
+
+
+def get_args() -> Namespace:
+    parser: ArgumentParser = ArgumentParser(
+        description="Scan the latest ERC-20 approvals of many addresses and stream them as NDJSON, CSV or Parquet."
+    )
+    parser.add_argument('--input', default='-', help='File with one address per line (default: stdin)')
+    parser.add_argument('--output', help='File to write (default: stdout, not for Parquet)')
+    parser.add_argument('--format', choices=FORMATS, help='Output format (default: from the --output extension, '
+                                                          'else ndjson)')
+    parser.add_argument('--include-prices', action='store_true', help='Add USD prices of the approved tokens')
+    parser.add_argument('--batch-size', type=int, default=50, help='Addresses per service call (default: 50)')
+    parser.add_argument('--concurrency', type=int, default=4, help='Service calls in flight (default: 4)')
+    parser.add_argument('--state', help='File recording finished addresses (default: <output>.done)')
+    parser.add_argument('--resume', action='store_true',
+                        help='Skip addresses recorded in --state and append to --output')
+    parser.add_argument('--progress-interval', type=float, default=5.0, help='Seconds between progress lines')
+    return parser.parse_args()
+
+
+def get_service() -> ApprovalsServiceBase:
+    if config.approvals_dal == "offline":
+        from app.dal.approvals.offline_approvals_dal import OfflineApprovalsDAL
+        dal = OfflineApprovalsDAL.get_instance()
+    else:
+        # Imported here: the Infura DAL needs its API key at import time, an offline scan or --help does not
+        from app.dal.approvals.infura_approvals_dal import InfuraDAL
+        dal = InfuraDAL.get_instance()
+    return ApprovalsService.get_instance(dal, CoingeckoTokenPriceDAL.get_instance())
+
+
+async def run(args: Namespace) -> None:
+    output_format = get_format(args.output, args.format)
+    state_path = args.state or (f"{args.output}.done" if args.output else None)
+    if args.resume and not state_path:
+        sys.exit("Exiting - --resume needs --output or --state.")
+
+    if args.input == '-':
+        addresses = list(read_addresses(sys.stdin))
+    else:
+        try:
+            with open(args.input, encoding="utf-8") as f:
+                addresses = list(read_addresses(f))
+        except OSError as e:
+            sys.exit(f"Error reading addresses from {args.input}: {e}")
+    done = read_done_addresses(state_path) if args.resume and state_path else set()
+    pending = [address for address in addresses if address.lower() not in done]
+    logger.info(f"Scanning {len(pending)} addresses ({len(addresses) - len(pending)} already done)")
+
+    service = get_service()
+    writer = open_writer(args.output, output_format, args.include_prices, args.resume)
+    done_file = open(state_path, "a" if args.resume else "w", encoding="utf-8") if state_path else None
+    progress = Progress(len(pending), args.progress_interval)
+    try:
+        await scan(service, pending, writer, done_file, progress, args.include_prices, args.batch_size,
+                   args.concurrency)
+    finally:
+        writer.close()
+        if done_file is not None:
+            done_file.close()
+        progress.report()
+        await CoingeckoTokenPriceDAL.get_instance().aclose()
+        await close_cache_backend()
+        shutdown_process_pool()
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s", stream=sys.stderr)
+    asyncio.run(run(get_args()))
+
+
+if __name__ == "__main__":
+    main()
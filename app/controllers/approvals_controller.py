@@ -1,32 +1,83 @@
-from fastapi import APIRouter, HTTPException, Depends
+from typing import AsyncIterator, Optional
+
+from fastapi import APIRouter, HTTPException, Depends, Request
+from fastapi.responses import Response, StreamingResponse
 import logging
 from pydantic import ValidationError
 
-from app.dal.approvals.infura_approvals_dal import InfuraDAL
+from app.dal.approvals.approvals_dal import ApprovalsDAL
 from app.dal.token_price.coingecko_token_price_dal import CoingeckoTokenPriceDAL
 from app.models.approvals.approvals_request import ApprovalsRequest
 from app.models.approvals.approvals_response import ApprovalsResponse
+from app.services.approvals_indexer import ApprovalsIndexer
+from app.services.approvals_response_cache import ApprovalsResponseCache
 from app.services.approvals_service import ApprovalsService
 from app.services.approvals_service_base import ApprovalsServiceBase
+from app.utils.approvals_json import MEDIA_TYPE, encode_approvals_response, encode_stream_event
+from app.utils.config_loader import config
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
+def get_approvals_dal() -> ApprovalsDAL:
+    # Imported on first use: web3 and eth-abi make up most of the import time of the app
+    if config.approvals_dal == "offline":
+        from app.dal.approvals.offline_approvals_dal import OfflineApprovalsDAL
+        return OfflineApprovalsDAL.get_instance()
+    from app.dal.approvals.infura_approvals_dal import InfuraDAL
+    return InfuraDAL.get_instance()
+
 
 def get_approvals_service() -> ApprovalsServiceBase:
-    dal: InfuraDAL = InfuraDAL.get_instance()
+    dal: ApprovalsDAL = get_approvals_dal()
     token_price_dal = CoingeckoTokenPriceDAL.get_instance()
-    return ApprovalsService.get_instance(dal, token_price_dal)
+    indexer = ApprovalsIndexer.get_instance(dal) if config.approvals_indexer_enabled else None
+    return ApprovalsService.get_instance(dal, token_price_dal, indexer)
+
+
+def get_approvals_response_cache() -> Optional[ApprovalsResponseCache]:
+    return ApprovalsResponseCache.get_instance(get_approvals_dal()) if config.response_cache_enabled else None
+
+
+def apply_timeout_header(request: ApprovalsRequest, header_value: Optional[str]) -> ApprovalsRequest:
+    """The request with the tighter of its `timeout_seconds` and the X-Request-Timeout header, in seconds."""
+    if header_value is None:
+        return request
+    try:
+        timeout = float(header_value)
+    except ValueError:
+        timeout = float("nan")
+    if not timeout > 0:
+        raise HTTPException(status_code=400, detail=f"Invalid X-Request-Timeout header {header_value!r}, "
+                                                    f"expected a positive number of seconds")
+    if request.timeout_seconds is not None:
+        timeout = min(timeout, request.timeout_seconds)
+    return request.model_copy(update={"timeout_seconds": timeout})
 
 
 @router.post("/get_approvals", response_model=ApprovalsResponse)
-async def get_approvals(request: ApprovalsRequest,
-                        service: ApprovalsServiceBase = Depends(get_approvals_service)) -> ApprovalsResponse:
+async def get_approvals(request: ApprovalsRequest, http_request: Request,
+                        service: ApprovalsServiceBase = Depends(get_approvals_service),
+                        response_cache: Optional[ApprovalsResponseCache] = Depends(get_approvals_response_cache)):
+    request = apply_timeout_header(request, http_request.headers.get("x-request-timeout"))
     try:
         logger.info(f"Received get_approvals request with {len(request.addresses)} addresses")
-        response = await service.get_latest_approvals(request)
-        logger.info(f"Returning approvals response with {len(response.approvalsByAddress)} approvals")
-        return response
+        head_block = await response_cache.get_head_block() if response_cache is not None else None
+        if head_block is None:
+            response = await service.get_latest_approvals(request)
+            logger.info(f"Returning approvals response with {len(response.approvalsByAddress)} approvals")
+            # Encoded directly: the service's models are not validated a second time through response_model
+            return Response(encode_approvals_response(response, bool(request.include_prices)), media_type=MEDIA_TYPE)
+
+        key = response_cache.get_key(request)
+        etag = response_cache.get_not_modified_etag(key, http_request.headers.get("if-none-match"), head_block)
+        if etag is not None:
+            return Response(status_code=304, headers={"ETag": etag})
+        # Hits are returned as stored bytes, skipping model validation and JSON encoding
+        cached = await response_cache.get_response(key, request, head_block, service.get_latest_approvals)
+        logger.info(f"Returning approvals response pinned to block {cached.block_number}")
+        return Response(cached.body, media_type=MEDIA_TYPE,
+                        headers={"ETag": cached.etag} if cached.etag is not None else None)
 
     except (ValueError, ValidationError) as e:
         logger.warning(f"Bad request in get_approvals: {e}", exc_info=True)
@@ -34,3 +85,27 @@ async def get_approvals(request: ApprovalsRequest,
     except Exception as e:
         logger.error(f"Error in get_approvals: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/get_approvals/stream")
+async def stream_approvals(request: ApprovalsRequest, http_request: Request, format: Optional[str] = None,
+                           service: ApprovalsServiceBase = Depends(get_approvals_service)) -> StreamingResponse:
+    request = apply_timeout_header(request, http_request.headers.get("x-request-timeout"))
+    use_sse = format == "sse" or "text/event-stream" in http_request.headers.get("accept", "")
+    include_prices = bool(request.include_prices)
+    logger.info(f"Received streaming get_approvals request with {len(request.addresses)} addresses "
+                f"({'sse' if use_sse else 'ndjson'})")
+
+    async def ndjson_lines() -> AsyncIterator[bytes]:
+        async for event in service.stream_latest_approvals(request):
+            yield encode_stream_event(event, include_prices) + b"\n"
+
+    async def sse_events() -> AsyncIterator[bytes]:
+        async for event in service.stream_latest_approvals(request):
+            yield b"event: approvals\ndata: " + encode_stream_event(event, include_prices) + b"\n\n"
+        yield b"event: end\ndata: {}\n\n"
+
+    if use_sse:
+        return StreamingResponse(sse_events(), media_type="text/event-stream",
+                                 headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+    return StreamingResponse(ndjson_lines(), media_type="application/x-ndjson")
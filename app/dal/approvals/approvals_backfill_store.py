@@ -0,0 +1,94 @@
+import sqlite3
+import threading
+from contextlib import closing
+from typing import Iterable, Iterator, List, Optional, Set, Tuple
+
+# (owner, token, spender, block_number, log_index, transaction_hash, amount), addresses and hashes as raw bytes
+BackfillRow = Tuple[bytes, bytes, bytes, int, int, bytes, bytes]
+
+_SCHEMA: str = """
+CREATE TABLE IF NOT EXISTS completed_ranges (
+    from_block INTEGER PRIMARY KEY,
+    to_block INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS approvals (
+    owner BLOB NOT NULL,
+    token BLOB NOT NULL,
+    spender BLOB NOT NULL,
+    block_number INTEGER NOT NULL,
+    log_index INTEGER NOT NULL,
+    transaction_hash BLOB NOT NULL,
+    amount BLOB NOT NULL,
+    PRIMARY KEY (owner, token, spender, block_number, log_index)
+) WITHOUT ROWID;
+"""
+
+# Rows are kept per range so an index can be built from any block window; re-ingesting a range is a no-op
+_INSERT: str = """
+INSERT OR IGNORE INTO approvals (owner, token, spender, block_number, log_index, transaction_hash, amount)
+VALUES (?, ?, ?, ?, ?, ?, ?)
+"""
+
+
+class ApprovalsBackfillStore:
+    """
+    SQLite staging area of the offline backfill: the latest approval per (owner, token, spender) in each ingested
+    range and the block ranges already ingested. A range and its rows are committed in one transaction, so an
+    interrupted backfill resumes with the ranges that are not recorded yet.
+    """
+
+    def __init__(self, db_path: str):
+        self._db_path = db_path
+        self._lock = threading.Lock()
+        with closing(self._connect()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self._db_path, timeout=30)
+
+    def completed_ranges(self) -> Set[Tuple[int, int]]:
+        with closing(self._connect()) as conn:
+            return set(conn.execute("SELECT from_block, to_block FROM completed_ranges").fetchall())
+
+    def save_range(self, from_block: int, to_block: int, rows: Iterable[BackfillRow]) -> None:
+        with self._lock, closing(self._connect()) as conn, conn:
+            conn.executemany(_INSERT, rows)
+            conn.execute("INSERT OR REPLACE INTO completed_ranges (from_block, to_block) VALUES (?, ?)",
+                         (from_block, to_block))
+
+    def indexed_block_range(self) -> Tuple[Optional[int], Optional[int]]:
+        """Lowest and highest block of the ingested ranges."""
+        with closing(self._connect()) as conn:
+            return conn.execute("SELECT MIN(from_block), MAX(to_block) FROM completed_ranges").fetchone()
+
+    def contiguous_to_block(self, from_block: int) -> Optional[int]:
+        """Last block such that every block in [from_block, it] has been ingested, None if from_block is missing."""
+        ranges: List[Tuple[int, int]] = sorted(self.completed_ranges())
+        covered_to: Optional[int] = None
+        for range_from, range_to in ranges:
+            next_block = from_block if covered_to is None else covered_to + 1
+            if range_from > next_block:
+                break
+            if range_to >= next_block:
+                covered_to = range_to
+        return covered_to
+
+    def iter_rows(self, from_block: int, to_block: int, batch_size: int = 10_000) -> Iterator[BackfillRow]:
+        """Latest row per (owner, token, spender) within [from_block, to_block], ordered by (owner, token, spender)."""
+        with closing(self._connect()) as conn:
+            cursor = conn.execute(
+                "SELECT owner, token, spender, block_number, log_index, transaction_hash, amount "
+                "FROM approvals WHERE block_number BETWEEN ? AND ? "
+                "ORDER BY owner, token, spender, block_number DESC, log_index DESC",
+                (from_block, to_block)
+            )
+            previous_key: Optional[Tuple[bytes, bytes, bytes]] = None
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    return
+                for row in rows:
+                    if row[:3] != previous_key:
+                        previous_key = row[:3]
+                        yield row
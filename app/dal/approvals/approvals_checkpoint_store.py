@@ -0,0 +1,85 @@
+import sqlite3
+import threading
+from contextlib import closing
+from typing import Iterable, List, Optional, Tuple
+
+from app.models.approvals.approvals import ApprovalLog
+
+_SCHEMA: str = """
+CREATE TABLE IF NOT EXISTS checkpoints (
+    owner TEXT PRIMARY KEY,
+    last_scanned_block INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS approvals (
+    owner TEXT NOT NULL,
+    token TEXT NOT NULL,
+    spender TEXT NOT NULL,
+    token_address TEXT NOT NULL,
+    block_number INTEGER NOT NULL,
+    log_index INTEGER,
+    transaction_hash TEXT NOT NULL,
+    amount TEXT NOT NULL,
+    PRIMARY KEY (owner, token, spender)
+);
+"""
+
+
+class ApprovalsCheckpointStore:
+    """
+    Local SQLite store holding, per owner, the reduced latest approval for every (token, spender)
+    pair together with the last block that was fully scanned for that owner.
+    """
+
+    def __init__(self, db_path: str):
+        self._db_path = db_path
+        self._lock = threading.Lock()
+        with closing(self._connect()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self._db_path, timeout=30)
+
+    def load(self, owner_address: str) -> Tuple[Optional[int], List[ApprovalLog]]:
+        owner = owner_address.lower()
+        with closing(self._connect()) as conn:
+            row = conn.execute(
+                "SELECT last_scanned_block FROM checkpoints WHERE owner = ?", (owner,)
+            ).fetchone()
+            if row is None:
+                return None, []
+            rows = conn.execute(
+                "SELECT token_address, spender, block_number, log_index, transaction_hash, amount "
+                "FROM approvals WHERE owner = ?", (owner,)
+            ).fetchall()
+        approval_logs = [
+            ApprovalLog(
+                token_address=token_address,
+                spender=spender,
+                block_number=block_number,
+                log_index=log_index,
+                transaction_hash=transaction_hash,
+                amount=int(amount)
+            )
+            for token_address, spender, block_number, log_index, transaction_hash, amount in rows
+        ]
+        return row[0], approval_logs
+
+    def save(self, owner_address: str, last_scanned_block: int, approval_logs: Iterable[ApprovalLog]) -> None:
+        owner = owner_address.lower()
+        rows = [
+            (owner, log.token_address.lower(), log.spender.lower(), log.token_address, log.block_number,
+             log.log_index, log.transaction_hash, str(log.amount))
+            for log in approval_logs
+        ]
+        with self._lock, closing(self._connect()) as conn, conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO approvals "
+                "(owner, token, spender, token_address, block_number, log_index, transaction_hash, amount) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows
+            )
+            conn.execute(
+                "INSERT INTO checkpoints (owner, last_scanned_block) VALUES (?, ?) "
+                "ON CONFLICT(owner) DO UPDATE SET last_scanned_block = excluded.last_scanned_block",
+                (owner, last_scanned_block)
+            )
@@ -1,4 +1,5 @@
 from abc import ABC, abstractmethod
+from typing import Dict, List, Optional, Tuple
 
 from app.models.approvals.approvals import ApprovalLog
 
@@ -8,6 +9,28 @@ class ApprovalsDAL(ABC):
     async def get_token_symbol(self, token_address: str) -> str:
         pass
 
+    @abstractmethod
+    async def get_token_symbols(self, token_addresses: List[str]) -> Dict[str, str]:
+        pass
+
     @abstractmethod
     async def fetch_approval_logs(self, owner_address: str) -> list[ApprovalLog]:
         pass
+
+    @abstractmethod
+    async def fetch_approval_logs_batch(self, owner_addresses: List[str]) -> Dict[str, List[ApprovalLog]]:
+        pass
+
+    @abstractmethod
+    async def get_block_number(self) -> int:
+        pass
+
+    @abstractmethod
+    async def fetch_approval_logs_range(self, owner_addresses: List[str], from_block: int, to_block: int,
+                                        split_block: Optional[int] = None) -> Dict[str, List[ApprovalLog]]:
+        pass
+
+    @abstractmethod
+    async def get_allowances(self, owner_address: str, token_spenders: List[Tuple[str, str]],
+                             block_number: int) -> Dict[Tuple[str, str], Optional[int]]:
+        pass
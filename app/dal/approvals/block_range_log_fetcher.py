@@ -0,0 +1,111 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from collections import deque
+from typing import TYPE_CHECKING, AsyncIterator, Awaitable, Callable, Deque, Dict, Final, List, Set, Tuple
+
+from app.utils.backoff import is_overload_error
+from app.utils.metrics import RETRIES
+
+if TYPE_CHECKING:
+    from web3.types import FilterParams, LogReceipt
+
+# Only messages about the size of the result: rate limits ("daily request count limit exceeded") and block range
+# caps are not fixed by smaller shards
+RESULT_LIMIT_ERROR_MARKERS: Final[Tuple[str, ...]] = (
+    "more than 10000 results",
+    "query returned more than",
+    "response size exceeded",
+    "response size should not",
+    "log response size",
+    "too many results",
+)
+TIMEOUT_ERROR_MARKERS: Final[Tuple[str, ...]] = ("query timeout", "timed out")
+
+
+def is_result_limit_error(error: BaseException) -> bool:
+    # Overload errors are left to the caller's backoff: splitting would only multiply the calls
+    if is_overload_error(error):
+        return False
+    message = str(error).lower()
+    return any(marker in message for marker in RESULT_LIMIT_ERROR_MARKERS)
+
+
+def is_timeout_error(error: BaseException) -> bool:
+    if isinstance(error, asyncio.TimeoutError):
+        return True
+    message = str(error).lower()
+    return any(marker in message for marker in TIMEOUT_ERROR_MARKERS)
+
+
+def log_sort_key(log: LogReceipt) -> Tuple[int, int]:
+    return log['blockNumber'], log.get('logIndex') or 0
+
+
+class BlockRangeLogFetcher:
+    """
+    Runs eth_getLogs over [from_block, to_block] as fixed-size block shards fetched concurrently under a bounded
+    limit. A shard rejected by the provider for returning too many results, or timing out twice, is bisected until it
+    fits. Rate limits and other errors are raised to the caller.
+    """
+
+    def __init__(self, get_logs: Callable[[FilterParams], Awaitable[List[LogReceipt]]], shard_size: int,
+                 concurrency_limit: int, min_shard_size: int = 1, logger=None):
+        self._get_logs = get_logs
+        self._shard_size = max(1, shard_size)
+        self._concurrency_limit = max(1, concurrency_limit)
+        self._min_shard_size = max(1, min_shard_size)
+        self._logger = logger or logging.getLogger(__name__)
+
+    def shards(self, from_block: int, to_block: int) -> List[Tuple[int, int]]:
+        return [(start, min(start + self._shard_size - 1, to_block))
+                for start in range(from_block, to_block + 1, self._shard_size)]
+
+    async def fetch(self, filter_params: FilterParams, from_block: int, to_block: int) -> List[LogReceipt]:
+        logs = [log async for page in self.iter_pages(filter_params, from_block, to_block) for log in page]
+        logs.sort(key=log_sort_key)
+        return logs
+
+    async def iter_pages(self, filter_params: FilterParams, from_block: int,
+                         to_block: int) -> AsyncIterator[List[LogReceipt]]:
+        """
+        Yields the logs of each eth_getLogs call as soon as it returns, in no particular block order. At most
+        `concurrency_limit` calls are in flight and a bisected shard is yielded as separate pages, so the logs held at
+        any time are bounded by the provider's result cap rather than by the size of the range.
+        """
+        pending: Deque[Tuple[int, int]] = deque(self.shards(from_block, to_block) if from_block <= to_block else [])
+        running: Dict[asyncio.Future, Tuple[int, int]] = {}
+        timed_out: Set[Tuple[int, int]] = set()
+        try:
+            while pending or running:
+                while pending and len(running) < self._concurrency_limit:
+                    start, end = pending.popleft()
+                    shard_params: FilterParams = {**filter_params, "fromBlock": start, "toBlock": end}
+                    running[asyncio.ensure_future(self._get_logs(shard_params))] = (start, end)
+                done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    start, end = running.pop(task)
+                    try:
+                        page = task.result()
+                    except Exception as e:
+                        timeout = is_timeout_error(e)
+                        if timeout and (start, end) not in timed_out:
+                            # One slow answer says little about the range, it is only split if it times out again
+                            timed_out.add((start, end))
+                            RETRIES.labels("get_logs_timeout").inc()
+                            pending.appendleft((start, end))
+                            continue
+                        if not (timeout or is_result_limit_error(e)) or end - start + 1 <= self._min_shard_size:
+                            raise
+                        middle = (start + end) // 2
+                        RETRIES.labels("get_logs_split").inc()
+                        self._logger.info(f"Splitting eth_getLogs range {start}-{end} at {middle}: {e}")
+                        pending.extendleft([(middle + 1, end), (start, middle)])
+                        continue
+                    yield page
+        finally:
+            # Runs when a call fails as well as when the consumer stops iterating early
+            for task in running:
+                task.cancel()
+            await asyncio.gather(*running, return_exceptions=True)
@@ -1,21 +1,32 @@
+from __future__ import annotations
+
+import asyncio
 import logging
 import os
-import sys
-from typing import Final, List
-
-import cachetools
-from eth_abi import decode
-from eth_typing import ChecksumAddress, HexStr
-from eth_utils import to_bytes, to_hex
-from web3.eth import AsyncEth
-from web3 import AsyncWeb3
-from web3.types import FilterParams, LogReceipt
+from typing import TYPE_CHECKING, Dict, Final, List, Optional, Tuple
 
+from app.dal.cache.shared_cache import get_shared_cache
+from app.dal.token_metadata.token_registry import TokenRegistry
 from app.models.approvals.approvals import ApprovalLog
+from app.utils.adaptive_limiter import AdaptiveLimiter
 from app.utils.config_loader import config
+from app.utils.fair_scheduler import TokenBucket
+from app.utils.log_decoder import (APPROVAL_EVENT_TOPIC, decode_and_reduce_in_pool, decode_approval_log,
+                                   is_erc20_approval)
+from app.utils.log_processor import reduce_latest_approvals, is_latest_approval
+from app.utils.metrics import CACHE_EVENTS, IN_FLIGHT, UPSTREAM_ERRORS, InstrumentedLRUCache, stage_timer
+from app.utils.single_flight import SingleFlight
+from .approvals_checkpoint_store import ApprovalsCheckpointStore
 from .approvals_dal import ApprovalsDAL
+from .block_range_log_fetcher import BlockRangeLogFetcher
+from .multicall import (MULTICALL3_ADDRESS, SYMBOL_SELECTOR, decode_allowance, decode_symbol, decode_try_aggregate,
+                        encode_allowance_call, encode_try_aggregate)
+
+if TYPE_CHECKING:
+    from eth_typing import ChecksumAddress
+    from web3 import AsyncWeb3
+    from web3.types import FilterParams, LogReceipt
 
-APPROVAL_EVENT_SIGNATURE_HASH: Final[str] = AsyncWeb3.keccak(text="Approval(address,address,uint256)").hex()
 ERC20_SYMBOL_ABI: Final = [{
     "constant": True,
     "inputs": [],
@@ -25,8 +36,7 @@ ERC20_SYMBOL_ABI: Final = [{
 }]
 
 INFURA_API_KEY = os.environ.get("INFURA_API_KEY")
-if not INFURA_API_KEY:
-    sys.exit("Exiting - INFURA_API_KEY environment variable not set.")
+ETH_RPC_URL = os.environ.get("ETH_RPC_URL")  # Overrides the Infura endpoint, e.g. for local benchmarks
 
 class InfuraDAL(ApprovalsDAL):
     _instance = None
@@ -39,9 +49,36 @@ class InfuraDAL(ApprovalsDAL):
     def __init__(self, logger=None):
         if getattr(self, '_initialized', False):
             return
-        self.w3 = self._get_infura_provider()
-        self.symbol_cache = cachetools.LRUCache(maxsize=config.lru_cache_maxsize)
+        self.w3 = self._get_provider()
+        self.symbol_cache = InstrumentedLRUCache(maxsize=config.lru_cache_maxsize,
+                                                 evictions=CACHE_EVENTS.labels("symbol", "eviction"))
+        self._shared_cache = get_shared_cache("symbol")
+        self._token_registry: Optional[TokenRegistry] = (
+            TokenRegistry(config.token_registry_path) if config.token_registry_path else None
+        )
+        self._checkpoint_store: Optional[ApprovalsCheckpointStore] = (
+            ApprovalsCheckpointStore(config.approvals_checkpoint_db_path)
+            if config.approvals_checkpoint_db_path else None
+        )
         self._logger = logger or logging.getLogger(__name__)
+        self._limiter = AdaptiveLimiter(
+            "infura",
+            initial_limit=config.infura_concurrency_initial,
+            min_limit=config.infura_concurrency_min,
+            max_limit=config.infura_concurrency_max,
+            backoff_ratio=config.adaptive_limit_backoff_ratio,
+            latency_tolerance=config.adaptive_limit_latency_tolerance,
+            token_bucket=(TokenBucket(config.infura_rate_limit, config.infura_rate_burst)
+                          if config.infura_rate_limit > 0 else None)
+        )
+        self._log_fetcher = BlockRangeLogFetcher(
+            self._get_logs,
+            shard_size=config.get_logs_shard_size,
+            concurrency_limit=config.get_logs_concurrency_limit,
+            logger=self._logger
+        )
+        self._symbol_flights: SingleFlight[str] = SingleFlight()
+        self._log_flights: SingleFlight[List[ApprovalLog]] = SingleFlight()
         self._initialized = True
 
     @classmethod
@@ -49,52 +86,309 @@ class InfuraDAL(ApprovalsDAL):
         return cls()
 
     @staticmethod
-    def _get_infura_provider() -> AsyncWeb3:
-        infura_url = f"https://mainnet.infura.io/v3/{INFURA_API_KEY}"
-        w3: AsyncWeb3 = AsyncWeb3(AsyncWeb3.AsyncHTTPProvider(infura_url), modules={"eth": (AsyncEth,)})
+    def _get_provider() -> AsyncWeb3:
+        # web3 is imported when the provider is built, not with this module: it is most of the app's import time
+        from web3 import AsyncWeb3
+        from web3.eth import AsyncEth
+        from .rpc_provider_pool import RpcProviderPool, make_http_provider
+
+        if not INFURA_API_KEY and not ETH_RPC_URL:
+            raise RuntimeError("INFURA_API_KEY environment variable not set")
+        infura_url = ETH_RPC_URL or f"https://mainnet.infura.io/v3/{INFURA_API_KEY}"
+        urls = list(dict.fromkeys([infura_url, *config.eth_rpc_urls]))
+        if len(urls) == 1:
+            provider = make_http_provider(infura_url, config.rpc_request_timeout)
+        else:
+            provider = RpcProviderPool(
+                urls,
+                hedge_percentile=config.rpc_hedge_percentile,
+                hedge_min_delay=config.rpc_hedge_min_delay,
+                ewma_alpha=config.rpc_ewma_alpha,
+                failure_threshold=config.rpc_circuit_failure_threshold,
+                cooldown=config.rpc_circuit_cooldown,
+                request_timeout=config.rpc_request_timeout
+            )
+        w3: AsyncWeb3 = AsyncWeb3(provider, modules={"eth": (AsyncEth,)})
         return w3
 
 #Todo: Change Dal name as get_token_symbol has nothing to do with approvals
-    async def get_token_symbol(self, token_address: ChecksumAddress) -> str:
+    def _get_known_symbol(self, token_address: ChecksumAddress) -> Optional[str]:
         if token_address in self.symbol_cache:
+            CACHE_EVENTS.labels("symbol", "hit").inc()
             return self.symbol_cache[token_address]
+        symbol = self._token_registry.get_symbol(token_address) if self._token_registry is not None else None
+        if symbol is not None:
+            CACHE_EVENTS.labels("symbol", "registry_hit").inc()
+            self.symbol_cache[token_address] = symbol
+        else:
+            CACHE_EVENTS.labels("symbol", "miss").inc()
+        return symbol
+
+    def _remember_symbol(self, token_address: ChecksumAddress, symbol: str) -> None:
+        self.symbol_cache[token_address] = symbol
+        if self._token_registry is not None and symbol != "UnknownERC20":
+            try:
+                self._token_registry.append(token_address, symbol)
+            except OSError as e:
+                self._logger.warning(f"Failed to persist token symbol for {token_address}: {e}")
+
+    async def _load_shared_symbols(self, token_addresses: List[ChecksumAddress]) -> Dict[str, str]:
+        if self._shared_cache is None:
+            return {}
+        symbols: Dict[str, str] = await self._shared_cache.get_many(token_addresses)
+        for address, symbol in symbols.items():
+            self.symbol_cache[address] = symbol
+        return symbols
+
+    async def _store_shared_symbols(self, symbols: Dict[str, str]) -> None:
+        # Unresolved symbols stay per process, like in the registry, so other workers still try them
+        if self._shared_cache is not None:
+            await self._shared_cache.set_many({address: symbol for address, symbol in symbols.items()
+                                               if symbol != "UnknownERC20"})
+
+    async def get_token_symbol(self, token_address: ChecksumAddress) -> str:
+        symbol = self._get_known_symbol(token_address)
+        if symbol is not None:
+            return symbol
+        return await self._symbol_flights.do(token_address, lambda: self._load_or_fetch_token_symbol(token_address))
+
+    async def _load_or_fetch_token_symbol(self, token_address: ChecksumAddress) -> str:
+        symbol = (await self._load_shared_symbols([token_address])).get(token_address)
+        return symbol if symbol is not None else await self._fetch_token_symbol(token_address)
+
+    async def _fetch_token_symbol(self, token_address: ChecksumAddress) -> str:
         try:
             contract = self.w3.eth.contract(address=token_address, abi=ERC20_SYMBOL_ABI)
-            symbol: str = await contract.functions.symbol().call()
+            async with self._limiter.slot("eth_call"):
+                with stage_timer("symbol_call"), IN_FLIGHT.labels("rpc_call").track_inprogress():
+                    symbol: str = await contract.functions.symbol().call()
             self._logger.info(f"Fetched token symbol for {token_address}: {symbol}")
         except (ValueError, ConnectionError, KeyError, AttributeError) as e:
+            UPSTREAM_ERRORS.labels("rpc").inc()
             self._logger.warning(f"Failed to fetch token symbol for {token_address}: {e}")
             symbol = "UnknownERC20"
-        self.symbol_cache[token_address] = symbol
+        self._remember_symbol(token_address, symbol)
+        await self._store_shared_symbols({token_address: symbol})
         return symbol
 
+    async def get_token_symbols(self, token_addresses: List[ChecksumAddress]) -> Dict[str, str]:
+        with stage_timer("symbols"):
+            return await self._get_token_symbols(token_addresses)
+
+    async def _get_token_symbols(self, token_addresses: List[ChecksumAddress]) -> Dict[str, str]:
+        missing = [address for address in dict.fromkeys(token_addresses) if self._get_known_symbol(address) is None]
+        fetched = await self._symbol_flights.do_many(missing, self._fetch_token_symbols) if missing else {}
+        return {address: fetched.get(address) or self.symbol_cache.get(address, "UnknownERC20")
+                for address in token_addresses}
+
+    async def _fetch_token_symbols(self, token_addresses: List[ChecksumAddress]) -> Dict[str, str]:
+        shared_symbols = await self._load_shared_symbols(token_addresses)
+        remaining = [address for address in token_addresses if address not in shared_symbols]
+        batch_size = config.multicall_batch_size
+        await asyncio.gather(*(
+            self._fetch_token_symbols_chunk(remaining[start:start + batch_size])
+            for start in range(0, len(remaining), batch_size)
+        ))
+        return {address: self.symbol_cache.get(address, "UnknownERC20") for address in token_addresses}
+
+    async def _fetch_token_symbols_chunk(self, token_addresses: List[ChecksumAddress]) -> None:
+        call_data = encode_try_aggregate([(address, SYMBOL_SELECTOR) for address in token_addresses])
+        try:
+            async with self._limiter.slot("eth_call"):
+                with stage_timer("symbol_multicall"), IN_FLIGHT.labels("rpc_call").track_inprogress():
+                    return_data = await self.w3.eth.call({"to": MULTICALL3_ADDRESS, "data": call_data})
+            results = decode_try_aggregate(return_data)
+        except Exception as e:
+            UPSTREAM_ERRORS.labels("rpc").inc()
+            self._logger.warning(f"Multicall symbol lookup for {len(token_addresses)} tokens failed, "
+                                 f"falling back to single calls: {e}")
+            await asyncio.gather(*(self._fetch_token_symbol(address) for address in token_addresses))
+            return
+        symbols = {address: decode_symbol(success, data) or "UnknownERC20"
+                   for address, (success, data) in zip(token_addresses, results)}
+        for address, symbol in symbols.items():
+            self._remember_symbol(address, symbol)
+        await self._store_shared_symbols(symbols)
+        self._logger.info(f"Fetched {len(token_addresses)} token symbols via multicall")
+
+    async def _get_logs(self, filter_params: FilterParams) -> List[LogReceipt]:
+        try:
+            async with self._limiter.slot("get_logs"):
+                with stage_timer("get_logs"), IN_FLIGHT.labels("rpc_get_logs").track_inprogress():
+                    return await self.w3.eth.get_logs(filter_params)
+        except Exception:
+            UPSTREAM_ERRORS.labels("rpc").inc()
+            raise
+
+    async def get_block_number(self) -> int:
+        async with self._limiter.slot("block_number"):
+            with stage_timer("block_number"):
+                return await self.w3.eth.block_number
+
+    async def get_allowances(self, owner_address: str, token_spenders: List[Tuple[str, str]],
+                             block_number: int) -> Dict[Tuple[str, str], Optional[int]]:
+        """
+        Current allowance() of `owner_address` for each (token, spender) at `block_number`, read through Multicall3
+        tryAggregate in chunks of `multicall_batch_size`. Tokens whose allowance() reverts map to None.
+        """
+        unique_token_spenders = list(dict.fromkeys(token_spenders))
+        batch_size = config.multicall_batch_size
+        chunk_results = await asyncio.gather(*(
+            self._fetch_allowances_chunk(owner_address, unique_token_spenders[start:start + batch_size], block_number)
+            for start in range(0, len(unique_token_spenders), batch_size)
+        ))
+        return {token_spender: allowance for chunk_result in chunk_results
+                for token_spender, allowance in chunk_result.items()}
+
+    async def _fetch_allowances_chunk(self, owner_address: str, token_spenders: List[Tuple[str, str]],
+                                      block_number: int) -> Dict[Tuple[str, str], Optional[int]]:
+        call_data = encode_try_aggregate([(token_address, encode_allowance_call(owner_address, spender))
+                                          for token_address, spender in token_spenders])
+        try:
+            async with self._limiter.slot("eth_call"):
+                with stage_timer("allowance_multicall"), IN_FLIGHT.labels("rpc_call").track_inprogress():
+                    return_data = await self.w3.eth.call({"to": MULTICALL3_ADDRESS, "data": call_data}, block_number)
+            results = decode_try_aggregate(return_data)
+        except Exception:
+            UPSTREAM_ERRORS.labels("rpc").inc()
+            raise
+        return {token_spender: decode_allowance(success, data)
+                for token_spender, (success, data) in zip(token_spenders, results)}
+
+    async def fetch_approval_logs_range(self, owner_addresses: List[str], from_block: int, to_block: int,
+                                        split_block: Optional[int] = None) -> Dict[str, List[ApprovalLog]]:
+        """
+        Approval logs of `owner_addresses` emitted in [from_block, to_block], without checkpoints. Logs may already be
+        reduced to the latest per token and spender, separately on each side of `split_block`.
+        """
+        approval_logs_by_owner: Dict[str, List[ApprovalLog]] = {}
+        batch_size = config.get_logs_owner_batch_size
+        chunk_results = await asyncio.gather(*(
+            self._get_approval_logs(owner_addresses[start:start + batch_size], from_block, to_block, split_block)
+            for start in range(0, len(owner_addresses), batch_size)
+        ))
+        for chunk_result in chunk_results:
+            approval_logs_by_owner.update(chunk_result)
+        return approval_logs_by_owner
+
     async def fetch_approval_logs(self, owner_address: str) -> List[ApprovalLog]:
-        address_bytes: bytes = to_bytes(hexstr=owner_address)
-        topic_owner: HexStr = to_hex(b'\x00' * 12 + address_bytes)
+        approval_logs_by_owner = await self.fetch_approval_logs_batch([owner_address])
+        return approval_logs_by_owner[owner_address]
+
+    async def fetch_approval_logs_batch(self, owner_addresses: List[str]) -> Dict[str, List[ApprovalLog]]:
+        approval_logs_by_key = await self._log_flights.do_many(
+            [owner_address.lower() for owner_address in owner_addresses], self._fetch_approval_logs_batch
+        )
+        return {owner_address: approval_logs_by_key[owner_address.lower()] for owner_address in owner_addresses}
+
+    async def _fetch_approval_logs_batch(self, owner_addresses: List[str]) -> Dict[str, List[ApprovalLog]]:
+        try:
+            head_block: int = await self.get_block_number()
+            checkpoints: Dict[str, Tuple[Optional[int], List[ApprovalLog]]] = {}
+            if self._checkpoint_store is not None:
+                with stage_timer("checkpoint_load"):
+                    for owner_address in owner_addresses:
+                        checkpoints[owner_address] = await asyncio.to_thread(self._checkpoint_store.load,
+                                                                             owner_address)
+        except (ValueError, ConnectionError) as e:
+            self._logger.error(f"Error preparing log scan for {len(owner_addresses)} owners: {e}")
+            raise RuntimeError(f"Error fetching logs: {e}")
+
+        # Owners sharing a checkpoint are scanned together, fresh owners all start from block 0
+        owners_by_from_block: Dict[int, List[str]] = {}
+        for owner_address in owner_addresses:
+            last_scanned_block = checkpoints.get(owner_address, (None, []))[0]
+            from_block = 0 if last_scanned_block is None else last_scanned_block + 1
+            owners_by_from_block.setdefault(from_block, []).append(owner_address)
+
+        new_logs_by_owner: Dict[str, List[ApprovalLog]] = {owner_address: [] for owner_address in owner_addresses}
+        for from_block, owners in owners_by_from_block.items():
+            if from_block > head_block:
+                continue
+            batch_size = config.get_logs_owner_batch_size
+            chunk_results = await asyncio.gather(*(
+                self._get_approval_logs(owners[start:start + batch_size], from_block, head_block,
+                                        split_block=head_block - config.approvals_checkpoint_confirmations)
+                for start in range(0, len(owners), batch_size)
+            ))
+            for chunk_result in chunk_results:
+                new_logs_by_owner.update(chunk_result)
+
+        if self._checkpoint_store is None:
+            return new_logs_by_owner
+        approval_logs_by_owner: Dict[str, List[ApprovalLog]] = {}
+        for owner_address in owner_addresses:
+            last_scanned_block, stored_logs = checkpoints[owner_address]
+            approval_logs_by_owner[owner_address] = await self._merge_with_checkpoint(
+                owner_address, last_scanned_block, stored_logs, new_logs_by_owner[owner_address], head_block
+            )
+        return approval_logs_by_owner
+
+    async def _merge_with_checkpoint(self, owner_address: str, last_scanned_block: Optional[int],
+                                     stored_logs: List[ApprovalLog], new_logs: List[ApprovalLog],
+                                     head_block: int) -> List[ApprovalLog]:
+        from_block = 0 if last_scanned_block is None else last_scanned_block + 1
+
+        # Only logs buried under enough confirmations are persisted, the unconfirmed tail is re-fetched next time
+        safe_block = head_block - config.approvals_checkpoint_confirmations
+        confirmed_logs = [log for log in new_logs if log.block_number <= safe_block]
+        unconfirmed_logs = [log for log in new_logs if log.block_number > safe_block]
+
+        latest_approvals = reduce_latest_approvals(stored_logs)
+        changed_approvals = {
+            key: log for key, log in reduce_latest_approvals(confirmed_logs).items()
+            if key not in latest_approvals or is_latest_approval(log, latest_approvals[key])
+        }
+        latest_approvals.update(changed_approvals)
+        if safe_block >= from_block:
+            with stage_timer("checkpoint_save"):
+                await asyncio.to_thread(self._checkpoint_store.save, owner_address, safe_block,
+                                        changed_approvals.values())
+            self._logger.info(f"Checkpointed {owner_address} at block {safe_block} "
+                              f"({len(changed_approvals)} updated approvals)")
+
+        return list(reduce_latest_approvals(unconfirmed_logs, latest_approvals).values())
+
+    async def _get_approval_logs(self, owner_addresses: List[str], from_block: int, to_block: int,
+                                 split_block: Optional[int] = None) -> Dict[str, List[ApprovalLog]]:
+        owners_by_topic: Dict[bytes, List[str]] = {}
+        for owner_address in owner_addresses:
+            address_bytes: bytes = bytes.fromhex(owner_address[2:] if owner_address[:2] in ("0x", "0X")
+                                                 else owner_address)
+            owners_by_topic.setdefault(b'\x00' * 12 + address_bytes, []).append(owner_address)
 
         filter_params: FilterParams = {
-            "fromBlock": 0,
-            "toBlock": "latest",
             "topics": [
-                '0x' + APPROVAL_EVENT_SIGNATURE_HASH,
-                topic_owner
+                APPROVAL_EVENT_TOPIC,
+                ['0x' + owner_topic.hex() for owner_topic in owners_by_topic]
             ]
         }
 
+        # Latest log per (token, spender) of each owner, at or below and above split_block. Pages are folded in as
+        # they arrive, so memory follows the number of live approvals rather than the length of the history
+        latest_by_owner: Dict[str, Tuple[Dict, Dict]] = {owner: ({}, {}) for owner in owner_addresses}
+        log_count = 0
         try:
-            logs: list[LogReceipt] = await self.w3.eth.get_logs(filter_params)
-            approval_logs = []
-            for log in logs:
-                approval_logs.append(ApprovalLog(
-                    block_number=log.get('blockNumber'),
-                    transaction_hash=log.get('transactionHash').hex() if log.get('transactionHash') else '',
-                    amount=decode(['uint256'], log['data'])[0],
-                    spender='0x' + log['topics'][2].hex()[-40:].lower(),
-                    token_address=log.get('address'),
-                    log_index=log.get('logIndex')
-                ))
-            self._logger.info(f"Fetched {len(approval_logs)} approval logs for owner {owner_address}")
-            return approval_logs
-        except (ValueError, ConnectionError, KeyError) as e:
-            self._logger.error(f"Error fetching approval logs for {owner_address}: {e}")
+            async for page in self._log_fetcher.iter_pages(filter_params, from_block, to_block):
+                log_count += len(page)
+                with stage_timer("decode_logs"):
+                    if len(page) >= config.log_decode_process_pool_threshold > 0:
+                        decoded = await decode_and_reduce_in_pool(page, config.log_decode_process_pool_workers,
+                                                                  split_block)
+                    else:
+                        decoded = ((bytes(log['topics'][1]), decode_approval_log(log))
+                                   for log in page if is_erc20_approval(log))
+                    page_logs: Dict[Tuple[str, bool], List[ApprovalLog]] = {}
+                    for owner_topic, approval_log in decoded:
+                        unconfirmed = split_block is not None and approval_log.block_number > split_block
+                        for owner_address in owners_by_topic.get(owner_topic, []):
+                            page_logs.setdefault((owner_address, unconfirmed), []).append(approval_log)
+                    for (owner_address, unconfirmed), approval_logs in page_logs.items():
+                        reduce_latest_approvals(approval_logs, latest_by_owner[owner_address][unconfirmed])
+            self._logger.info(f"Fetched {log_count} approval logs for {len(owner_addresses)} owners "
+                              f"from block {from_block} to {to_block}")
+            return {owner_address: [*confirmed.values(), *unconfirmed.values()]
+                    for owner_address, (confirmed, unconfirmed) in latest_by_owner.items()}
+        except (ValueError, ConnectionError, KeyError, IndexError) as e:
+            self._logger.error(f"Error fetching approval logs for {owner_addresses}: {e}")
             raise RuntimeError(f"Error fetching logs: {e}")
@@ -0,0 +1,50 @@
+from typing import Final, List, Optional, Sequence, Tuple
+
+# eth-abi is imported by the functions that need it, so importing the DAL does not pay for it until the first call
+
+MULTICALL3_ADDRESS: Final[str] = "0xcA11bde05977b3631167028862bE2a173976CA11"
+TRY_AGGREGATE_SELECTOR: Final[bytes] = bytes.fromhex("bce38bd7")  # tryAggregate(bool,(address,bytes)[])
+SYMBOL_SELECTOR: Final[bytes] = bytes.fromhex("95d89b41")  # symbol()
+ALLOWANCE_SELECTOR: Final[bytes] = bytes.fromhex("dd62ed3e")  # allowance(address,address)
+
+
+def encode_try_aggregate(calls: Sequence[Tuple[str, bytes]], require_success: bool = False) -> bytes:
+    from eth_abi import encode
+    return TRY_AGGREGATE_SELECTOR + encode(['bool', '(address,bytes)[]'], [require_success, list(calls)])
+
+
+def decode_try_aggregate(return_data: bytes) -> List[Tuple[bool, bytes]]:
+    from eth_abi import decode
+    return [(success, data) for success, data in decode(['(bool,bytes)[]'], return_data)[0]]
+
+
+def decode_symbol(success: bool, return_data: bytes) -> Optional[str]:
+    """
+    Decodes a symbol() return value. Handles the ABI `string` layout as well as legacy tokens (e.g. MKR) that return
+    a right-padded bytes32. Reverted calls, empty returns and undecodable payloads yield None.
+    """
+    if not success or not return_data:
+        return None
+    from eth_abi import decode
+    from eth_abi.exceptions import DecodingError
+    if len(return_data) == 32:
+        symbol = return_data.rstrip(b'\x00').decode('utf-8', errors='ignore')
+    else:
+        try:
+            symbol = decode(['string'], return_data)[0]
+        except (DecodingError, OverflowError, UnicodeDecodeError, ValueError):
+            return None
+    symbol = symbol.replace('\x00', '').strip()
+    return symbol or None
+
+
+def encode_allowance_call(owner_address: str, spender_address: str) -> bytes:
+    from eth_abi import encode
+    return ALLOWANCE_SELECTOR + encode(['address', 'address'], [owner_address, spender_address])
+
+
+def decode_allowance(success: bool, return_data: bytes) -> Optional[int]:
+    """Decodes an allowance() return value; reverted calls and non-standard returns yield None."""
+    if not success or len(return_data) < 32:
+        return None
+    return int.from_bytes(return_data[:32], 'big')
@@ -0,0 +1,77 @@
+import logging
+from typing import Dict, List, Optional, Tuple
+
+from eth_utils import to_checksum_address
+
+from app.dal.token_metadata.token_registry import TokenRegistry
+from app.models.approvals.approvals import ApprovalLog
+from app.utils.config_loader import config
+from .approvals_dal import ApprovalsDAL
+from .offline_approvals_index import IndexedApproval, OfflineApprovalsIndex
+
+
+def _to_approval_log(row: IndexedApproval) -> ApprovalLog:
+    return ApprovalLog(
+        block_number=row.block_number,
+        transaction_hash=row.transaction_hash.hex(),
+        spender='0x' + row.spender.hex(),
+        amount=row.amount,
+        token_address=to_checksum_address(row.token),
+        log_index=row.log_index
+    )
+
+
+class OfflineApprovalsDAL(ApprovalsDAL):
+    """
+    Serves approvals from an offline index built with `python -m app.cli.backfill_approvals`, without any RPC
+    traffic. Token symbols come from the token registry only.
+    """
+    _instance = None
+
+    def __new__(cls, *args, **kwargs):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+        return cls._instance
+
+    def __init__(self, index_path: Optional[str] = None, logger=None):
+        if getattr(self, '_initialized', False):
+            return
+        self._index = OfflineApprovalsIndex(index_path or config.offline_approvals_index_path)
+        self._token_registry: Optional[TokenRegistry] = (
+            TokenRegistry(config.token_registry_path) if config.token_registry_path else None
+        )
+        self._logger = logger or logging.getLogger(__name__)
+        self._logger.info(f"Loaded offline approvals index with {self._index.row_count} approvals of "
+                          f"{self._index.owner_count} owners up to block {self._index.to_block}")
+        self._initialized = True
+
+    @classmethod
+    def get_instance(cls):
+        return cls()
+
+    async def get_token_symbol(self, token_address: str) -> str:
+        symbol = self._token_registry.get_symbol(token_address) if self._token_registry is not None else None
+        return symbol or "UnknownERC20"
+
+    async def get_token_symbols(self, token_addresses: List[str]) -> Dict[str, str]:
+        return {address: await self.get_token_symbol(address) for address in token_addresses}
+
+    async def fetch_approval_logs(self, owner_address: str) -> List[ApprovalLog]:
+        return [_to_approval_log(row) for row in self._index.get(owner_address)]
+
+    async def fetch_approval_logs_batch(self, owner_addresses: List[str]) -> Dict[str, List[ApprovalLog]]:
+        return {owner_address: await self.fetch_approval_logs(owner_address) for owner_address in owner_addresses}
+
+    async def get_block_number(self) -> int:
+        return self._index.to_block
+
+    async def fetch_approval_logs_range(self, owner_addresses: List[str], from_block: int, to_block: int,
+                                        split_block: Optional[int] = None) -> Dict[str, List[ApprovalLog]]:
+        # Filtering the index by block would look like range semantics but is not: logs superseded later are gone
+        # and nothing after the index's last block is known, so the indexer would silently miss approvals
+        raise RuntimeError(f"Block range scans need every log of the range, the offline approvals index only keeps "
+                           f"the latest approval per token and spender up to block {self._index.to_block}")
+
+    async def get_allowances(self, owner_address: str, token_spenders: List[Tuple[str, str]],
+                             block_number: int) -> Dict[Tuple[str, str], Optional[int]]:
+        raise RuntimeError("Allowance verification needs chain state, which the offline approvals index does not have")
@@ -0,0 +1,191 @@
+import mmap
+import os
+import shutil
+import struct
+import tempfile
+from typing import BinaryIO, Dict, Final, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from .approvals_backfill_store import BackfillRow
+
+MAGIC: Final[bytes] = b"APPIDX1\x00"
+# magic, owners, rows, tokens, spenders, indexed from block, indexed to block
+HEADER_FORMAT: Final[str] = "<8sQQQQQQ"
+HEADER_SIZE: Final[int] = struct.calcsize(HEADER_FORMAT)
+ADDRESS_SIZE: Final[int] = 20
+HASH_SIZE: Final[int] = 32
+AMOUNT_SIZE: Final[int] = 32
+OFFSET_FORMAT: Final[str] = "<Q"
+ID_FORMAT: Final[str] = "<I"
+BLOCK_FORMAT: Final[str] = "<I"
+LOG_INDEX_FORMAT: Final[str] = "<I"
+
+# Sections in file order as (name, bytes per item); the number of items is derived from the header counts
+_SECTIONS: Final[Tuple[Tuple[str, int], ...]] = (
+    ("owners", ADDRESS_SIZE),
+    ("owner_row_starts", struct.calcsize(OFFSET_FORMAT)),
+    ("token_dictionary", ADDRESS_SIZE),
+    ("spender_dictionary", ADDRESS_SIZE),
+    ("token_ids", struct.calcsize(ID_FORMAT)),
+    ("spender_ids", struct.calcsize(ID_FORMAT)),
+    ("block_numbers", struct.calcsize(BLOCK_FORMAT)),
+    ("log_indexes", struct.calcsize(LOG_INDEX_FORMAT)),
+    ("amounts", AMOUNT_SIZE),
+    ("transaction_hashes", HASH_SIZE),
+)
+
+
+class IndexedApproval(NamedTuple):
+    owner: bytes
+    token: bytes
+    spender: bytes
+    block_number: int
+    log_index: int
+    transaction_hash: bytes
+    amount: int
+
+
+def _section_counts(owners: int, rows: int, tokens: int, spenders: int) -> Dict[str, int]:
+    counts = {name: rows for name, _ in _SECTIONS}
+    counts.update(owners=owners, owner_row_starts=owners + 1, token_dictionary=tokens, spender_dictionary=spenders)
+    return counts
+
+
+def _address_bytes(address: str) -> bytes:
+    return bytes.fromhex(address[2:] if address[:2].lower() == "0x" else address)
+
+
+class OfflineApprovalsIndex:
+    """
+    Read-only columnar file with the latest approval of every (owner, token, spender). Rows are sorted by owner,
+    then token and spender; each field is stored as its own fixed-width column, tokens and spenders dictionary
+    encoded. The sorted owner column is binary searched over a memory map and points at the owner's row range.
+    """
+
+    def __init__(self, path: str):
+        self._path = path
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, self.owner_count, self.row_count, token_count, spender_count,
+         self.from_block, self.to_block) = struct.unpack_from(HEADER_FORMAT, self._mmap, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not an offline approvals index")
+        counts = _section_counts(self.owner_count, self.row_count, token_count, spender_count)
+        self._offsets: Dict[str, int] = {}
+        offset = HEADER_SIZE
+        for name, item_size in _SECTIONS:
+            self._offsets[name] = offset
+            offset += item_size * counts[name]
+        if offset != len(self._mmap):
+            raise ValueError(f"{path} is truncated or corrupt")
+
+    def close(self) -> None:
+        self._mmap.close()
+
+    def _owner_position(self, owner: bytes) -> Optional[int]:
+        base = self._offsets["owners"]
+        low, high = 0, self.owner_count
+        while low < high:
+            middle = (low + high) // 2
+            current = self._mmap[base + middle * ADDRESS_SIZE:base + (middle + 1) * ADDRESS_SIZE]
+            if current < owner:
+                low = middle + 1
+            elif current > owner:
+                high = middle
+            else:
+                return middle
+        return None
+
+    def _row_range(self, position: int) -> Tuple[int, int]:
+        base = self._offsets["owner_row_starts"]
+        return struct.unpack_from("<QQ", self._mmap, base + position * 8)
+
+    def _read_row(self, owner: bytes, row: int) -> IndexedApproval:
+        offsets = self._offsets
+        data = self._mmap
+        token_id = struct.unpack_from(ID_FORMAT, data, offsets["token_ids"] + row * 4)[0]
+        spender_id = struct.unpack_from(ID_FORMAT, data, offsets["spender_ids"] + row * 4)[0]
+        token_start = offsets["token_dictionary"] + token_id * ADDRESS_SIZE
+        spender_start = offsets["spender_dictionary"] + spender_id * ADDRESS_SIZE
+        amount_start = offsets["amounts"] + row * AMOUNT_SIZE
+        hash_start = offsets["transaction_hashes"] + row * HASH_SIZE
+        return IndexedApproval(
+            owner=owner,
+            token=data[token_start:token_start + ADDRESS_SIZE],
+            spender=data[spender_start:spender_start + ADDRESS_SIZE],
+            block_number=struct.unpack_from(BLOCK_FORMAT, data, offsets["block_numbers"] + row * 4)[0],
+            log_index=struct.unpack_from(LOG_INDEX_FORMAT, data, offsets["log_indexes"] + row * 4)[0],
+            transaction_hash=data[hash_start:hash_start + HASH_SIZE],
+            amount=int.from_bytes(data[amount_start:amount_start + AMOUNT_SIZE], "big")
+        )
+
+    def get(self, owner_address: str) -> List[IndexedApproval]:
+        """Latest approvals of one owner, O(log owners) to find them plus one read per approval."""
+        owner = _address_bytes(owner_address)
+        position = self._owner_position(owner)
+        if position is None:
+            return []
+        start, end = self._row_range(position)
+        return [self._read_row(owner, row) for row in range(start, end)]
+
+    def owners(self) -> Iterator[bytes]:
+        base = self._offsets["owners"]
+        for position in range(self.owner_count):
+            yield self._mmap[base + position * ADDRESS_SIZE:base + (position + 1) * ADDRESS_SIZE]
+
+    def __iter__(self) -> Iterator[IndexedApproval]:
+        """Every row in (owner, token, spender) order, for analytics over all wallets."""
+        for position, owner in enumerate(self.owners()):
+            start, end = self._row_range(position)
+            for row in range(start, end):
+                yield self._read_row(owner, row)
+
+    @staticmethod
+    def build(path: str, rows: Iterable[BackfillRow], from_block: int, to_block: int) -> int:
+        """
+        Writes an index from `rows` sorted by (owner, token, spender). Columns are streamed to temporary files and
+        concatenated, so only the token and spender dictionaries are held in memory. Returns the number of rows.
+        """
+        directory = os.path.dirname(os.path.abspath(path))
+        token_ids: Dict[bytes, int] = {}
+        spender_ids: Dict[bytes, int] = {}
+        column_files: Dict[str, BinaryIO] = {
+            name: tempfile.TemporaryFile(dir=directory)
+            for name, _ in _SECTIONS if name not in ("token_dictionary", "spender_dictionary")
+        }
+        try:
+            row_count = owner_count = 0
+            previous_owner: Optional[bytes] = None
+            for owner, token, spender, block_number, log_index, transaction_hash, amount in rows:
+                if owner != previous_owner:
+                    column_files["owners"].write(owner)
+                    column_files["owner_row_starts"].write(struct.pack(OFFSET_FORMAT, row_count))
+                    owner_count += 1
+                    previous_owner = owner
+                column_files["token_ids"].write(struct.pack(ID_FORMAT, token_ids.setdefault(token, len(token_ids))))
+                column_files["spender_ids"].write(
+                    struct.pack(ID_FORMAT, spender_ids.setdefault(spender, len(spender_ids)))
+                )
+                column_files["block_numbers"].write(struct.pack(BLOCK_FORMAT, block_number))
+                column_files["log_indexes"].write(struct.pack(LOG_INDEX_FORMAT, log_index))
+                column_files["amounts"].write(bytes(amount).rjust(AMOUNT_SIZE, b"\x00"))
+                column_files["transaction_hashes"].write(bytes(transaction_hash).rjust(HASH_SIZE, b"\x00"))
+                row_count += 1
+            column_files["owner_row_starts"].write(struct.pack(OFFSET_FORMAT, row_count))
+
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(struct.pack(HEADER_FORMAT, MAGIC, owner_count, row_count, len(token_ids), len(spender_ids),
+                                    from_block, to_block))
+                for name, _ in _SECTIONS:
+                    if name == "token_dictionary":
+                        f.write(b"".join(token_ids))
+                    elif name == "spender_dictionary":
+                        f.write(b"".join(spender_ids))
+                    else:
+                        column_files[name].seek(0)
+                        shutil.copyfileobj(column_files[name], f)
+            os.replace(tmp_path, path)
+            return row_count
+        finally:
+            for column_file in column_files.values():
+                column_file.close()
@@ -0,0 +1,257 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Final, FrozenSet, List, Optional, Sequence
+from urllib.parse import urlparse
+
+from web3.providers import AsyncBaseProvider
+from web3.providers.rpc import AsyncHTTPProvider
+from web3.types import RPCEndpoint, RPCResponse
+
+from app.utils.metrics import Counter, Gauge
+from .block_range_log_fetcher import RESULT_LIMIT_ERROR_MARKERS
+
+# Only read-only calls are duplicated to a second endpoint
+HEDGEABLE_METHODS: Final[FrozenSet[str]] = frozenset({
+    "eth_blockNumber", "eth_call", "eth_chainId", "eth_getLogs", "eth_getBlockByNumber", "eth_getBalance",
+    "eth_getCode", "eth_getTransactionReceipt",
+})
+
+# Errors caused by the request itself, which every endpoint would return as well
+_REQUEST_ERROR_CODES: Final[FrozenSet[int]] = frozenset({-32700, -32600, -32601, -32602, 3})
+_REQUEST_ERROR_MARKERS: Final = ("revert", "invalid argument", "invalid params", *RESULT_LIMIT_ERROR_MARKERS)
+
+CLOSED: Final[str] = "closed"
+OPEN: Final[str] = "open"
+HALF_OPEN: Final[str] = "half_open"
+_STATE_VALUES: Final = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+RPC_ENDPOINT_LATENCY: Final = Gauge(
+    "approvals_rpc_endpoint_latency_seconds", "EWMA latency of each JSON-RPC endpoint.", ["endpoint"]
+)
+RPC_ENDPOINT_ERROR_RATE: Final = Gauge(
+    "approvals_rpc_endpoint_error_rate", "EWMA error rate of each JSON-RPC endpoint.", ["endpoint"]
+)
+RPC_ENDPOINT_STATE: Final = Gauge(
+    "approvals_rpc_endpoint_circuit_state", "Circuit state per JSON-RPC endpoint (0 closed, 1 half-open, 2 open).",
+    ["endpoint"]
+)
+RPC_REQUESTS: Final = Counter(
+    "approvals_rpc_requests_total", "JSON-RPC requests by endpoint and outcome.", ["endpoint", "outcome"]
+)
+RPC_HEDGES: Final = Counter("approvals_rpc_hedges_total", "Hedged JSON-RPC requests by winner.", ["winner"])
+
+
+def make_http_provider(url: str, request_timeout: float) -> AsyncHTTPProvider:
+    """
+    HTTP provider without web3's own exception retries, so rate limits and timeouts reach the adaptive limiter and
+    the callers' backoff at once instead of being retried blindly inside web3.
+    """
+    return AsyncHTTPProvider(url, request_kwargs={"timeout": request_timeout}, exception_retry_configuration=None)
+
+
+class RpcEndpointError(Exception):
+    """A JSON-RPC error payload blamed on the endpoint (rate limit, server error), kept to be returned if no other
+    endpoint answers."""
+
+    def __init__(self, response: RPCResponse):
+        super().__init__(str(response.get("error")))
+        self.response = response
+
+
+def is_endpoint_error(error: Any) -> bool:
+    """
+    Whether a JSON-RPC `error` object is the endpoint's failure, e.g. a -32005 rate limit or a -32000 server error,
+    rather than a deterministic rejection of the request such as a revert or invalid params.
+    """
+    if not error:
+        return False
+    if not isinstance(error, dict):
+        return True
+    message = str(error.get("message", "")).lower()
+    return error.get("code") not in _REQUEST_ERROR_CODES and not any(marker in message
+                                                                     for marker in _REQUEST_ERROR_MARKERS)
+
+
+class RpcEndpoint:
+    """Health of one JSON-RPC endpoint: EWMA latency and error rate, recent latencies and a circuit breaker."""
+
+    def __init__(self, url: str, name: str, provider: AsyncBaseProvider, ewma_alpha: float, failure_threshold: int,
+                 cooldown: float, latency_window: int = 200, clock: Callable[[], float] = time.monotonic):
+        self.url = url
+        self.name = name
+        self.provider = provider
+        self.ewma_latency: Optional[float] = None
+        self.error_rate = 0.0
+        self.state = CLOSED
+        self._latencies: Deque[float] = deque(maxlen=latency_window)
+        self._alpha = ewma_alpha
+        self._failure_threshold = failure_threshold
+        self._cooldown = cooldown
+        self._consecutive_failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._clock = clock
+
+    def is_available(self) -> bool:
+        if self.state == OPEN and self._clock() - self._opened_at >= self._cooldown:
+            self._set_state(HALF_OPEN)
+        # A half-open endpoint gets a single trial request until it succeeds or fails
+        return self.state == CLOSED or (self.state == HALF_OPEN and not self._trial_in_flight)
+
+    def score(self, default_latency: float) -> float:
+        latency = self.ewma_latency if self.ewma_latency is not None else default_latency
+        return latency * (1 + 10 * self.error_rate)
+
+    def latency_percentile(self, percentile: float) -> Optional[float]:
+        if not self._latencies:
+            return None
+        ordered = sorted(self._latencies)
+        return ordered[min(len(ordered) - 1, int(percentile * len(ordered)))]
+
+    def started(self) -> None:
+        if self.state == HALF_OPEN:
+            self._trial_in_flight = True
+
+    def record_success(self, latency: float) -> None:
+        self._latencies.append(latency)
+        self.ewma_latency = latency if self.ewma_latency is None else (
+            self._alpha * latency + (1 - self._alpha) * self.ewma_latency
+        )
+        self.error_rate *= 1 - self._alpha
+        self._consecutive_failures = 0
+        self._trial_in_flight = False
+        self._set_state(CLOSED)
+        RPC_ENDPOINT_LATENCY.labels(self.name).set(self.ewma_latency)
+        RPC_ENDPOINT_ERROR_RATE.labels(self.name).set(self.error_rate)
+        RPC_REQUESTS.labels(self.name, "success").inc()
+
+    def record_failure(self) -> None:
+        self.error_rate = self._alpha + (1 - self._alpha) * self.error_rate
+        self._consecutive_failures += 1
+        self._trial_in_flight = False
+        if self.state == HALF_OPEN or self._consecutive_failures >= self._failure_threshold:
+            self._opened_at = self._clock()
+            self._set_state(OPEN)
+        RPC_ENDPOINT_ERROR_RATE.labels(self.name).set(self.error_rate)
+        RPC_REQUESTS.labels(self.name, "failure").inc()
+
+    def record_cancelled(self, elapsed: float) -> None:
+        # A request that lost a hedge race was at least this slow, which keeps its EWMA from looking too good
+        if self.ewma_latency is not None and elapsed > self.ewma_latency:
+            self.ewma_latency = self._alpha * elapsed + (1 - self._alpha) * self.ewma_latency
+        self._trial_in_flight = False
+
+    def _set_state(self, state: str) -> None:
+        self.state = state
+        RPC_ENDPOINT_STATE.labels(self.name).set(_STATE_VALUES[state])
+
+
+class RpcProviderPool(AsyncBaseProvider):
+    """
+    web3 provider spreading requests over several JSON-RPC endpoints. Each request goes to the endpoint with the
+    best latency/error score; a read request still unanswered after the endpoint's `hedge_percentile` latency is
+    duplicated to the next best endpoint and the first answer wins. Transport errors, rate limits and server errors
+    fail over to the next endpoint, and an endpoint failing `failure_threshold` times in a row is skipped for
+    `cooldown` seconds.
+    """
+
+    def __init__(self, urls: Sequence[str], hedge_percentile: float = 0.95, hedge_min_delay: float = 0.05,
+                 ewma_alpha: float = 0.2, failure_threshold: int = 5, cooldown: float = 30.0,
+                 request_timeout: float = 10.0, provider_factory: Optional[Callable[[str], AsyncBaseProvider]] = None,
+                 logger=None):
+        super().__init__()
+        if not urls:
+            raise ValueError("RpcProviderPool needs at least one endpoint URL")
+        factory = provider_factory or (lambda url: make_http_provider(url, request_timeout))
+        self.endpoints: List[RpcEndpoint] = [
+            RpcEndpoint(url, f"{index}:{urlparse(url).hostname or url}", factory(url), ewma_alpha, failure_threshold,
+                        cooldown)
+            for index, url in enumerate(urls)
+        ]
+        self._hedge_percentile = hedge_percentile
+        self._hedge_min_delay = hedge_min_delay
+        self._logger = logger or logging.getLogger(__name__)
+
+    def __str__(self) -> str:
+        return f"RPC provider pool of {len(self.endpoints)} endpoints"
+
+    def _ranked_endpoints(self) -> List[RpcEndpoint]:
+        known_latencies = [endpoint.ewma_latency for endpoint in self.endpoints if endpoint.ewma_latency is not None]
+        # Unmeasured endpoints rank as average ones so they get traffic and a latency estimate
+        default_latency = sum(known_latencies) / len(known_latencies) if known_latencies else 0.0
+        available = [endpoint for endpoint in self.endpoints if endpoint.is_available()]
+        if not available:
+            # Every circuit is open: try the endpoints anyway rather than failing without a request
+            available = list(self.endpoints)
+        return sorted(available, key=lambda endpoint: endpoint.score(default_latency))
+
+    def _hedge_delay(self, endpoint: RpcEndpoint) -> float:
+        percentile = endpoint.latency_percentile(self._hedge_percentile)
+        return max(self._hedge_min_delay, percentile if percentile is not None else 1.0)
+
+    async def _call(self, endpoint: RpcEndpoint, method: RPCEndpoint, params: Any) -> RPCResponse:
+        endpoint.started()
+        started = time.perf_counter()
+        try:
+            response = await endpoint.provider.make_request(method, params)
+        except asyncio.CancelledError:
+            endpoint.record_cancelled(time.perf_counter() - started)
+            raise
+        except Exception:
+            endpoint.record_failure()
+            raise
+        if isinstance(response, dict) and is_endpoint_error(response.get("error")):
+            endpoint.record_failure()
+            raise RpcEndpointError(response)
+        endpoint.record_success(time.perf_counter() - started)
+        return response
+
+    async def make_request(self, method: RPCEndpoint, params: Any) -> RPCResponse:
+        candidates = self._ranked_endpoints()
+        may_hedge = method in HEDGEABLE_METHODS
+        in_flight: Dict[asyncio.Task, RpcEndpoint] = {}
+        hedge_endpoint: Optional[RpcEndpoint] = None
+        last_error: Optional[BaseException] = None
+        try:
+            while True:
+                if not in_flight:
+                    if not candidates:
+                        # web3 raises the last endpoint's error payload as it would without a pool
+                        if isinstance(last_error, RpcEndpointError):
+                            return last_error.response
+                        raise last_error
+                    primary = candidates.pop(0)
+                    in_flight[asyncio.create_task(self._call(primary, method, params))] = primary
+                can_hedge = may_hedge and hedge_endpoint is None and candidates and len(in_flight) == 1
+                done, _ = await asyncio.wait(in_flight, timeout=self._hedge_delay(primary) if can_hedge else None,
+                                             return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    # The endpoint is slower than it usually is: race a duplicate on the next best one
+                    hedge_endpoint = candidates.pop(0)
+                    in_flight[asyncio.create_task(self._call(hedge_endpoint, method, params))] = hedge_endpoint
+                    continue
+                for task in done:
+                    endpoint = in_flight.pop(task)
+                    if task.exception() is None:
+                        if hedge_endpoint is not None:
+                            RPC_HEDGES.labels("hedge" if endpoint is hedge_endpoint else "primary").inc()
+                        return task.result()
+                    last_error = task.exception()
+                    self._logger.warning(f"JSON-RPC {method} to {endpoint.name} failed: {last_error}")
+        finally:
+            for task in in_flight:
+                task.cancel()
+
+    async def is_connected(self, show_traceback: bool = False) -> bool:
+        for endpoint in self._ranked_endpoints():
+            if await endpoint.provider.is_connected(show_traceback):
+                return True
+        return False
+
+    async def disconnect(self) -> None:
+        for endpoint in self.endpoints:
+            disconnect = getattr(endpoint.provider, "disconnect", None)
+            if disconnect is not None:
+                await disconnect()
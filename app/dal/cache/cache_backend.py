@@ -0,0 +1,16 @@
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional
+
+
+class CacheBackend(ABC):
+    @abstractmethod
+    async def get_many(self, keys: List[str]) -> Dict[str, bytes]:
+        pass
+
+    @abstractmethod
+    async def set_many(self, items: Dict[str, bytes], ttl: Optional[float] = None) -> None:
+        pass
+
+    @abstractmethod
+    async def aclose(self) -> None:
+        pass
@@ -0,0 +1,34 @@
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from app.utils.metrics import CACHE_EVENTS, InstrumentedLRUCache
+from .cache_backend import CacheBackend
+
+
+class MemoryCacheBackend(CacheBackend):
+    """In-process LRU with per-entry expiry. Not shared between worker processes; the reference backend."""
+
+    def __init__(self, maxsize: int, clock: Callable[[], float] = time.time):
+        self._entries = InstrumentedLRUCache(maxsize=maxsize, evictions=CACHE_EVENTS.labels("shared", "eviction"))
+        self._clock = clock
+
+    async def get_many(self, keys: List[str]) -> Dict[str, bytes]:
+        now = self._clock()
+        values: Dict[str, bytes] = {}
+        for key in keys:
+            entry: Optional[Tuple[bytes, float]] = self._entries.get(key)
+            if entry is None:
+                continue
+            if entry[1] <= now:
+                del self._entries[key]
+                continue
+            values[key] = entry[0]
+        return values
+
+    async def set_many(self, items: Dict[str, bytes], ttl: Optional[float] = None) -> None:
+        expires_at = self._clock() + ttl if ttl is not None else float("inf")
+        for key, value in items.items():
+            self._entries[key] = (value, expires_at)
+
+    async def aclose(self) -> None:
+        self._entries.clear()
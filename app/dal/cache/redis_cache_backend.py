@@ -0,0 +1,123 @@
+import asyncio
+from typing import Any, Dict, List, Optional, Sequence, Union
+from urllib.parse import urlsplit
+
+from .cache_backend import CacheBackend
+
+Arg = Union[bytes, str, int]
+
+
+class RedisError(Exception):
+    """Error reply sent by the server."""
+
+
+def _encode_command(args: Sequence[Arg]) -> bytes:
+    parts = [b"*%d\r\n" % len(args)]
+    for arg in args:
+        data = arg if isinstance(arg, bytes) else str(arg).encode()
+        parts.append(b"$%d\r\n%s\r\n" % (len(data), data))
+    return b"".join(parts)
+
+
+async def _read_reply(reader: asyncio.StreamReader) -> Any:
+    line = await reader.readline()
+    if not line.endswith(b"\r\n"):
+        raise ConnectionError("Connection closed by the server")
+    kind, payload = line[:1], line[1:-2]
+    if kind == b"+":
+        return payload.decode()
+    if kind == b"-":
+        return RedisError(payload.decode())
+    if kind == b":":
+        return int(payload)
+    if kind == b"$":
+        length = int(payload)
+        return None if length < 0 else (await reader.readexactly(length + 2))[:-2]
+    if kind == b"*":
+        length = int(payload)
+        return None if length < 0 else [await _read_reply(reader) for _ in range(length)]
+    raise ConnectionError(f"Unexpected reply from the server: {line[:32]!r}")
+
+
+class _RedisConnection:
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self._reader = reader
+        self._writer = writer
+
+    async def execute(self, commands: List[Sequence[Arg]]) -> List[Any]:
+        """Sends `commands` as one pipeline and reads their replies in order."""
+        self._writer.write(b"".join(_encode_command(command) for command in commands))
+        await self._writer.drain()
+        replies = [await _read_reply(self._reader) for _ in commands]
+        # Every reply is read before raising so the connection stays in sync and can be reused
+        for reply in replies:
+            if isinstance(reply, RedisError):
+                raise reply
+        return replies
+
+    def close(self) -> None:
+        self._writer.close()
+
+
+class RedisCacheBackend(CacheBackend):
+    """
+    Cache on any server speaking the Redis protocol (Redis, Valkey, KeyDB, Dragonfly), shared across processes and
+    hosts. Lookups are one MGET, writes one pipeline of SETs. Memory is bounded by the server's maxmemory policy.
+    """
+
+    def __init__(self, url: str, pool_size: int = 4, timeout: float = 0.5):
+        parsed = urlsplit(url)
+        self._host = parsed.hostname or "localhost"
+        self._port = parsed.port or 6379
+        self._password = parsed.password
+        self._db = int(parsed.path.lstrip("/") or 0)
+        self._timeout = timeout
+        self._idle: List[_RedisConnection] = []
+        self._slots = asyncio.Semaphore(max(1, pool_size))
+
+    async def get_many(self, keys: List[str]) -> Dict[str, bytes]:
+        if not keys:
+            return {}
+        values = (await self._execute([("MGET", *keys)]))[0]
+        return {key: value for key, value in zip(keys, values) if value is not None}
+
+    async def set_many(self, items: Dict[str, bytes], ttl: Optional[float] = None) -> None:
+        if not items:
+            return
+        expiry = ("PX", max(1, int(ttl * 1000))) if ttl is not None else ()
+        await self._execute([("SET", key, value, *expiry) for key, value in items.items()])
+
+    async def aclose(self) -> None:
+        while self._idle:
+            self._idle.pop().close()
+
+    async def _execute(self, commands: List[Sequence[Arg]]) -> List[Any]:
+        async with self._slots:
+            connection = self._idle.pop() if self._idle else await asyncio.wait_for(self._connect(), self._timeout)
+            try:
+                replies = await asyncio.wait_for(connection.execute(commands), self._timeout)
+            except RedisError:
+                self._idle.append(connection)
+                raise
+            except BaseException:
+                # A timed out or broken connection may still receive the replies of this pipeline
+                connection.close()
+                raise
+            self._idle.append(connection)
+            return replies
+
+    async def _connect(self) -> _RedisConnection:
+        reader, writer = await asyncio.open_connection(self._host, self._port)
+        connection = _RedisConnection(reader, writer)
+        commands: List[Sequence[Arg]] = []
+        if self._password:
+            commands.append(("AUTH", self._password))
+        if self._db:
+            commands.append(("SELECT", self._db))
+        if commands:
+            try:
+                await connection.execute(commands)
+            except BaseException:
+                connection.close()
+                raise
+        return connection
@@ -0,0 +1,82 @@
+import logging
+from typing import Any, Dict, List, Optional
+
+import orjson
+
+from app.utils.config_loader import config
+from app.utils.metrics import CACHE_EVENTS
+from .cache_backend import CacheBackend
+
+_backend: Optional[CacheBackend] = None
+
+
+class SharedCache:
+    """
+    Namespaced view of the configured cache backend, holding orjson-encoded values. It sits behind the per-process
+    caches of the DALs: they look up their misses here with one multi-get and write what they fetch through. Backend
+    failures are logged and count as misses so a cache outage only costs upstream calls.
+    """
+
+    def __init__(self, backend: CacheBackend, namespace: str, logger=None):
+        self.backend = backend
+        self.namespace = namespace
+        self._prefix = f"{config.shared_cache_key_prefix}{namespace}:"
+        self._logger = logger or logging.getLogger(__name__)
+
+    async def get_many(self, keys: List[str]) -> Dict[str, Any]:
+        if not keys:
+            return {}
+        backend_keys = {self._prefix + key.lower(): key for key in keys}
+        try:
+            found = await self.backend.get_many(list(backend_keys))
+        except Exception as e:
+            CACHE_EVENTS.labels(f"shared_{self.namespace}", "error").inc()
+            self._logger.warning(f"Shared {self.namespace} cache lookup of {len(keys)} keys failed: {e}")
+            return {}
+        CACHE_EVENTS.labels(f"shared_{self.namespace}", "hit").inc(len(found))
+        CACHE_EVENTS.labels(f"shared_{self.namespace}", "miss").inc(len(backend_keys) - len(found))
+        return {backend_keys[key]: orjson.loads(value) for key, value in found.items()}
+
+    async def set_many(self, items: Dict[str, Any], ttl: Optional[float] = None) -> None:
+        if not items:
+            return
+        try:
+            await self.backend.set_many({self._prefix + key.lower(): orjson.dumps(value)
+                                         for key, value in items.items()}, ttl)
+        except Exception as e:
+            CACHE_EVENTS.labels(f"shared_{self.namespace}", "error").inc()
+            self._logger.warning(f"Shared {self.namespace} cache write of {len(items)} keys failed: {e}")
+
+
+def get_cache_backend() -> Optional[CacheBackend]:
+    """The process-wide backend selected by `SHARED_CACHE_BACKEND`, created on first use; None when disabled."""
+    global _backend
+    if _backend is None and config.shared_cache_backend != "none":
+        if config.shared_cache_backend == "memory":
+            from .memory_cache_backend import MemoryCacheBackend
+            _backend = MemoryCacheBackend(config.shared_cache_maxsize)
+        elif config.shared_cache_backend == "sqlite":
+            if not config.shared_cache_sqlite_path:
+                raise ValueError("SHARED_CACHE_BACKEND sqlite needs APPROVALS_DATA_DIR or SHARED_CACHE_SQLITE_PATH")
+            from .sqlite_cache_backend import SqliteCacheBackend
+            _backend = SqliteCacheBackend(config.shared_cache_sqlite_path, config.shared_cache_maxsize)
+        elif config.shared_cache_backend == "redis":
+            from .redis_cache_backend import RedisCacheBackend
+            _backend = RedisCacheBackend(config.shared_cache_redis_url, config.shared_cache_redis_pool_size,
+                                         config.shared_cache_timeout)
+        else:
+            raise ValueError(f"Unknown SHARED_CACHE_BACKEND {config.shared_cache_backend!r}, "
+                             f"expected none, memory, sqlite or redis")
+    return _backend
+
+
+def get_shared_cache(namespace: str) -> Optional[SharedCache]:
+    backend = get_cache_backend()
+    return SharedCache(backend, namespace) if backend is not None else None
+
+
+async def close_cache_backend() -> None:
+    global _backend
+    if _backend is not None:
+        await _backend.aclose()
+        _backend = None
@@ -0,0 +1,81 @@
+import asyncio
+import sqlite3
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+from .cache_backend import CacheBackend
+
+_SCHEMA: str = """
+CREATE TABLE IF NOT EXISTS cache (
+    key TEXT PRIMARY KEY,
+    value BLOB NOT NULL,
+    expires_at REAL
+);
+"""
+# SQLite allows 32766 bound parameters per statement since 3.32, older builds 999
+_MAX_KEYS_PER_QUERY: int = 900
+# Expired and surplus rows are pruned after this many writes rather than on every write
+_PRUNE_EVERY: int = 1000
+
+
+class SqliteCacheBackend(CacheBackend):
+    """
+    Cache in a SQLite file on local disk, shared by every worker process on the host. WAL mode lets readers proceed
+    while another process writes. Roughly the oldest writes are dropped once it holds more than `maxsize` rows.
+    """
+
+    def __init__(self, db_path: str, maxsize: int, clock: Callable[[], float] = time.time):
+        self._maxsize = maxsize
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._conn = sqlite3.connect(db_path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+    async def get_many(self, keys: List[str]) -> Dict[str, bytes]:
+        return await asyncio.to_thread(self._get_many, keys)
+
+    async def set_many(self, items: Dict[str, bytes], ttl: Optional[float] = None) -> None:
+        await asyncio.to_thread(self._set_many, items, ttl)
+
+    async def aclose(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def _get_many(self, keys: List[str]) -> Dict[str, bytes]:
+        now = self._clock()
+        values: Dict[str, bytes] = {}
+        with self._lock:
+            for start in range(0, len(keys), _MAX_KEYS_PER_QUERY):
+                chunk = keys[start:start + _MAX_KEYS_PER_QUERY]
+                rows = self._conn.execute(
+                    f"SELECT key, value FROM cache WHERE key IN ({','.join('?' * len(chunk))}) "
+                    f"AND (expires_at IS NULL OR expires_at > ?)", (*chunk, now)
+                ).fetchall()
+                values.update(rows)
+        return values
+
+    def _set_many(self, items: Dict[str, bytes], ttl: Optional[float]) -> None:
+        expires_at = self._clock() + ttl if ttl is not None else None
+        with self._lock:
+            with self._conn:
+                self._conn.execute("BEGIN")
+                self._conn.executemany("INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+                                       [(key, value, expires_at) for key, value in items.items()])
+            self._writes += len(items)
+            if self._writes >= _PRUNE_EVERY:
+                self._writes = 0
+                self._prune()
+
+    def _prune(self) -> None:
+        with self._conn:
+            self._conn.execute("BEGIN")
+            self._conn.execute("DELETE FROM cache WHERE expires_at <= ?", (self._clock(),))
+            # A replaced row gets a new rowid, so the lowest rowids are the least recently written
+            surplus = self._conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0] - self._maxsize
+            if surplus > 0:
+                self._conn.execute("DELETE FROM cache WHERE rowid IN (SELECT rowid FROM cache ORDER BY rowid LIMIT ?)",
+                                   (surplus,))
@@ -0,0 +1,147 @@
+import mmap
+import os
+import struct
+import tempfile
+import threading
+from typing import Dict, Final, Iterable, NamedTuple, Optional, Tuple
+
+MAGIC: Final[bytes] = b"TOKREG1\x00"
+HEADER_FORMAT: Final[str] = "<8sII"  # magic, number of sorted records, reserved
+HEADER_SIZE: Final[int] = struct.calcsize(HEADER_FORMAT)
+SYMBOL_SIZE: Final[int] = 32
+RECORD_FORMAT: Final[str] = f"<20sBB{SYMBOL_SIZE}s"  # address, decimals, symbol length, symbol
+RECORD_SIZE: Final[int] = struct.calcsize(RECORD_FORMAT)
+UNKNOWN_DECIMALS: Final[int] = 255
+
+
+class TokenMetadata(NamedTuple):
+    symbol: str
+    decimals: Optional[int]
+
+
+def _address_bytes(address: str) -> bytes:
+    return bytes.fromhex(address[2:] if address[:2].lower() == "0x" else address)
+
+
+def _pack_record(address: bytes, symbol: str, decimals: Optional[int]) -> bytes:
+    encoded = symbol.encode("utf-8")[:SYMBOL_SIZE].decode("utf-8", errors="ignore").encode("utf-8")
+    decimals_byte = decimals if decimals is not None and 0 <= decimals < UNKNOWN_DECIMALS else UNKNOWN_DECIMALS
+    return struct.pack(RECORD_FORMAT, address, decimals_byte, len(encoded), encoded)
+
+
+def _unpack_record(record: bytes) -> Tuple[bytes, TokenMetadata]:
+    address, decimals, symbol_length, symbol = struct.unpack(RECORD_FORMAT, record)
+    return address, TokenMetadata(symbol[:symbol_length].decode("utf-8", errors="replace"),
+                                  None if decimals == UNKNOWN_DECIMALS else decimals)
+
+
+class TokenRegistry:
+    """
+    Read-mostly token metadata table stored as fixed-size records: a header, a block of records sorted by 20-byte
+    address that is memory-mapped and binary searched, followed by records appended at runtime (loaded into a dict
+    at startup). Appends use O_APPEND single-record writes so several workers can share one file.
+    """
+
+    def __init__(self, path: str):
+        self._path = path
+        self._lock = threading.Lock()
+        self._mmap: Optional[mmap.mmap] = None
+        self._sorted_count = 0
+        self._appended: Dict[bytes, TokenMetadata] = {}
+        if os.path.exists(path) and os.path.getsize(path) >= HEADER_SIZE:
+            self._load()
+
+    def _load(self) -> None:
+        with open(self._path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self._sorted_count, _ = struct.unpack_from(HEADER_FORMAT, self._mmap, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{self._path} is not a token registry file")
+        tail_start = HEADER_SIZE + self._sorted_count * RECORD_SIZE
+        for offset in range(tail_start, len(self._mmap) - RECORD_SIZE + 1, RECORD_SIZE):
+            address, metadata = _unpack_record(self._mmap[offset:offset + RECORD_SIZE])
+            self._appended[address] = metadata
+
+    def __len__(self) -> int:
+        return self._sorted_count + len(self._appended)
+
+    def get(self, address: str) -> Optional[TokenMetadata]:
+        key = _address_bytes(address)
+        metadata = self._appended.get(key)
+        if metadata is not None or self._mmap is None:
+            return metadata
+        low, high = 0, self._sorted_count
+        while low < high:
+            middle = (low + high) // 2
+            offset = HEADER_SIZE + middle * RECORD_SIZE
+            current = self._mmap[offset:offset + 20]
+            if current < key:
+                low = middle + 1
+            elif current > key:
+                high = middle
+            else:
+                return _unpack_record(self._mmap[offset:offset + RECORD_SIZE])[1]
+        return None
+
+    def get_symbol(self, address: str) -> Optional[str]:
+        metadata = self.get(address)
+        return metadata.symbol if metadata is not None else None
+
+    def append(self, address: str, symbol: str, decimals: Optional[int] = None) -> None:
+        key = _address_bytes(address)
+        with self._lock:
+            if key in self._appended:
+                return
+            self._ensure_file()
+            fd = os.open(self._path, os.O_WRONLY | os.O_APPEND)
+            try:
+                os.write(fd, _pack_record(key, symbol, decimals))
+            finally:
+                os.close(fd)
+            self._appended[key] = TokenMetadata(symbol, decimals)
+
+    def _ensure_file(self) -> None:
+        if os.path.exists(self._path):
+            return
+        # The header is written to a private file and hard-linked into place, so another worker never sees (and
+        # appends to) a file without its header; os.link fails atomically when the registry already exists
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(self._path)))
+        try:
+            try:
+                os.write(fd, struct.pack(HEADER_FORMAT, MAGIC, 0, 0))
+            finally:
+                os.close(fd)
+            os.link(tmp_path, self._path)
+        except FileExistsError:
+            pass
+        finally:
+            os.unlink(tmp_path)
+
+    def items(self) -> Iterable[Tuple[str, TokenMetadata]]:
+        if self._mmap is not None:
+            for index in range(self._sorted_count):
+                offset = HEADER_SIZE + index * RECORD_SIZE
+                address, metadata = _unpack_record(self._mmap[offset:offset + RECORD_SIZE])
+                yield "0x" + address.hex(), metadata
+        for address, metadata in self._appended.items():
+            yield "0x" + address.hex(), metadata
+
+    def close(self) -> None:
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+
+    @staticmethod
+    def build(path: str, tokens: Iterable[Tuple[str, str, Optional[int]]]) -> int:
+        """Writes a registry holding `tokens` as (address, symbol, decimals) in its sorted section."""
+        records: Dict[bytes, bytes] = {}
+        for address, symbol, decimals in tokens:
+            key = _address_bytes(address)
+            records[key] = _pack_record(key, symbol, decimals)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(struct.pack(HEADER_FORMAT, MAGIC, len(records), 0))
+            for key in sorted(records):
+                f.write(records[key])
+        os.replace(tmp_path, path)
+        return len(records)
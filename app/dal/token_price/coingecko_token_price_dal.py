@@ -1,11 +1,23 @@
-from typing import Optional
+import asyncio
+import time
+from typing import Dict, List, Optional, Set
 
 import httpx
-import cachetools
 import logging
 
+from app.dal.cache.shared_cache import get_shared_cache
 from app.dal.token_price.token_price_dal import TokenPriceDAL
+from app.utils.adaptive_limiter import AdaptiveLimiter
+from app.utils.backoff import OVERLOAD_STATUS_CODES, OverloadedError, backoff_delay, get_retry_after, parse_retry_after
 from app.utils.config_loader import config
+from app.utils.fair_scheduler import BATCH, TokenBucket, flow_scope
+from app.utils.metrics import CACHE_EVENTS, IN_FLIGHT, RETRIES, UPSTREAM_ERRORS, stage_timer
+from app.utils.single_flight import SingleFlight
+from app.utils.ttl_cache import FRESH, MISS, STALE, StaleWhileRevalidateCache
+
+# Each address is sent as 42 hex chars plus an url-encoded comma separator
+_ENCODED_ADDRESS_LENGTH = 45
+_CACHE_EVENTS_BY_STATE = {FRESH: "hit", STALE: "stale_hit", MISS: "miss"}
 
 
 class CoingeckoTokenPriceDAL(TokenPriceDAL):
@@ -19,7 +31,29 @@ class CoingeckoTokenPriceDAL(TokenPriceDAL):
     def __init__(self):
         if getattr(self, '_initialized', False):
             return
-        self._price_cache = cachetools.LRUCache(maxsize=config.lru_cache_maxsize)
+        self._price_cache = StaleWhileRevalidateCache(
+            maxsize=config.lru_cache_maxsize,
+            ttl=config.price_cache_ttl,
+            negative_ttl=config.price_cache_negative_ttl,
+            stale_grace=config.price_cache_stale_grace,
+            on_evict=CACHE_EVENTS.labels("price", "eviction").inc
+        )
+        self._shared_cache = get_shared_cache("price")
+        self._client: Optional[httpx.AsyncClient] = None
+        self._limiter = AdaptiveLimiter(
+            "coingecko",
+            initial_limit=config.coingecko_concurrency_initial,
+            min_limit=config.coingecko_concurrency_min,
+            max_limit=config.coingecko_concurrency_max,
+            backoff_ratio=config.adaptive_limit_backoff_ratio,
+            latency_tolerance=config.adaptive_limit_latency_tolerance,
+            token_bucket=(TokenBucket(config.coingecko_rate_limit, config.coingecko_rate_burst)
+                          if config.coingecko_rate_limit > 0 else None)
+        )
+        self._price_flights: SingleFlight[Optional[float]] = SingleFlight()
+        self._refreshing: Set[str] = set()
+        self._background_tasks: Set[asyncio.Task] = set()
+        self._hot_refresh_task: Optional[asyncio.Task] = None
         self._logger = logging.getLogger(__name__)
         self._initialized = True
 
@@ -27,33 +61,167 @@ class CoingeckoTokenPriceDAL(TokenPriceDAL):
     def get_instance(cls):
         return cls()
 
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                timeout=config.coingecko_timeout,
+                limits=httpx.Limits(max_connections=config.coingecko_max_connections,
+                                    max_keepalive_connections=config.coingecko_max_connections)
+            )
+        return self._client
+
+    def start_background_refresh(self) -> None:
+        if self._hot_refresh_task is None or self._hot_refresh_task.done():
+            self._hot_refresh_task = asyncio.create_task(self._refresh_hot_prices_forever())
+
+    async def aclose(self) -> None:
+        for task in [self._hot_refresh_task, *self._background_tasks]:
+            if task is not None:
+                task.cancel()
+        self._hot_refresh_task = None
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def _chunk_addresses(self, token_addresses: List[str]) -> List[List[str]]:
+        budget = config.coingecko_max_url_length - len(config.coingecko_api_url) - len("?contract_addresses=&vs_currencies=usd")
+        per_chunk = max(1, min(config.coingecko_max_addresses_per_request, budget // _ENCODED_ADDRESS_LENGTH))
+        return [token_addresses[start:start + per_chunk] for start in range(0, len(token_addresses), per_chunk)]
+
     async def get_token_price_usd(self, token_address: str) -> Optional[float]:
-        if token_address in self._price_cache:
-            return self._price_cache[token_address]
+        prices = await self.get_token_prices_usd([token_address])
+        return prices.get(token_address)
+
+    async def get_token_prices_usd(self, token_addresses: List[str]) -> Dict[str, Optional[float]]:
+        with stage_timer("prices"):
+            return await self._get_token_prices_usd(token_addresses)
+
+    async def _get_token_prices_usd(self, token_addresses: List[str]) -> Dict[str, Optional[float]]:
+        prices: Dict[str, Optional[float]] = {}
+        missing: List[str] = []
+        stale: List[str] = []
+        for address in dict.fromkeys(token_addresses):
+            state, price, _ = self._price_cache.lookup(address)
+            CACHE_EVENTS.labels("price", _CACHE_EVENTS_BY_STATE[state]).inc()
+            if state == MISS:
+                missing.append(address)
+                continue
+            prices[address] = price
+            if state == STALE:
+                stale.append(address)
+        if stale:
+            self._schedule_refresh(stale)
+        if missing:
+            prices.update(await self._price_flights.do_many(missing, self._fetch_missing_prices))
+        return {address: prices.get(address) for address in token_addresses}
+
+    async def _fetch_missing_prices(self, token_addresses: List[str]) -> Dict[str, Optional[float]]:
+        prices = await self._load_shared_prices(token_addresses)
+        remaining = [address for address in token_addresses if address not in prices]
+        # Chunks go out together; the limiter in _request_prices bounds how many are in flight
+        for chunk_prices in await asyncio.gather(*(self._fetch_prices(chunk)
+                                                   for chunk in self._chunk_addresses(remaining))):
+            prices.update(chunk_prices)
+        return prices
+
+    async def _load_shared_prices(self, token_addresses: List[str]) -> Dict[str, Optional[float]]:
+        if self._shared_cache is None:
+            return {}
+        prices: Dict[str, Optional[float]] = {}
+        now = time.time()
+        for address, (price_usd, fetched_at) in (await self._shared_cache.get_many(token_addresses)).items():
+            # Keeps the age it had when another worker fetched it, so it still expires on time here
+            self._price_cache.set(address, price_usd, age=max(0.0, now - fetched_at))
+            prices[address] = price_usd
+        return prices
+
+    async def _store_shared_prices(self, prices: Dict[str, Optional[float]]) -> None:
+        if self._shared_cache is None:
+            return
+        fetched_at = time.time()
+        found = {address: [price, fetched_at] for address, price in prices.items() if price is not None}
+        not_found = {address: [None, fetched_at] for address, price in prices.items() if price is None}
+        await self._shared_cache.set_many(found, config.price_cache_ttl + config.price_cache_stale_grace)
+        await self._shared_cache.set_many(not_found, config.price_cache_negative_ttl + config.price_cache_stale_grace)
+
+    def get_price_ages(self, token_addresses: List[str]) -> Dict[str, Optional[float]]:
+        return {address: self._price_cache.age(address) for address in token_addresses}
+
+    def _schedule_refresh(self, token_addresses: List[str]) -> None:
+        pending = [address for address in token_addresses if address not in self._refreshing]
+        if not pending:
+            return
+        self._refreshing.update(pending)
+        task = asyncio.create_task(self._refresh(pending))
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+
+    async def _refresh(self, token_addresses: List[str]) -> None:
+        try:
+            await asyncio.gather(*(self._fetch_prices(chunk) for chunk in self._chunk_addresses(token_addresses)))
+        finally:
+            self._refreshing.difference_update(token_addresses)
+
+    async def _refresh_hot_prices_forever(self) -> None:
+        while True:
+            await asyncio.sleep(config.price_hot_refresh_interval)
+            hot_addresses = self._price_cache.hot_keys(config.price_hot_refresh_top_n,
+                                                       expiring_within=config.price_hot_refresh_interval)
+            hot_addresses = [address for address in hot_addresses if address not in self._refreshing]
+            if not hot_addresses:
+                continue
+            self._logger.info(f"Proactively refreshing {len(hot_addresses)} hot token prices")
+            self._refreshing.update(hot_addresses)
+            try:
+                with flow_scope(BATCH):
+                    await self._refresh(hot_addresses)
+            except Exception as e:
+                self._logger.error(f"Hot token price refresh failed: {e}", exc_info=True)
+
+    async def _request_prices(self, params: Dict[str, str]) -> httpx.Response:
+        async with self._limiter.slot():
+            with stage_timer("coingecko_request"), IN_FLIGHT.labels("coingecko_request").track_inprogress():
+                response = await self._get_client().get(config.coingecko_api_url, params=params)
+            if response.status_code in OVERLOAD_STATUS_CODES:
+                # Raised inside the slot so the limiter backs off as well
+                raise OverloadedError(f"Coingecko API returned status code {response.status_code}",
+                                      parse_retry_after(response.headers.get("Retry-After")))
+        return response
+
+    async def _fetch_prices(self, token_addresses: List[str]) -> Dict[str, Optional[float]]:
         params = {
-            "contract_addresses": token_address,
+            "contract_addresses": ",".join(token_addresses),
             "vs_currencies": "usd"
         }
-        api_url = config.coingecko_api_url
+        for attempt in range(config.coingecko_retries + 1):
+            try:
+                response = await self._request_prices(params)
+                break
+            except (OverloadedError, httpx.RequestError) as e:
+                UPSTREAM_ERRORS.labels("coingecko").inc()
+                if attempt == config.coingecko_retries:
+                    self._logger.error(f"HTTP error fetching prices for {len(token_addresses)} tokens: {e}")
+                    return {}
+                RETRIES.labels("coingecko_request").inc()
+                await asyncio.sleep(backoff_delay(attempt, config.approvals_api_retry_delay,
+                                                  config.approvals_api_retry_max_delay, get_retry_after(e)))
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(api_url, params=params)
-                if response.status_code != 200:
-                    self._logger.warning(f"Coingecko API returned status code {response.status_code} for {token_address}")
-                    return None
-                data = response.json()
+            if response.status_code != 200:
+                UPSTREAM_ERRORS.labels("coingecko").inc()
+                self._logger.warning(f"Coingecko API returned status code {response.status_code} "
+                                     f"for {len(token_addresses)} tokens")
+                return {}
+            data = response.json()
+            prices: Dict[str, Optional[float]] = {}
+            for token_address in token_addresses:
                 price_info = data.get(token_address.lower())
-                if price_info and "usd" in price_info:
-                    price_usd = float(price_info["usd"])
-                    self._logger.info(f"Found USD price for {token_address}: {price_usd}")
-                    self._price_cache[token_address] = price_usd
-                    return price_usd
-                self._logger.info(f"No USD price found in Coingecko response for {token_address}")
-                self._price_cache[token_address] = None
-                return None
-        except httpx.RequestError as e:
-            self._logger.error(f"HTTP error fetching price for {token_address}: {e}")
-            return None
+                price_usd = float(price_info["usd"]) if price_info and "usd" in price_info else None
+                self._price_cache.set(token_address, price_usd)
+                prices[token_address] = price_usd
+            self._logger.info(f"Found USD prices for {sum(p is not None for p in prices.values())} "
+                              f"of {len(token_addresses)} tokens")
         except (TypeError, ValueError) as e:
-            self._logger.error(f"Data or parsing error processing price for {token_address}: {e}")
-            return None
+            self._logger.error(f"Data or parsing error processing prices for {len(token_addresses)} tokens: {e}")
+            return {}
+        await self._store_shared_prices(prices)
+        return prices
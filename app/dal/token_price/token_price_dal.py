@@ -1,8 +1,15 @@
 from abc import ABC, abstractmethod
-from typing import Optional
+from typing import Dict, List, Optional
 
 class TokenPriceDAL(ABC):
     @abstractmethod
     async def get_token_price_usd(self, token_address: str) -> Optional[float]:
         pass
 
+    @abstractmethod
+    async def get_token_prices_usd(self, token_addresses: List[str]) -> Dict[str, Optional[float]]:
+        pass
+
+    @abstractmethod
+    def get_price_ages(self, token_addresses: List[str]) -> Dict[str, Optional[float]]:
+        pass
@@ -2,3 +2,4 @@
 
 from app.models.approvals.approvals_request import ApprovalsRequest
 from app.models.approvals.approvals_response import ApprovalsResponse
+from app.models.approvals.approvals_stream_event import ApprovalsStreamEvent
@@ -1,9 +1,12 @@
+from dataclasses import dataclass
 from typing import Optional
 
 from pydantic import BaseModel
 
 
-class ApprovalLog(BaseModel):
+@dataclass(slots=True)
+class ApprovalLog:
+    # Internal record decoded from raw logs, kept as a plain slotted dataclass since it never reaches the API
     block_number: int
     transaction_hash: str
     spender: str
@@ -17,3 +20,4 @@ class Approval(BaseModel):
     spender_address: str
     token_symbol: str
     price_usd: Optional[float] = None
+    price_age_seconds: Optional[float] = None
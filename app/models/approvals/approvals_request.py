@@ -1,6 +1,12 @@
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, Field
+from typing import Literal, Optional
 
 class ApprovalsRequest(BaseModel):
     addresses: list[str]
     include_prices: Optional[bool] = False
+    # Scheduling class of the request's upstream calls, by default batch for large requests
+    priority: Optional[Literal["interactive", "batch"]] = None
+    # Report live allowance() values at one pinned block instead of event amounts, dropping fully spent approvals
+    verify_allowances: Optional[bool] = False
+    # Seconds the client waits: addresses unfinished by then are reported as timed out in errorsByAddress
+    timeout_seconds: Optional[float] = Field(default=None, gt=0)
@@ -0,0 +1,11 @@
+from typing import Optional
+
+from pydantic import BaseModel
+
+from app.models.approvals.approvals import Approval
+
+
+class ApprovalsStreamEvent(BaseModel):
+    address: str
+    approvals: list[Approval]
+    error: Optional[str] = None
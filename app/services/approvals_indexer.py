@@ -0,0 +1,153 @@
+import asyncio
+import logging
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from app.dal.approvals.approvals_dal import ApprovalsDAL
+from app.models.approvals.approvals import Approval, ApprovalLog
+from app.utils.config_loader import config
+from app.utils.fair_scheduler import BATCH, flow_scope
+from app.utils.log_processor import process_approval_logs, reduce_latest_approvals
+from app.utils.metrics import CACHE_EVENTS, stage_timer
+
+
+def read_watchlist(path: str) -> List[str]:
+    """Reads one owner address per line, ignoring blank lines and `#` comments."""
+    with open(path, encoding="utf-8") as f:
+        return [line.split("#", 1)[0].strip() for line in f if line.split("#", 1)[0].strip()]
+
+
+class _IndexedOwner:
+    __slots__ = ("confirmed", "unconfirmed_count", "latest_logs", "approvals")
+
+    def __init__(self):
+        # Latest approval per (token, spender) up to the indexer's confirmed block
+        self.confirmed: Dict[Tuple[str, str], ApprovalLog] = {}
+        self.unconfirmed_count = 0
+        self.latest_logs: List[ApprovalLog] = []
+        self.approvals: Optional[List[Approval]] = None
+
+
+class ApprovalsIndexer:
+    """
+    Follows new blocks for a watch-set of owners and keeps their latest approvals in memory. Every poll fetches the
+    Approval logs of all watched owners in one ranged eth_getLogs scan starting `reorg_depth` blocks below the head
+    of the previous poll: logs buried deeper are folded into the confirmed state, the newer tail is rebuilt from
+    scratch each time so logs dropped by a reorg disappear.
+    """
+    _instance = None
+
+    def __new__(cls, *args, **kwargs):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+        return cls._instance
+
+    def __init__(self, dal: ApprovalsDAL, logger=None):
+        if getattr(self, '_initialized', False):
+            return
+        self.dal = dal
+        self._owners: Dict[str, _IndexedOwner] = {}
+        self._pending: Set[str] = set()
+        self._confirmed_block: Optional[int] = None
+        self._head_block: Optional[int] = None
+        self._poll_task: Optional[asyncio.Task] = None
+        self._logger = logger or logging.getLogger(__name__)
+        self._initialized = True
+
+    @classmethod
+    def get_instance(cls, dal: ApprovalsDAL):
+        return cls(dal)
+
+    @property
+    def head_block(self) -> Optional[int]:
+        return self._head_block
+
+    def watch(self, owner_addresses: Iterable[str]) -> None:
+        """Registers owners; they are backfilled on the next poll and served from the index afterwards."""
+        for owner_address in owner_addresses:
+            key = owner_address.lower()
+            if key not in self._owners:
+                self._pending.add(key)
+
+    def unwatch(self, owner_addresses: Iterable[str]) -> None:
+        for owner_address in owner_addresses:
+            key = owner_address.lower()
+            self._owners.pop(key, None)
+            self._pending.discard(key)
+
+    def is_indexed(self, owner_address: str) -> bool:
+        indexed_owner = self._owners.get(owner_address.lower())
+        return indexed_owner is not None and indexed_owner.approvals is not None
+
+    def get_approval_logs(self, owner_address: str) -> Optional[List[ApprovalLog]]:
+        """Latest approval logs of a watched owner, None if the owner is not (yet) indexed."""
+        indexed_owner = self._owners.get(owner_address.lower())
+        return indexed_owner.latest_logs if indexed_owner is not None else None
+
+    def get_approvals(self, owner_address: str) -> Optional[List[Approval]]:
+        """Approvals of a watched owner without prices, None if the owner is not (yet) indexed."""
+        indexed_owner = self._owners.get(owner_address.lower())
+        approvals = indexed_owner.approvals if indexed_owner is not None else None
+        CACHE_EVENTS.labels("indexer", "hit" if approvals is not None else "miss").inc()
+        return approvals
+
+    def start(self) -> None:
+        if self._poll_task is None or self._poll_task.done():
+            self._poll_task = asyncio.create_task(self._poll_forever())
+
+    async def stop(self) -> None:
+        if self._poll_task is not None:
+            self._poll_task.cancel()
+            await asyncio.gather(self._poll_task, return_exceptions=True)
+            self._poll_task = None
+
+    async def _poll_forever(self) -> None:
+        while True:
+            try:
+                with flow_scope(BATCH):
+                    await self.poll()
+            except Exception as e:
+                self._logger.error(f"Approvals indexer poll failed: {e}", exc_info=True)
+            await asyncio.sleep(config.approvals_indexer_poll_interval)
+
+    async def poll(self) -> None:
+        with stage_timer("indexer_poll"):
+            head_block = await self.dal.get_block_number()
+            safe_block = head_block - config.approvals_indexer_reorg_depth
+            # Owners registered since the last poll are scanned from genesis, the others from the confirmed block
+            pending = sorted(self._pending)
+            known = list(self._owners)
+            scans = [(pending, 0)]
+            if self._confirmed_block is not None:
+                scans.append((known, self._confirmed_block + 1))
+            results = await asyncio.gather(*(
+                self.dal.fetch_approval_logs_range(owners, from_block, head_block, split_block=safe_block)
+                for owners, from_block in scans if owners
+            ))
+            new_logs_by_owner: Dict[str, List[ApprovalLog]] = {}
+            for result in results:
+                for owner_address, approval_logs in result.items():
+                    new_logs_by_owner[owner_address.lower()] = approval_logs
+
+            for owner_address in pending:
+                if owner_address in self._pending:
+                    self._owners[owner_address] = _IndexedOwner()
+            self._pending.difference_update(pending)
+            confirmed_block = max(safe_block, self._confirmed_block or 0)
+            for owner_address, indexed_owner in list(self._owners.items()):
+                await self._fold(indexed_owner, new_logs_by_owner.get(owner_address, []), safe_block)
+            self._confirmed_block = confirmed_block
+            self._head_block = head_block
+        self._logger.info(f"Indexed {len(self._owners)} watched owners up to block {head_block}")
+
+    async def _fold(self, indexed_owner: _IndexedOwner, new_logs: List[ApprovalLog], safe_block: int) -> None:
+        # A previous unconfirmed tail is always re-fetched, so no new logs and no old tail means nothing changed
+        if not new_logs and not indexed_owner.unconfirmed_count and indexed_owner.approvals is not None:
+            return
+        reduce_latest_approvals((log for log in new_logs if log.block_number <= safe_block), indexed_owner.confirmed)
+        unconfirmed_logs = [log for log in new_logs if log.block_number > safe_block]
+        latest_logs = list(reduce_latest_approvals(unconfirmed_logs, dict(indexed_owner.confirmed)).values())
+        approvals = await process_approval_logs(latest_logs, self.dal.get_token_symbol,
+                                                get_token_symbols=self.dal.get_token_symbols)
+        indexed_owner.unconfirmed_count = len(unconfirmed_logs)
+        indexed_owner.latest_logs = latest_logs
+        indexed_owner.approvals = approvals
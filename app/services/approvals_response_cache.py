@@ -0,0 +1,114 @@
+import hashlib
+import json
+import logging
+import time
+from typing import Awaitable, Callable, NamedTuple, Optional
+
+from app.dal.approvals.approvals_dal import ApprovalsDAL
+from app.models.approvals.approvals_request import ApprovalsRequest
+from app.models.approvals.approvals_response import ApprovalsResponse
+from app.utils.approvals_json import encode_approvals_response
+from app.utils.config_loader import config
+from app.utils.metrics import CACHE_EVENTS, InstrumentedLRUCache
+from app.utils.single_flight import SingleFlight
+
+
+class CachedResponse(NamedTuple):
+    block_number: int
+    etag: Optional[str]  # None for responses that were not stored, so clients cannot revalidate them
+    body: bytes
+
+
+class ApprovalsResponseCache:
+    """
+    Serialized `/get_approvals` responses keyed by the normalized request and pinned to the head block they were
+    computed at. An entry is reused while the head is at most `response_cache_max_block_lag` blocks ahead of it, and
+    its ETag (block number plus request key) lets clients revalidate with If-None-Match without a body.
+    """
+    _instance = None
+
+    def __new__(cls, *args, **kwargs):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+        return cls._instance
+
+    def __init__(self, dal: ApprovalsDAL, clock: Callable[[], float] = time.monotonic, logger=None):
+        if getattr(self, '_initialized', False):
+            return
+        self.dal = dal
+        self._entries = InstrumentedLRUCache(maxsize=config.response_cache_maxsize,
+                                             evictions=CACHE_EVENTS.labels("response", "eviction"))
+        self._head_block: Optional[int] = None
+        self._head_checked_at = float("-inf")
+        self._head_flights: SingleFlight[int] = SingleFlight()
+        self._response_flights: SingleFlight[CachedResponse] = SingleFlight()
+        self._clock = clock
+        self._logger = logger or logging.getLogger(__name__)
+        self._initialized = True
+
+    @classmethod
+    def get_instance(cls, dal: ApprovalsDAL):
+        return cls(dal)
+
+    @staticmethod
+    def get_key(request: ApprovalsRequest) -> str:
+        # Address order and duplicates do not change the response, the scheduling priority does not either
+        normalized = {"addresses": sorted(set(request.addresses)), "include_prices": bool(request.include_prices),
+                      "verify_allowances": bool(request.verify_allowances)}
+        return hashlib.sha256(json.dumps(normalized, separators=(",", ":")).encode()).hexdigest()
+
+    @staticmethod
+    def get_etag(key: str, block_number: int) -> str:
+        return f'"{block_number}-{key[:16]}"'
+
+    def is_fresh(self, block_number: int, head_block: int) -> bool:
+        return head_block - block_number <= config.response_cache_max_block_lag
+
+    async def get_head_block(self) -> Optional[int]:
+        """Head block, re-read at most every `response_cache_head_ttl` seconds. None if it cannot be read."""
+        if self._clock() - self._head_checked_at < config.response_cache_head_ttl:
+            return self._head_block
+        try:
+            self._head_block = await self._head_flights.do("head", self.dal.get_block_number)
+        except Exception as e:
+            self._logger.warning(f"Could not read the head block, serving uncached: {e}")
+            return None
+        self._head_checked_at = self._clock()
+        return self._head_block
+
+    def get_not_modified_etag(self, key: str, if_none_match: Optional[str], head_block: int) -> Optional[str]:
+        """The stored entry's ETag if the client sent it and it is still fresh at `head_block`, so a 304 can be sent."""
+        if not if_none_match:
+            return None
+        cached: Optional[CachedResponse] = self._entries.get(key)
+        if cached is None or not self.is_fresh(cached.block_number, head_block):
+            return None
+        if cached.etag in (candidate.strip().removeprefix("W/") for candidate in if_none_match.split(",")):
+            CACHE_EVENTS.labels("response", "not_modified").inc()
+            return cached.etag
+        return None
+
+    async def get_response(self, key: str, request: ApprovalsRequest, head_block: int,
+                           compute: Callable[[ApprovalsRequest], Awaitable[ApprovalsResponse]]) -> CachedResponse:
+        cached: Optional[CachedResponse] = self._entries.get(key)
+        if cached is not None and self.is_fresh(cached.block_number, head_block):
+            CACHE_EVENTS.labels("response", "hit").inc()
+            return cached
+        CACHE_EVENTS.labels("response", "miss").inc()
+        # Identical requests arriving together, e.g. dashboards polling in sync, are computed once. Requests with
+        # another deadline do not join the flight, they would get its partial response
+        return await self._response_flights.do((key, head_block, request.timeout_seconds),
+                                               lambda: self._compute(key, request, head_block, compute))
+
+    async def _compute(self, key: str, request: ApprovalsRequest, head_block: int,
+                       compute: Callable[[ApprovalsRequest], Awaitable[ApprovalsResponse]]) -> CachedResponse:
+        response = await compute(request)
+        body = encode_approvals_response(response, bool(request.include_prices))
+        # Failed addresses are retried on the next request rather than pinned until the next block, so responses
+        # with errors are neither stored nor given an ETag to revalidate with
+        if response.errorsByAddress:
+            return CachedResponse(head_block, None, body)
+        cached = CachedResponse(head_block, self.get_etag(key, head_block), body)
+        self._entries[key] = cached
+        return cached
+
@@ -1,13 +1,24 @@
 import asyncio
+import functools
+import logging
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+from app.services.approvals_indexer import ApprovalsIndexer
 from app.services.approvals_service_base import ApprovalsServiceBase
+from app.utils.backoff import backoff_delay, get_retry_after
 from app.utils.config_loader import config
-from app.utils.log_processor import process_approval_logs
+from app.utils.fair_scheduler import BATCH, INTERACTIVE, flow_context, flow_scope
+from app.utils.log_processor import approval_key, process_approval_logs
+from app.utils.metrics import DEADLINE_EXCEEDED, IN_FLIGHT, LOGS_PER_OWNER, RETRIES, stage_timer
 from app.dal.approvals.approvals_dal import ApprovalsDAL
 from app.models.approvals.approvals import Approval, ApprovalLog
 from app.models.approvals.approvals_request import ApprovalsRequest
 from app.models.approvals.approvals_response import ApprovalsResponse
+from app.models.approvals.approvals_stream_event import ApprovalsStreamEvent
 from app.dal.token_price.coingecko_token_price_dal import CoingeckoTokenPriceDAL
 
+DEADLINE_EXCEEDED_ERROR = "Request deadline exceeded before this address finished"
+
 
 class ApprovalsService(ApprovalsServiceBase):
     _instance = None
@@ -17,56 +28,199 @@ class ApprovalsService(ApprovalsServiceBase):
             cls._instance = super().__new__(cls)
         return cls._instance
 
-    def __init__(self, dal: ApprovalsDAL, token_price_dal: CoingeckoTokenPriceDAL):
+    def __init__(self, dal: ApprovalsDAL, token_price_dal: CoingeckoTokenPriceDAL,
+                 indexer: Optional[ApprovalsIndexer] = None):
         if getattr(self, '_initialized', False):
             return
         self.dal = dal
         self.token_price_dal = token_price_dal
+        self.indexer = indexer
+        self._logger = logging.getLogger(__name__)
         self._initialized = True
 
     @classmethod
-    def get_instance(cls, dal: ApprovalsDAL, token_price_dal=None):
-        return cls(dal, token_price_dal)
+    def get_instance(cls, dal: ApprovalsDAL, token_price_dal=None, indexer: Optional[ApprovalsIndexer] = None):
+        return cls(dal, token_price_dal, indexer)
 
     @staticmethod
     def _is_latest_approval(new_log: ApprovalLog, current_log: ApprovalLog) -> bool:
         return (new_log.block_number, new_log.log_index or 0) > (current_log.block_number, current_log.log_index or 0)
 
     async def _fetch_for_address(self, owner_address: str, approvals_by_address: dict, errors_by_address: dict,
-                                 semaphore: asyncio.Semaphore, include_prices: bool = False):
+                                 include_prices: bool = False, prefetched_logs: Optional[List[ApprovalLog]] = None,
+                                 verify_block: Optional[int] = None, deadline: Optional[float] = None):
+        if _is_expired(deadline):
+            self._set_deadline_exceeded(owner_address, approvals_by_address, errors_by_address)
+            return
+        # Watched owners are answered from the in-memory index, only prices and allowances still have to be looked up
+        indexed_approvals = self.indexer.get_approvals(owner_address) if self.indexer is not None else None
+        if indexed_approvals is not None:
+            if not include_prices and verify_block is None:
+                approvals_by_address[owner_address] = list(indexed_approvals)
+                return
+            prefetched_logs = self.indexer.get_approval_logs(owner_address)
+        loop = asyncio.get_running_loop()
         last_exception = None
         for attempt in range(config.approvals_api_retries):
+            attempt_started = loop.time()
             try:
-                async with semaphore:
-                    approval_logs: list[ApprovalLog] = await self.dal.fetch_approval_logs(owner_address)
-                    approvals_by_address[owner_address] = await process_approval_logs(
-                        approval_logs,
-                        self.dal.get_token_symbol,
-                        get_token_price_usd=self.token_price_dal.get_token_price_usd,
-                        include_prices=include_prices
-                    )
+                with IN_FLIGHT.labels("address").track_inprogress():
+                    if prefetched_logs is not None and attempt == 0:
+                        approval_logs: list[ApprovalLog] = prefetched_logs
+                    else:
+                        with stage_timer("fetch_approval_logs"):
+                            async with asyncio.timeout_at(deadline):
+                                approval_logs = await self.dal.fetch_approval_logs(owner_address)
+                    LOGS_PER_OWNER.observe(len(approval_logs))
+                    with stage_timer("process_approval_logs"):
+                        approvals_by_address[owner_address] = await process_approval_logs(
+                            approval_logs,
+                            self.dal.get_token_symbol,
+                            get_token_price_usd=self.token_price_dal.get_token_price_usd,
+                            include_prices=include_prices,
+                            get_token_symbols=self.dal.get_token_symbols,
+                            get_token_prices_usd=self.token_price_dal.get_token_prices_usd,
+                            get_price_ages=self.token_price_dal.get_price_ages,
+                            get_allowances=(functools.partial(self._get_allowances, owner_address, verify_block)
+                                            if verify_block is not None else None),
+                            deadline=deadline
+                        )
                 return
             except Exception as e:
                 last_exception = e
+                if _is_expired(deadline):
+                    self._set_deadline_exceeded(owner_address, approvals_by_address, errors_by_address)
+                    return
                 if attempt < config.approvals_api_retries - 1:
-                    await asyncio.sleep(config.approvals_api_retry_delay)
+                    delay = backoff_delay(attempt, config.approvals_api_retry_delay,
+                                          config.approvals_api_retry_max_delay, get_retry_after(e))
+                    # A retry expected to outlast the deadline would only hold the response, the error is reported
+                    if deadline is not None and loop.time() + delay + (loop.time() - attempt_started) > deadline:
+                        break
+                    RETRIES.labels("fetch_address").inc()
+                    with stage_timer("retry_sleep"):
+                        await asyncio.sleep(delay)
 
         approvals_by_address[owner_address] = []
         errors_by_address[owner_address] = str(last_exception)
 
+    @staticmethod
+    def _set_deadline_exceeded(owner_address: str, approvals_by_address: dict, errors_by_address: dict):
+        DEADLINE_EXCEEDED.inc()
+        approvals_by_address[owner_address] = []
+        errors_by_address[owner_address] = DEADLINE_EXCEEDED_ERROR
+
+    async def _get_allowances(self, owner_address: str, block_number: int,
+                              approval_logs: List[ApprovalLog]) -> Dict[Tuple[str, str], Optional[int]]:
+        # Approvals emitted after the pinned block keep their event amount, the allowance read there predates them
+        pinned_logs = [log for log in approval_logs if log.block_number <= block_number]
+        if not pinned_logs:
+            return {}
+        with stage_timer("allowances"):
+            allowances = await self.dal.get_allowances(
+                owner_address, [(log.token_address, log.spender) for log in pinned_logs], block_number
+            )
+        return {approval_key(log): allowances.get((log.token_address, log.spender)) for log in pinned_logs}
+
+    async def _get_verify_block(self, request: ApprovalsRequest, deadline: Optional[float] = None) -> Optional[int]:
+        """Block every allowance of the request is read at, None unless the request verifies allowances."""
+        if not getattr(request, 'verify_allowances', False):
+            return None
+        try:
+            with stage_timer("verify_block"):
+                async with asyncio.timeout_at(deadline):
+                    return await self.dal.get_block_number()
+        except TimeoutError:
+            if not _is_expired(deadline):
+                raise
+            # Nothing can be verified in time: every address of the request then reports the deadline
+            return None
+
+    @staticmethod
+    def _get_deadline(request: ApprovalsRequest) -> Optional[float]:
+        """Event loop time the request's work is cancelled at, None when neither the request nor the config sets one."""
+        timeout = getattr(request, 'timeout_seconds', None) or config.approvals_request_timeout
+        if timeout is None:
+            return None
+        return asyncio.get_running_loop().time() + max(0.0, timeout - config.approvals_deadline_margin)
+
+    async def _prefetch_logs(self, addresses: List[str],
+                             deadline: Optional[float] = None) -> Dict[str, List[ApprovalLog]]:
+        unique_addresses = list(dict.fromkeys(addresses))
+        if len(unique_addresses) < config.approvals_batch_min_addresses:
+            return {}
+        try:
+            with stage_timer("fetch_approval_logs_batch"):
+                async with asyncio.timeout_at(deadline):
+                    return await self.dal.fetch_approval_logs_batch(unique_addresses)
+        except Exception as e:
+            # Addresses without prefetched logs fall back to one fetch_approval_logs call each
+            self._logger.warning(f"Batched log fetch for {len(unique_addresses)} addresses failed: {e}")
+            return {}
+
+    @staticmethod
+    def _get_priority(request: ApprovalsRequest) -> str:
+        priority = getattr(request, 'priority', None)
+        if priority is not None:
+            return priority
+        return BATCH if len(request.addresses) >= config.approvals_batch_priority_min_addresses else INTERACTIVE
+
     async def get_latest_approvals(self, request: ApprovalsRequest) -> ApprovalsResponse:
         approvals_by_address: dict[str, list[Approval]] = {}
         errors_by_address: dict[str, str] = {}
-        semaphore = asyncio.Semaphore(config.approvals_service_concurrency_limit)
         include_prices = bool(getattr(request, 'include_prices', False))
-        await asyncio.gather(
-            *(self._fetch_for_address(addr, approvals_by_address, errors_by_address, semaphore, include_prices=include_prices) for addr in
-              request.addresses))
+        deadline = self._get_deadline(request)
+        # Upstream calls of this request, including those of the tasks gathered below, share one fair-queue flow
+        with flow_scope(self._get_priority(request)):
+            prefetched_logs = await self._prefetch_logs([
+                address for address in request.addresses
+                if self.indexer is None or not self.indexer.is_indexed(address)
+            ], deadline)
+            verify_block = await self._get_verify_block(request, deadline)
+            await asyncio.gather(
+                *(self._fetch_for_address(addr, approvals_by_address, errors_by_address, include_prices=include_prices,
+                                          prefetched_logs=prefetched_logs.get(addr), verify_block=verify_block,
+                                          deadline=deadline)
+                  for addr in request.addresses))
+
+        # Price fields of a request without prices are left out when the response is encoded
+        return ApprovalsResponse.model_construct(approvalsByAddress=approvals_by_address,
+                                                 errorsByAddress=errors_by_address)
+
+    async def stream_latest_approvals(self, request: ApprovalsRequest) -> AsyncIterator[ApprovalsStreamEvent]:
+        include_prices = bool(getattr(request, 'include_prices', False))
+        addresses = list(dict.fromkeys(request.addresses))
+        pending_addresses = iter(addresses)
+        deadline = self._get_deadline(request)
+        with flow_scope(self._get_priority(request)):
+            verify_block = await self._get_verify_block(request, deadline)
+        # Workers block on the bounded queue when the client reads slowly, so no new addresses are started
+        events: asyncio.Queue = asyncio.Queue(maxsize=config.approvals_stream_queue_size)
+
+        async def worker():
+            for owner_address in pending_addresses:
+                approvals_by_address: dict[str, list[Approval]] = {}
+                errors_by_address: dict[str, str] = {}
+                await self._fetch_for_address(owner_address, approvals_by_address, errors_by_address,
+                                              include_prices=include_prices, verify_block=verify_block,
+                                              deadline=deadline)
+                await events.put(ApprovalsStreamEvent.model_construct(address=owner_address,
+                                                                      approvals=approvals_by_address[owner_address],
+                                                                      error=errors_by_address.get(owner_address)))
+
+        # The generator may resume in another context, so the workers get the request's flow explicitly
+        context = flow_context(self._get_priority(request))
+        workers = [asyncio.create_task(worker(), context=context)
+                   for _ in range(min(config.approvals_stream_max_in_flight, len(addresses)))]
+        try:
+            for _ in addresses:
+                yield await events.get()
+        finally:
+            # Runs on completion as well as when the client disconnects and the generator is closed
+            for task in workers:
+                task.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
 
-        if not include_prices:
-            for approvals in approvals_by_address.values():
-                for approval in approvals:
-                    if hasattr(approval, 'price_usd'):
-                        delattr(approval, 'price_usd')
 
-        return ApprovalsResponse(approvalsByAddress=approvals_by_address, errorsByAddress=errors_by_address)
+def _is_expired(deadline: Optional[float]) -> bool:
+    return deadline is not None and asyncio.get_running_loop().time() >= deadline
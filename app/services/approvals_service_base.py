@@ -1,9 +1,14 @@
 from abc import ABC, abstractmethod
+from typing import AsyncIterator
 
-from app.models import ApprovalsResponse, ApprovalsRequest
+from app.models import ApprovalsResponse, ApprovalsRequest, ApprovalsStreamEvent
 
 
 class ApprovalsServiceBase(ABC):
     @abstractmethod
     async def get_latest_approvals(self, request: ApprovalsRequest) -> ApprovalsResponse:
         pass
+
+    @abstractmethod
+    def stream_latest_approvals(self, request: ApprovalsRequest) -> AsyncIterator[ApprovalsStreamEvent]:
+        pass
@@ -0,0 +1,152 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Callable, Dict, Final, List, Optional
+
+from app.utils.backoff import is_overload_error
+from app.utils.fair_scheduler import FairQueue, TokenBucket, current_flow
+from app.utils.metrics import Counter, Gauge, STAGE_DURATION, stage_timer
+
+CONCURRENCY_LIMIT: Final = Gauge(
+    "approvals_concurrency_limit", "Current adaptive concurrency limit per upstream.", ["upstream"]
+)
+LIMITER_WAITING: Final = Gauge(
+    "approvals_concurrency_waiting", "Calls queued for a free slot of the upstream's limiter.", ["upstream"]
+)
+LIMIT_CHANGES: Final = Counter(
+    "approvals_concurrency_limit_changes_total", "Adaptive limit changes by upstream and reason.",
+    ["upstream", "reason"]
+)
+
+
+class AdaptiveLimiter:
+    """
+    Process-wide concurrency limit for one upstream that adapts in AIMD style. Every successful call while the
+    limit is in use grows it by one slot per limit's worth of calls. An overload error (429, 503, timeout) or a
+    short-term latency more than `latency_tolerance` times the long-term latency multiplies it by `backoff_ratio`;
+    calls that were already in flight when it was cut do not cut it again. Latency is tracked per call `kind`, so a
+    burst of slow calls of one kind (e.g. wide eth_getLogs) is not mistaken for congestion of fast ones.
+
+    Calls waiting for a slot are served fairly across flows (requests) and priority classes, see `FairQueue`, and an
+    optional `token_bucket` caps the rate at which slots start calls.
+    """
+
+    def __init__(self, name: str, initial_limit: int, min_limit: int, max_limit: int, backoff_ratio: float = 0.5,
+                 latency_tolerance: float = 2.0, token_bucket: Optional[TokenBucket] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        self.name = name
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self._limit = float(min(self.max_limit, max(self.min_limit, initial_limit)))
+        self._backoff_ratio = backoff_ratio
+        self._latency_tolerance = latency_tolerance
+        self._in_flight = 0
+        self._waiters: FairQueue[asyncio.Future] = FairQueue()
+        self._token_bucket = token_bucket
+        # kind -> [short-term, long-term] latency EWMA
+        self._latencies: Dict[str, List[float]] = {}
+        self._last_decrease = float("-inf")
+        self._clock = clock
+        CONCURRENCY_LIMIT.labels(name).set(self.limit)
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    @property
+    def waiting(self) -> int:
+        return len(self._waiters)
+
+    async def acquire(self) -> None:
+        if self._in_flight < self.limit and not self._waiters:
+            self._in_flight += 1
+            return
+        waiter = asyncio.get_running_loop().create_future()
+        flow = current_flow()
+        self._waiters.push(waiter, flow)
+        LIMITER_WAITING.labels(self.name).set(len(self._waiters))
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over just as the caller was cancelled: pass it on
+                self._in_flight -= 1
+                self._wake_waiters()
+            else:
+                self._waiters.remove(waiter, flow)
+            raise
+        finally:
+            LIMITER_WAITING.labels(self.name).set(len(self._waiters))
+
+    def release(self, started: float, latency: Optional[float] = None, overloaded: bool = False,
+                kind: str = "default") -> None:
+        """Frees the slot of a call started at `started`; `latency` is None for calls that failed or were cancelled."""
+        self._in_flight -= 1
+        if overloaded:
+            self._decrease(started, "overload")
+        elif latency is not None:
+            self._observe_latency(started, latency, kind)
+        self._wake_waiters()
+
+    @asynccontextmanager
+    async def slot(self, kind: str = "default") -> AsyncIterator[None]:
+        wait_started = time.perf_counter()
+        await self.acquire()
+        STAGE_DURATION.labels(f"{self.name}_limiter_wait").observe(time.perf_counter() - wait_started)
+        try:
+            if self._token_bucket is not None:
+                with stage_timer(f"{self.name}_rate_limit_wait"):
+                    await self._token_bucket.acquire()
+        except BaseException:
+            self.release(self._clock())
+            raise
+        started = self._clock()
+        try:
+            yield
+        except Exception as e:
+            self.release(started, overloaded=is_overload_error(e))
+            raise
+        except BaseException:
+            self.release(started)
+            raise
+        self.release(started, latency=self._clock() - started, kind=kind)
+
+    def _observe_latency(self, started: float, latency: float, kind: str) -> None:
+        latencies = self._latencies.get(kind)
+        if latencies is None:
+            latencies = self._latencies[kind] = [latency, latency]
+        else:
+            latencies[0] = 0.2 * latency + 0.8 * latencies[0]
+            latencies[1] = 0.02 * latency + 0.98 * latencies[1]
+        if latencies[0] > latencies[1] * self._latency_tolerance:
+            self._decrease(started, "latency")
+        elif self._in_flight + 1 >= self._limit / 2:
+            # Only grow while the limit is actually used, otherwise it would drift up without any evidence
+            self._set_limit(self._limit + 1 / self._limit, "increase")
+
+    def _decrease(self, started: float, reason: str) -> None:
+        if started <= self._last_decrease:
+            # The call was sent under the previous, higher limit: that congestion was already acted on
+            return
+        self._last_decrease = self._clock()
+        for latencies in self._latencies.values():
+            latencies[0] = latencies[1]
+        self._set_limit(self._limit * self._backoff_ratio, reason)
+
+    def _set_limit(self, limit: float, reason: str) -> None:
+        previous = self.limit
+        self._limit = min(float(self.max_limit), max(float(self.min_limit), limit))
+        if self.limit != previous:
+            LIMIT_CHANGES.labels(self.name, reason).inc()
+            CONCURRENCY_LIMIT.labels(self.name).set(self.limit)
+
+    def _wake_waiters(self) -> None:
+        while self._waiters and self._in_flight < self.limit:
+            waiter = self._waiters.pop()
+            if not waiter.done():
+                self._in_flight += 1
+                waiter.set_result(None)
@@ -0,0 +1,53 @@
+from typing import Any, Callable, Dict
+
+import orjson
+
+from app.models.approvals.approvals import Approval
+from app.models.approvals.approvals_response import ApprovalsResponse
+from app.models.approvals.approvals_stream_event import ApprovalsStreamEvent
+
+MEDIA_TYPE = "application/json"
+
+
+# orjson calls these for each Approval while encoding, so only one small dict is alive at a time and the models
+# are not serialized through pydantic a second time
+def _approval_with_prices(approval: Approval) -> Dict[str, Any]:
+    if not isinstance(approval, Approval):
+        raise TypeError(f"Type is not JSON serializable: {type(approval).__name__}")
+    return {
+        "amount": approval.amount,
+        "spender_address": approval.spender_address,
+        "token_symbol": approval.token_symbol,
+        "price_usd": approval.price_usd,
+        "price_age_seconds": approval.price_age_seconds,
+    }
+
+
+def _approval_without_prices(approval: Approval) -> Dict[str, Any]:
+    if not isinstance(approval, Approval):
+        raise TypeError(f"Type is not JSON serializable: {type(approval).__name__}")
+    return {
+        "amount": approval.amount,
+        "spender_address": approval.spender_address,
+        "token_symbol": approval.token_symbol,
+    }
+
+
+def _get_default(include_prices: bool) -> Callable[[Approval], Dict[str, Any]]:
+    return _approval_with_prices if include_prices else _approval_without_prices
+
+
+def encode_approvals_response(response: ApprovalsResponse, include_prices: bool) -> bytes:
+    """JSON body of `response`; price fields are only written when they were requested."""
+    return orjson.dumps({
+        "approvalsByAddress": response.approvalsByAddress,
+        "errorsByAddress": response.errorsByAddress,
+    }, default=_get_default(include_prices))
+
+
+def encode_stream_event(event: ApprovalsStreamEvent, include_prices: bool) -> bytes:
+    return orjson.dumps({
+        "address": event.address,
+        "approvals": event.approvals,
+        "error": event.error,
+    }, default=_get_default(include_prices))
@@ -0,0 +1,85 @@
+import random
+import time
+from email.utils import parsedate_to_datetime
+from typing import Callable, Final, FrozenSet, Iterator, Optional
+
+import httpx
+
+# Status codes meaning the upstream wants less traffic rather than that the request is wrong
+OVERLOAD_STATUS_CODES: Final[FrozenSet[int]] = frozenset({429, 503})
+_OVERLOAD_MESSAGES: Final = ("rate limit", "rate exceeded", "too many requests", "exceeded its throughput")
+
+
+class OverloadedError(Exception):
+    """An upstream answered with a rate limit or overload status, optionally asking to wait `retry_after` seconds."""
+
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def _error_chain(error: BaseException) -> Iterator[BaseException]:
+    seen = set()
+    while error is not None and id(error) not in seen:
+        seen.add(id(error))
+        yield error
+        error = error.__cause__ or error.__context__
+
+
+def _status_code(error: BaseException) -> Optional[int]:
+    # aiohttp.ClientResponseError carries `status`, httpx.HTTPStatusError carries the response
+    status = getattr(error, "status", None)
+    if isinstance(status, int):
+        return status
+    response = getattr(error, "response", None)
+    status = getattr(response, "status_code", None)
+    return status if isinstance(status, int) else None
+
+
+def is_overload_error(error: BaseException) -> bool:
+    """Whether `error`, or an error it was raised from, is a rate limit, overload or timeout of the upstream."""
+    for current in _error_chain(error):
+        if isinstance(current, (OverloadedError, TimeoutError, httpx.TimeoutException)):
+            return True
+        if _status_code(current) in OVERLOAD_STATUS_CODES:
+            return True
+        message = str(current).lower()
+        if any(marker in message for marker in _OVERLOAD_MESSAGES):
+            return True
+    return False
+
+
+def parse_retry_after(value: Optional[str], now: Callable[[], float] = time.time) -> Optional[float]:
+    """Seconds to wait from a Retry-After header given either as delta seconds or as an HTTP date."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - now())
+    except (TypeError, ValueError):
+        return None
+
+
+def get_retry_after(error: BaseException) -> Optional[float]:
+    for current in _error_chain(error):
+        if isinstance(current, OverloadedError) and current.retry_after is not None:
+            return current.retry_after
+        headers = getattr(current, "headers", None) or getattr(getattr(current, "response", None), "headers", None)
+        if headers is not None:
+            retry_after = parse_retry_after(headers.get("Retry-After"))
+            if retry_after is not None:
+                return retry_after
+    return None
+
+
+def backoff_delay(attempt: int, base_delay: float, max_delay: float, retry_after: Optional[float] = None,
+                  rand: Callable[[], float] = random.random) -> float:
+    """
+    Exponential backoff with full jitter for the given 0-based retry attempt. A Retry-After sent by the upstream is
+    honored as the minimum delay.
+    """
+    delay = rand() * min(max_delay, base_delay * 2 ** attempt)
+    return max(delay, retry_after) if retry_after is not None else delay
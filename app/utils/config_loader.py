@@ -1,16 +1,80 @@
 import importlib
 from abc import ABC, abstractmethod
 from dataclasses import dataclass
+from typing import List, Optional
 
 
 @dataclass(frozen=True)
 class Config:
     lru_cache_maxsize: int
     approvals_api_retries: int
-    approvals_service_concurrency_limit: int
-    log_processor_concurrency_limit: int
-    approvals_api_retry_delay: int
+    approvals_api_retry_delay: float
+    approvals_api_retry_max_delay: float
+    approvals_stream_max_in_flight: int
+    approvals_stream_queue_size: int
+    approvals_batch_priority_min_addresses: int
+    approvals_request_timeout: Optional[float]
+    approvals_deadline_margin: float
     coingecko_api_url: str
+    coingecko_max_addresses_per_request: int
+    coingecko_max_url_length: int
+    coingecko_max_connections: int
+    coingecko_timeout: float
+    coingecko_retries: int
+    price_cache_ttl: float
+    price_cache_negative_ttl: float
+    price_cache_stale_grace: float
+    price_hot_refresh_interval: float
+    price_hot_refresh_top_n: int
+    get_logs_shard_size: int
+    get_logs_concurrency_limit: int
+    get_logs_owner_batch_size: int
+    approvals_batch_min_addresses: int
+    log_decode_process_pool_threshold: int
+    log_decode_process_pool_workers: int
+    token_registry_path: Optional[str]
+    multicall_batch_size: int
+    approvals_checkpoint_db_path: Optional[str]
+    approvals_checkpoint_confirmations: int
+    eth_rpc_urls: List[str]
+    rpc_hedge_percentile: float
+    rpc_hedge_min_delay: float
+    rpc_ewma_alpha: float
+    rpc_circuit_failure_threshold: int
+    rpc_circuit_cooldown: float
+    rpc_request_timeout: float
+    infura_concurrency_initial: int
+    infura_concurrency_min: int
+    infura_concurrency_max: int
+    coingecko_concurrency_initial: int
+    coingecko_concurrency_min: int
+    coingecko_concurrency_max: int
+    adaptive_limit_backoff_ratio: float
+    adaptive_limit_latency_tolerance: float
+    infura_rate_limit: float
+    infura_rate_burst: float
+    coingecko_rate_limit: float
+    coingecko_rate_burst: float
+    response_cache_enabled: bool
+    response_cache_maxsize: int
+    response_cache_max_block_lag: int
+    response_cache_head_ttl: float
+    shared_cache_backend: str
+    shared_cache_maxsize: int
+    shared_cache_sqlite_path: Optional[str]
+    shared_cache_redis_url: str
+    shared_cache_redis_pool_size: int
+    shared_cache_timeout: float
+    shared_cache_key_prefix: str
+    approvals_dal: str
+    offline_approvals_index_path: str
+    startup_eager_init: bool
+    startup_warmup: bool
+    startup_warmup_timeout: float
+    approvals_indexer_enabled: bool
+    approvals_indexer_watchlist_path: Optional[str]
+    approvals_indexer_poll_interval: float
+    approvals_indexer_reorg_depth: int
 
 
 class ConfigProvider(ABC):
@@ -29,10 +93,74 @@ class DefaultConfigProvider(ConfigProvider):
         return Config(
             lru_cache_maxsize=int(data['LRU_CACHE_MAXSIZE']),
             approvals_api_retries=int(data['APPROVALS_API_RETRIES']),
-            approvals_service_concurrency_limit=int(data['APPROVALS_SERVICE_CONCURRENCY_LIMIT']),
-            log_processor_concurrency_limit=int(data['LOG_PROCESSOR_CONCURRENCY_LIMIT']),
-            approvals_api_retry_delay=int(data['APPROVALS_API_RETRY_DELAY']),
+            approvals_api_retry_delay=float(data['APPROVALS_API_RETRY_DELAY']),
+            approvals_api_retry_max_delay=float(data['APPROVALS_API_RETRY_MAX_DELAY']),
+            approvals_stream_max_in_flight=int(data['APPROVALS_STREAM_MAX_IN_FLIGHT']),
+            approvals_stream_queue_size=int(data['APPROVALS_STREAM_QUEUE_SIZE']),
+            approvals_batch_priority_min_addresses=int(data['APPROVALS_BATCH_PRIORITY_MIN_ADDRESSES']),
+            approvals_request_timeout=(float(data['APPROVALS_REQUEST_TIMEOUT'])
+                                       if data['APPROVALS_REQUEST_TIMEOUT'] is not None else None),
+            approvals_deadline_margin=float(data['APPROVALS_DEADLINE_MARGIN']),
             coingecko_api_url=data['COINGECKO_API_URL'],
+            coingecko_max_addresses_per_request=int(data['COINGECKO_MAX_ADDRESSES_PER_REQUEST']),
+            coingecko_max_url_length=int(data['COINGECKO_MAX_URL_LENGTH']),
+            coingecko_max_connections=int(data['COINGECKO_MAX_CONNECTIONS']),
+            coingecko_timeout=float(data['COINGECKO_TIMEOUT']),
+            coingecko_retries=int(data['COINGECKO_RETRIES']),
+            price_cache_ttl=float(data['PRICE_CACHE_TTL']),
+            price_cache_negative_ttl=float(data['PRICE_CACHE_NEGATIVE_TTL']),
+            price_cache_stale_grace=float(data['PRICE_CACHE_STALE_GRACE']),
+            price_hot_refresh_interval=float(data['PRICE_HOT_REFRESH_INTERVAL']),
+            price_hot_refresh_top_n=int(data['PRICE_HOT_REFRESH_TOP_N']),
+            get_logs_shard_size=int(data['GET_LOGS_SHARD_SIZE']),
+            get_logs_concurrency_limit=int(data['GET_LOGS_CONCURRENCY_LIMIT']),
+            get_logs_owner_batch_size=int(data['GET_LOGS_OWNER_BATCH_SIZE']),
+            approvals_batch_min_addresses=int(data['APPROVALS_BATCH_MIN_ADDRESSES']),
+            log_decode_process_pool_threshold=int(data['LOG_DECODE_PROCESS_POOL_THRESHOLD']),
+            log_decode_process_pool_workers=int(data['LOG_DECODE_PROCESS_POOL_WORKERS']),
+            token_registry_path=data['TOKEN_REGISTRY_PATH'],
+            multicall_batch_size=int(data['MULTICALL_BATCH_SIZE']),
+            approvals_checkpoint_db_path=data['APPROVALS_CHECKPOINT_DB_PATH'],
+            approvals_checkpoint_confirmations=int(data['APPROVALS_CHECKPOINT_CONFIRMATIONS']),
+            eth_rpc_urls=list(data['ETH_RPC_URLS']),
+            rpc_hedge_percentile=float(data['RPC_HEDGE_PERCENTILE']),
+            rpc_hedge_min_delay=float(data['RPC_HEDGE_MIN_DELAY']),
+            rpc_ewma_alpha=float(data['RPC_EWMA_ALPHA']),
+            rpc_circuit_failure_threshold=int(data['RPC_CIRCUIT_FAILURE_THRESHOLD']),
+            rpc_circuit_cooldown=float(data['RPC_CIRCUIT_COOLDOWN']),
+            rpc_request_timeout=float(data['RPC_REQUEST_TIMEOUT']),
+            infura_concurrency_initial=int(data['INFURA_CONCURRENCY_INITIAL']),
+            infura_concurrency_min=int(data['INFURA_CONCURRENCY_MIN']),
+            infura_concurrency_max=int(data['INFURA_CONCURRENCY_MAX']),
+            coingecko_concurrency_initial=int(data['COINGECKO_CONCURRENCY_INITIAL']),
+            coingecko_concurrency_min=int(data['COINGECKO_CONCURRENCY_MIN']),
+            coingecko_concurrency_max=int(data['COINGECKO_CONCURRENCY_MAX']),
+            adaptive_limit_backoff_ratio=float(data['ADAPTIVE_LIMIT_BACKOFF_RATIO']),
+            adaptive_limit_latency_tolerance=float(data['ADAPTIVE_LIMIT_LATENCY_TOLERANCE']),
+            infura_rate_limit=float(data['INFURA_RATE_LIMIT']),
+            infura_rate_burst=float(data['INFURA_RATE_BURST']),
+            coingecko_rate_limit=float(data['COINGECKO_RATE_LIMIT']),
+            coingecko_rate_burst=float(data['COINGECKO_RATE_BURST']),
+            response_cache_enabled=bool(data['RESPONSE_CACHE_ENABLED']),
+            response_cache_maxsize=int(data['RESPONSE_CACHE_MAXSIZE']),
+            response_cache_max_block_lag=int(data['RESPONSE_CACHE_MAX_BLOCK_LAG']),
+            response_cache_head_ttl=float(data['RESPONSE_CACHE_HEAD_TTL']),
+            shared_cache_backend=data['SHARED_CACHE_BACKEND'],
+            shared_cache_maxsize=int(data['SHARED_CACHE_MAXSIZE']),
+            shared_cache_sqlite_path=data['SHARED_CACHE_SQLITE_PATH'],
+            shared_cache_redis_url=data['SHARED_CACHE_REDIS_URL'],
+            shared_cache_redis_pool_size=int(data['SHARED_CACHE_REDIS_POOL_SIZE']),
+            shared_cache_timeout=float(data['SHARED_CACHE_TIMEOUT']),
+            shared_cache_key_prefix=data['SHARED_CACHE_KEY_PREFIX'],
+            approvals_dal=data['APPROVALS_DAL'],
+            offline_approvals_index_path=data['OFFLINE_APPROVALS_INDEX_PATH'],
+            startup_eager_init=bool(data['STARTUP_EAGER_INIT']),
+            startup_warmup=bool(data['STARTUP_WARMUP']),
+            startup_warmup_timeout=float(data['STARTUP_WARMUP_TIMEOUT']),
+            approvals_indexer_enabled=bool(data['APPROVALS_INDEXER_ENABLED']),
+            approvals_indexer_watchlist_path=data['APPROVALS_INDEXER_WATCHLIST_PATH'],
+            approvals_indexer_poll_interval=float(data['APPROVALS_INDEXER_POLL_INTERVAL']),
+            approvals_indexer_reorg_depth=int(data['APPROVALS_INDEXER_REORG_DEPTH']),
         )
 
 
@@ -0,0 +1,127 @@
+import asyncio
+import contextvars
+import itertools
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from typing import Callable, Deque, Dict, Final, Generic, Iterator, NamedTuple, Optional, TypeVar
+
+T = TypeVar("T")
+
+INTERACTIVE: Final[str] = "interactive"
+BATCH: Final[str] = "batch"
+# Share of upstream slots handed to each priority class while both have calls waiting
+PRIORITY_WEIGHTS: Final[Dict[str, int]] = {INTERACTIVE: 4, BATCH: 1}
+
+
+class Flow(NamedTuple):
+    """Unit of fairness: all upstream calls made on behalf of one API request, or one background job."""
+    id: int
+    priority: str
+
+
+_flow_ids = itertools.count(1)
+_DEFAULT_FLOW: Final[Flow] = Flow(0, INTERACTIVE)
+_current_flow: contextvars.ContextVar[Flow] = contextvars.ContextVar("approvals_flow", default=_DEFAULT_FLOW)
+
+
+def current_flow() -> Flow:
+    return _current_flow.get()
+
+
+def new_flow(priority: str = INTERACTIVE) -> Flow:
+    if priority not in PRIORITY_WEIGHTS:
+        raise ValueError(f"Unknown priority {priority!r}, expected one of {sorted(PRIORITY_WEIGHTS)}")
+    return Flow(next(_flow_ids), priority)
+
+
+@contextmanager
+def flow_scope(priority: str = INTERACTIVE) -> Iterator[Flow]:
+    """Attributes upstream calls made in this block, and in tasks it creates, to a new flow."""
+    token = _current_flow.set(new_flow(priority))
+    try:
+        yield _current_flow.get()
+    finally:
+        _current_flow.reset(token)
+
+
+def flow_context(priority: str = INTERACTIVE) -> contextvars.Context:
+    """A copy of the current context running in a new flow, for tasks created from async generators."""
+    context = contextvars.copy_context()
+    context.run(_current_flow.set, new_flow(priority))
+    return context
+
+
+class FairQueue(Generic[T]):
+    """
+    Queue of waiters served by smooth weighted round-robin across priority classes and plain round-robin across the
+    flows of a class, so a flow with hundreds of queued calls gets one turn per round like a flow with one.
+    """
+
+    def __init__(self, weights: Optional[Dict[str, int]] = None):
+        self._weights = dict(weights or PRIORITY_WEIGHTS)
+        self._flows: Dict[str, "OrderedDict[int, Deque[T]]"] = {priority: OrderedDict() for priority in self._weights}
+        self._credits: Dict[str, int] = {priority: 0 for priority in self._weights}
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def push(self, item: T, flow: Flow) -> None:
+        self._flows[flow.priority].setdefault(flow.id, deque()).append(item)
+        self._size += 1
+
+    def remove(self, item: T, flow: Flow) -> None:
+        flows = self._flows[flow.priority]
+        items = flows.get(flow.id)
+        if items is None or item not in items:
+            return
+        items.remove(item)
+        if not items:
+            del flows[flow.id]
+        self._size -= 1
+
+    def pop(self) -> T:
+        if not self._size:
+            raise IndexError("pop from an empty FairQueue")
+        flows = self._flows[self._next_priority()]
+        flow_id, items = next(iter(flows.items()))
+        item = items.popleft()
+        if items:
+            flows.move_to_end(flow_id)
+        else:
+            del flows[flow_id]
+        self._size -= 1
+        return item
+
+    def _next_priority(self) -> str:
+        waiting = [priority for priority, flows in self._flows.items() if flows]
+        for priority in waiting:
+            self._credits[priority] += self._weights[priority]
+        chosen = max(waiting, key=self._credits.__getitem__)
+        self._credits[chosen] -= sum(self._weights[priority] for priority in waiting)
+        return chosen
+
+
+class TokenBucket:
+    """Global request rate limit: `rate` calls per second with bursts of up to `burst` calls."""
+
+    def __init__(self, rate: float, burst: float, clock: Callable[[], float] = time.monotonic):
+        self.rate = rate
+        self.burst = max(1.0, burst)
+        self._tokens = self.burst
+        self._updated = clock()
+        self._clock = clock
+
+    def reserve(self) -> float:
+        """Takes a token, possibly one not refilled yet, and returns the seconds to wait until it is."""
+        now = self._clock()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        self._tokens -= 1
+        return max(0.0, -self._tokens / self.rate)
+
+    async def acquire(self) -> None:
+        delay = self.reserve()
+        if delay > 0:
+            await asyncio.sleep(delay)
@@ -0,0 +1,113 @@
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Final, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+from app.models.approvals.approvals import ApprovalLog
+from app.utils.log_processor import is_latest_approval
+
+# keccak256("Approval(address,address,uint256)"), precomputed so that importing the decoder does not need web3
+APPROVAL_EVENT_TOPIC: Final[str] = "0x8c5be1e5ebec7d5bd14f71427d1e84f3dd0314c0f7b2291e5b200ac8c7c3b925"
+
+# (block_number, log_index, transaction_hash, token_address, owner_topic, spender_topic, data)
+CompactLog = Tuple[int, Optional[int], bytes, str, bytes, bytes, bytes]
+
+_process_pool: Optional[ProcessPoolExecutor] = None
+
+
+def is_erc20_approval(log: Mapping) -> bool:
+    # ERC-721 emits the same Approval signature with the token id as a 4th indexed topic instead of data. Logs
+    # without a full uint256 amount are malformed and skipped, reading them as 0 would look like a revocation
+    return len(log['topics']) == 3 and len(log['data']) >= 32
+
+
+def decode_approval_log(log: Mapping) -> ApprovalLog:
+    # bytes.hex / memoryview slices skip HexBytes.__getitem__, which re-wraps every slice in a new HexBytes
+    transaction_hash = log.get('transactionHash')
+    if len(log['data']) < 32:
+        raise ValueError(f"Approval log data is {len(log['data'])} bytes, expected a 32 byte uint256 amount")
+    return ApprovalLog(
+        block_number=log['blockNumber'],
+        transaction_hash=bytes.hex(transaction_hash) if transaction_hash else '',
+        amount=int.from_bytes(memoryview(log['data'])[:32], 'big'),
+        spender='0x' + bytes.hex(log['topics'][2])[24:],
+        token_address=log['address'],
+        log_index=log.get('logIndex')
+    )
+
+
+def to_compact_log(log: Mapping) -> CompactLog:
+    topics = log['topics']
+    return (log['blockNumber'], log.get('logIndex'), bytes(log.get('transactionHash') or b''), log['address'],
+            bytes(topics[1]), bytes(topics[2]), bytes(memoryview(log['data'])[:32]))
+
+
+def reduce_compact_logs(compact_logs: Iterable[CompactLog], split_block: Optional[int] = None,
+                        latest: Optional[Dict[Tuple, CompactLog]] = None) -> Dict[Tuple, CompactLog]:
+    """Latest compact log per (owner topic, token, spender topic), plus which side of `split_block` it is on."""
+    if latest is None:
+        latest = {}
+    for compact_log in compact_logs:
+        block_number, log_index, _, token_address, owner_topic, spender_topic, _ = compact_log
+        # Logs on either side of split_block are reduced separately so callers can still tell them apart
+        is_after_split = split_block is not None and block_number > split_block
+        key = (owner_topic, token_address.lower(), spender_topic, is_after_split)
+        current = latest.get(key)
+        if current is None or (block_number, log_index or 0) > (current[0], current[1] or 0):
+            latest[key] = compact_log
+    return latest
+
+
+def _decode_and_reduce_chunk(compact_logs: Sequence[CompactLog],
+                             split_block: Optional[int]) -> Dict[Tuple, Tuple[bytes, ApprovalLog]]:
+    latest = reduce_compact_logs(compact_logs, split_block)
+    # Only the surviving logs are turned into records
+    return {
+        key: (owner_topic, ApprovalLog(
+            block_number=block_number,
+            transaction_hash=transaction_hash.hex(),
+            amount=int.from_bytes(data, 'big'),
+            spender='0x' + spender_topic.hex()[24:],
+            token_address=token_address,
+            log_index=log_index
+        ))
+        for key, (block_number, log_index, transaction_hash, token_address, owner_topic, spender_topic, data)
+        in latest.items()
+    }
+
+
+def _get_process_pool(workers: int) -> ProcessPoolExecutor:
+    global _process_pool
+    if _process_pool is None:
+        _process_pool = ProcessPoolExecutor(max_workers=workers)
+    return _process_pool
+
+
+def shutdown_process_pool() -> None:
+    global _process_pool
+    if _process_pool is not None:
+        _process_pool.shutdown(cancel_futures=True)
+        _process_pool = None
+
+
+async def decode_and_reduce_in_pool(logs: Iterable[Mapping], workers: int,
+                                    split_block: Optional[int] = None) -> List[Tuple[bytes, ApprovalLog]]:
+    """
+    Decodes raw Approval logs in a process pool and reduces them to the latest log per
+    (owner topic, token, spender), keeping the latest log at or below `split_block` apart from the newer ones.
+    Returns (owner topic, log) pairs.
+    """
+    compact_logs = [to_compact_log(log) for log in logs if is_erc20_approval(log)]
+    chunk_size = max(1, -(-len(compact_logs) // workers))
+    loop = asyncio.get_running_loop()
+    pool = _get_process_pool(workers)
+    chunk_results = await asyncio.gather(*(
+        loop.run_in_executor(pool, _decode_and_reduce_chunk, compact_logs[start:start + chunk_size], split_block)
+        for start in range(0, len(compact_logs), chunk_size)
+    ))
+    latest: Dict[Tuple, Tuple[bytes, ApprovalLog]] = {}
+    for chunk_result in chunk_results:
+        for key, (owner_topic, approval_log) in chunk_result.items():
+            current = latest.get(key)
+            if current is None or is_latest_approval(approval_log, current[1]):
+                latest[key] = (owner_topic, approval_log)
+    return list(latest.values())
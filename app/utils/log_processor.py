@@ -1,8 +1,8 @@
 import asyncio
-from typing import Dict, Tuple, List, Callable, Awaitable, Final, Optional
+import dataclasses
+from typing import Dict, Tuple, List, Callable, Awaitable, Final, Optional, Iterable
 
 from app.models.approvals.approvals import Approval, ApprovalLog
-from app.utils.config_loader import config
 
 MAX_UINT256: Final[int] = 2 ** 256 - 1
 
@@ -13,40 +13,98 @@ def _format_amount(amount: int) -> str:
     return f"{amount:,}"
 
 
-async def _process_log_with_semaphore(approval_log: ApprovalLog, get_token_symbol, get_token_price_usd, include_prices,
-                                      semaphore) -> Approval:
-    async with semaphore:
-        price: Optional[float] = None
-        if include_prices and get_token_price_usd is not None:
-            price = await get_token_price_usd(approval_log.token_address)
-        token_symbol = await get_token_symbol(approval_log.token_address)
-        return Approval(
-            amount=_format_amount(approval_log.amount),
-            spender_address=approval_log.spender,
-            token_symbol=token_symbol,
-            price_usd=price
-        )
+async def _process_log(approval_log: ApprovalLog, get_token_symbol, get_token_price_usd, include_prices,
+                       prices: Optional[Dict[str, Optional[float]]] = None,
+                       price_ages: Optional[Dict[str, Optional[float]]] = None) -> Approval:
+    price: Optional[float] = None
+    if prices is not None:
+        price = prices.get(approval_log.token_address)
+    elif include_prices and get_token_price_usd is not None:
+        price = await get_token_price_usd(approval_log.token_address)
+    token_symbol = await get_token_symbol(approval_log.token_address)
+    return Approval(
+        amount=_format_amount(approval_log.amount),
+        spender_address=approval_log.spender,
+        token_symbol=token_symbol,
+        price_usd=price,
+        price_age_seconds=price_ages.get(approval_log.token_address) if price_ages is not None else None
+    )
 
 
 async def process_approval_logs(
         approval_logs: List[ApprovalLog],
         get_token_symbol: Callable[[str], Awaitable[str]],
         get_token_price_usd: Optional[Callable[[str], Awaitable[Optional[float]]]] = None,
-        include_prices: bool = False
+        include_prices: bool = False,
+        get_token_symbols: Optional[Callable[[List[str]], Awaitable[Dict[str, str]]]] = None,
+        get_token_prices_usd: Optional[Callable[[List[str]], Awaitable[Dict[str, Optional[float]]]]] = None,
+        get_price_ages: Optional[Callable[[List[str]], Dict[str, Optional[float]]]] = None,
+        get_allowances: Optional[Callable[[List[ApprovalLog]],
+                                          Awaitable[Dict[Tuple[str, str], Optional[int]]]]] = None,
+        deadline: Optional[float] = None
 ) -> List[Approval]:
-    latest_approvals: Dict[Tuple[str, str], ApprovalLog] = {}
+    """
+    Latest approval per (token, spender) of `approval_logs` with their symbols and optional prices. `deadline`, in
+    event loop time, cancels the lookups still in flight when it passes and raises TimeoutError.
+    """
+    latest_approvals = reduce_latest_approvals(approval_logs)
+    async with asyncio.timeout_at(deadline):
+        if get_allowances is not None and latest_approvals:
+            latest_approvals = apply_allowances(latest_approvals, await get_allowances(list(latest_approvals.values())))
+        token_addresses = list({log.token_address: None for log in latest_approvals.values()})
+        prices: Optional[Dict[str, Optional[float]]] = None
+        price_ages: Optional[Dict[str, Optional[float]]] = None
+        if token_addresses:
+            # Warms the symbol cache and fetches all prices in a few bulk calls so the per-log work below is local
+            bulk_lookups = []
+            if get_token_symbols is not None:
+                bulk_lookups.append(get_token_symbols(token_addresses))
+            if include_prices and get_token_prices_usd is not None:
+                bulk_lookups.append(get_token_prices_usd(token_addresses))
+            bulk_results = await asyncio.gather(*bulk_lookups)
+            if include_prices and get_token_prices_usd is not None:
+                prices = bulk_results[-1]
+            if include_prices and get_price_ages is not None:
+                price_ages = get_price_ages(token_addresses)
+        # Upstream calls left after the bulk lookups are bounded by the DALs' adaptive limiters, not per request
+        results = await asyncio.gather(*(
+            _process_log(log, get_token_symbol, get_token_price_usd, include_prices, prices, price_ages)
+            for log in latest_approvals.values()
+        ))
+    return results
+
+
+def reduce_latest_approvals(
+        approval_logs: Iterable[ApprovalLog],
+        latest_approvals: Optional[Dict[Tuple[str, str], ApprovalLog]] = None
+) -> Dict[Tuple[str, str], ApprovalLog]:
+    if latest_approvals is None:
+        latest_approvals = {}
     for log in approval_logs:
-        token = log.token_address.lower()
-        spender = log.spender.lower()
-        key = (token, spender)
+        key = approval_key(log)
         if key not in latest_approvals or is_latest_approval(log, latest_approvals[key]):
             latest_approvals[key] = log
-    semaphore = asyncio.Semaphore(config.log_processor_concurrency_limit)
-    results = await asyncio.gather(*(
-        _process_log_with_semaphore(log, get_token_symbol, get_token_price_usd, include_prices, semaphore)
-        for log in latest_approvals.values()
-    ))
-    return results
+    return latest_approvals
+
+
+def apply_allowances(latest_approvals: Dict[Tuple[str, str], ApprovalLog],
+                     allowances: Dict[Tuple[str, str], Optional[int]]) -> Dict[Tuple[str, str], ApprovalLog]:
+    """
+    Replaces each approved amount by the live allowance from `allowances` (keyed like `approval_key`) and drops
+    approvals that were fully spent or revoked. Approvals without a known allowance keep their event amount.
+    """
+    verified: Dict[Tuple[str, str], ApprovalLog] = {}
+    for key, log in latest_approvals.items():
+        allowance = allowances.get(key)
+        if allowance is None:
+            verified[key] = log
+        elif allowance > 0:
+            verified[key] = dataclasses.replace(log, amount=allowance)
+    return verified
+
+
+def approval_key(approval_log: ApprovalLog) -> Tuple[str, str]:
+    return approval_log.token_address.lower(), approval_log.spender.lower()
 
 
 def is_latest_approval(new_log: ApprovalLog, current_log: ApprovalLog) -> bool:
@@ -0,0 +1,282 @@
+import time
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from typing import Dict, Final, List, Optional, Sequence, Tuple
+
+import cachetools
+
+# Instruments are updated from the event loop thread only, so plain attribute updates are enough (no locks)
+
+DEFAULT_LATENCY_BUCKETS: Final[Tuple[float, ...]] = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0
+)
+COUNT_BUCKETS: Final[Tuple[float, ...]] = (0, 1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+CONTENT_TYPE: Final[str] = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class _Metric(ABC):
+    type_name: str = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), registry=None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        (registry if registry is not None else REGISTRY).register(self)
+
+    def labels(self, *values: str):
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}, got {values}")
+            child = self._children[values] = self._new_child()
+        return child
+
+    @abstractmethod
+    def _new_child(self):
+        pass
+
+    def _unlabelled(self):
+        return self.labels()
+
+    def collect(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        for values, child in self._children.items():
+            lines.extend(self._sample_lines(values, child))
+        return lines
+
+    def _sample_lines(self, values: Tuple[str, ...], child) -> List[str]:
+        return [f"{self.name}{_format_labels(self.labelnames, values)} {_format_value(child.value)}"]
+
+
+class _CounterChild:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1) -> None:
+        self.value += amount
+
+
+class Counter(_Metric):
+    type_name = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount: float = 1) -> None:
+        self._unlabelled().inc(amount)
+
+
+class _GaugeChild:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1) -> None:
+        self.value += amount
+
+    def dec(self, amount: float = 1) -> None:
+        self.value -= amount
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+    def track_inprogress(self) -> "_InProgress":
+        return _InProgress(self)
+
+
+class _InProgress:
+    __slots__ = ("_gauge",)
+
+    def __init__(self, gauge: _GaugeChild):
+        self._gauge = gauge
+
+    def __enter__(self):
+        self._gauge.value += 1
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._gauge.value -= 1
+        return False
+
+
+class Gauge(_Metric):
+    type_name = "gauge"
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def set(self, value: float) -> None:
+        self._unlabelled().set(value)
+
+
+class _HistogramChild:
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        # Per-bucket counts are made cumulative when rendering, so an observation touches one slot
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def time(self) -> "_Timer":
+        return _Timer(self)
+
+
+class _Timer:
+    """Observes the elapsed wall time of a `with` block, which may contain awaits."""
+    __slots__ = ("_histogram", "_start")
+
+    def __init__(self, histogram: _HistogramChild):
+        self._histogram = histogram
+        self._start = 0.0
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._histogram.observe(time.perf_counter() - self._start)
+        return False
+
+
+class Histogram(_Metric):
+    type_name = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS, registry=None):
+        self._bounds = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames, registry)
+
+    def _new_child(self):
+        return _HistogramChild(self._bounds)
+
+    def observe(self, value: float) -> None:
+        self._unlabelled().observe(value)
+
+    def _sample_lines(self, values: Tuple[str, ...], child: _HistogramChild) -> List[str]:
+        lines = []
+        cumulative = 0
+        for bound, count in zip((*child.bounds, float("inf")), child.counts):
+            cumulative += count
+            labels = _format_labels(self.labelnames, values, f'le="{_format_value(bound)}"')
+            lines.append(f"{self.name}_bucket{labels} {cumulative}")
+        labels = _format_labels(self.labelnames, values)
+        lines.append(f"{self.name}_sum{labels} {_format_value(child.sum)}")
+        lines.append(f"{self.name}_count{labels} {child.count}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> None:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+
+    def render(self) -> str:
+        """Renders every metric in the Prometheus text exposition format."""
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.collect())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY: Final[MetricsRegistry] = MetricsRegistry()
+
+
+class InstrumentedLRUCache(cachetools.LRUCache):
+    """LRUCache counting the entries it evicts to make room for new ones."""
+
+    def __init__(self, maxsize: int, evictions: Optional[_CounterChild] = None):
+        super().__init__(maxsize=maxsize)
+        self._evictions = evictions
+
+    def popitem(self):
+        item = super().popitem()
+        if self._evictions is not None:
+            self._evictions.inc()
+        return item
+
+
+STAGE_DURATION: Final = Histogram(
+    "approvals_stage_duration_seconds", "Time spent in each stage of serving approvals.", ["stage"]
+)
+HTTP_REQUEST_DURATION: Final = Histogram(
+    "approvals_http_request_duration_seconds", "HTTP request latency by route and status code.",
+    ["method", "route", "status"]
+)
+CACHE_EVENTS: Final = Counter(
+    "approvals_cache_events_total", "Cache lookups and evictions by cache and outcome.", ["cache", "event"]
+)
+LOGS_PER_OWNER: Final = Histogram(
+    "approvals_logs_per_owner", "Approval logs returned by the DAL for one owner address.", buckets=COUNT_BUCKETS
+)
+RETRIES: Final = Counter("approvals_retries_total", "Retried attempts by operation.", ["operation"])
+DEADLINE_EXCEEDED: Final = Counter(
+    "approvals_deadline_exceeded_total", "Addresses left unfinished when their request deadline passed."
+)
+IN_FLIGHT: Final = Gauge("approvals_in_flight", "Work currently in progress by kind.", ["kind"])
+UPSTREAM_ERRORS: Final = Counter("approvals_upstream_errors_total", "Failed upstream calls by upstream.", ["upstream"])
+
+
+def stage_timer(stage: str) -> _Timer:
+    return STAGE_DURATION.labels(stage).time()
+
+
+class MetricsMiddleware:
+    """ASGI middleware observing HTTP_REQUEST_DURATION. Routes are labelled by path template to bound cardinality."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        status = "500"
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = str(message["status"])
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = scope.get("route")
+            # Plain Starlette routes such as /docs carry no template, their fixed path is used instead
+            route_path = route.path if route is not None else "unmatched" if status == "404" else scope["path"]
+            HTTP_REQUEST_DURATION.labels(scope["method"], route_path, status).observe(time.perf_counter() - start)
@@ -0,0 +1,86 @@
+import asyncio
+from typing import Awaitable, Callable, Dict, Generic, Hashable, Iterable, List, TypeVar
+
+T = TypeVar("T")
+
+
+class _Flight:
+    __slots__ = ("task", "waiters", "abandoned")
+
+    def __init__(self, task: asyncio.Future):
+        self.task = task
+        self.waiters = 0
+        self.abandoned = False
+
+
+class SingleFlight(Generic[T]):
+    """
+    Coalesces concurrent calls for the same key into one shared in-flight task. Callers that arrive while a call is
+    running await its result instead of issuing their own. A caller being cancelled does not affect the others; the
+    shared task is only cancelled once every caller waiting on it has gone away.
+    """
+
+    def __init__(self):
+        self._in_flight: Dict[Hashable, _Flight] = {}
+
+    def __contains__(self, key: Hashable) -> bool:
+        flight = self._in_flight.get(key)
+        return flight is not None and not flight.abandoned
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        flight = self._in_flight.get(key)
+        if flight is None or flight.abandoned:
+            flight = self._start(key, fn())
+        return await self._wait(flight)
+
+    async def do_many(self, keys: Iterable[Hashable],
+                      fn: Callable[[List[Hashable]], Awaitable[Dict[Hashable, T]]]) -> Dict[Hashable, T]:
+        """
+        Batched variant: keys already in flight are awaited, the remaining ones are fetched with a single `fn` call
+        that returns a dict by key. Keys missing from that dict resolve to None.
+        """
+        unique_keys = list(dict.fromkeys(keys))
+        owned_keys = [key for key in unique_keys if key not in self]
+        if owned_keys:
+            batch = _Flight(asyncio.ensure_future(fn(owned_keys)))
+            batch.task.add_done_callback(_consume_exception)
+            for key in owned_keys:
+                self._start(key, self._pick(batch, key))
+        flights = [self._in_flight[key] for key in unique_keys]
+        results = await asyncio.gather(*(self._wait(flight) for flight in flights))
+        return dict(zip(unique_keys, results))
+
+    def _start(self, key: Hashable, awaitable: Awaitable[T]) -> _Flight:
+        flight = _Flight(asyncio.ensure_future(awaitable))
+        self._in_flight[key] = flight
+
+        def _forget(_: asyncio.Future) -> None:
+            if self._in_flight.get(key) is flight:
+                del self._in_flight[key]
+
+        flight.task.add_done_callback(_forget)
+        flight.task.add_done_callback(_consume_exception)
+        return flight
+
+    async def _pick(self, batch: _Flight, key: Hashable) -> T:
+        results = await self._wait(batch)
+        return results.get(key)
+
+    @staticmethod
+    async def _wait(flight: _Flight) -> T:
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)
+        except asyncio.CancelledError:
+            if flight.waiters == 1 and not flight.task.done():
+                flight.abandoned = True
+                flight.task.cancel()
+            raise
+        finally:
+            flight.waiters -= 1
+
+
+def _consume_exception(task: asyncio.Future) -> None:
+    # Failures are re-raised to every waiter; retrieving it here avoids "exception was never retrieved" warnings
+    if not task.cancelled():
+        task.exception()
@@ -0,0 +1,83 @@
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Final, Hashable, List, Optional, Tuple
+
+FRESH: Final[str] = "fresh"
+STALE: Final[str] = "stale"
+MISS: Final[str] = "miss"
+
+
+class _CacheEntry:
+    __slots__ = ("value", "fetched_at", "expires_at", "hits")
+
+    def __init__(self, value: Any, fetched_at: float, expires_at: float, hits: int):
+        self.value = value
+        self.fetched_at = fetched_at
+        self.expires_at = expires_at
+        self.hits = hits
+
+
+class StaleWhileRevalidateCache:
+    """
+    Bounded LRU cache whose entries expire after `ttl` seconds (`negative_ttl` for None values). Expired entries are
+    still served as STALE for `stale_grace` seconds so callers can answer immediately and refresh in the background.
+    """
+
+    def __init__(self, maxsize: int, ttl: float, negative_ttl: float, stale_grace: float,
+                 clock: Callable[[], float] = time.monotonic, on_evict: Optional[Callable[[], None]] = None):
+        self._entries: "OrderedDict[Hashable, _CacheEntry]" = OrderedDict()
+        self._maxsize = maxsize
+        self._ttl = ttl
+        self._negative_ttl = negative_ttl
+        self._stale_grace = stale_grace
+        self._clock = clock
+        self._on_evict = on_evict
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.lookup(key, count_hit=False)[0] != MISS
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def set(self, key: Hashable, value: Any, age: float = 0.0) -> None:
+        """Stores `value` as fetched `age` seconds ago, e.g. when it was copied from another cache."""
+        fetched_at = self._clock() - age
+        current = self._entries.get(key)
+        ttl = self._ttl if value is not None else self._negative_ttl
+        self._entries[key] = _CacheEntry(value, fetched_at, fetched_at + ttl, current.hits if current else 0)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._maxsize:
+            self._entries.popitem(last=False)
+            if self._on_evict is not None:
+                self._on_evict()
+
+    def lookup(self, key: Hashable, count_hit: bool = True) -> Tuple[str, Any, Optional[float]]:
+        """Returns (state, value, age in seconds), state being one of FRESH, STALE or MISS."""
+        entry: Optional[_CacheEntry] = self._entries.get(key)
+        if entry is None:
+            return MISS, None, None
+        now = self._clock()
+        if now >= entry.expires_at + self._stale_grace:
+            return MISS, None, None
+        if count_hit:
+            entry.hits += 1
+            self._entries.move_to_end(key)
+        state = FRESH if now < entry.expires_at else STALE
+        return state, entry.value, now - entry.fetched_at
+
+    def age(self, key: Hashable) -> Optional[float]:
+        return self.lookup(key, count_hit=False)[2]
+
+    def hot_keys(self, limit: int, expiring_within: float) -> List[Hashable]:
+        """
+        Most requested keys holding a value that expires within `expiring_within` seconds. Hit counts are halved on
+        every call so popularity follows recent traffic.
+        """
+        deadline = self._clock() + expiring_within
+        candidates = []
+        for key, entry in self._entries.items():
+            if entry.value is not None and entry.hits > 0 and entry.expires_at <= deadline:
+                candidates.append((entry.hits, key))
+            entry.hits //= 2
+        candidates.sort(key=lambda candidate: candidate[0], reverse=True)
+        return [key for _, key in candidates[:limit]]
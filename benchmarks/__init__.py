@@ -0,0 +1 @@
+# Benchmarks, run them from the repository root, e.g. `python -m benchmarks.bench_log_decoding`.
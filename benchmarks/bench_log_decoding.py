@@ -0,0 +1,107 @@
+import asyncio
+import random
+import time
+from argparse import ArgumentParser, Namespace
+from typing import Callable, List, Optional
+
+from eth_abi import decode
+from hexbytes import HexBytes
+from pydantic import BaseModel
+from web3.datastructures import AttributeDict
+
+from app.utils.log_decoder import decode_and_reduce_in_pool, decode_approval_log, shutdown_process_pool
+from app.utils.log_processor import reduce_latest_approvals
+
+OWNER_TOPIC = HexBytes(b'\x00' * 12 + b'\x28' * 20)
+
+
+class LegacyApprovalLog(BaseModel):
+    # The validated pydantic record the DAL used to build for every log
+    block_number: int
+    transaction_hash: str
+    spender: str
+    amount: int
+    token_address: str
+    log_index: Optional[int] = None
+
+
+def make_logs(count: int, tokens: int, spenders: int) -> List[AttributeDict]:
+    rng = random.Random(7)
+    token_addresses = ["0x" + rng.randbytes(20).hex() for _ in range(tokens)]
+    spender_topics = [HexBytes(b'\x00' * 12 + rng.randbytes(20)) for _ in range(spenders)]
+    return [AttributeDict({
+        'address': rng.choice(token_addresses),
+        'blockNumber': 10_000_000 + index // 4,
+        'logIndex': index % 4,
+        'transactionHash': HexBytes(rng.randbytes(32)),
+        'topics': [HexBytes(b'\x8c' * 32), OWNER_TOPIC, rng.choice(spender_topics)],
+        'data': HexBytes(rng.getrandbits(256).to_bytes(32, 'big')),
+    }) for index in range(count)]
+
+
+def legacy_decode_and_reduce(logs: List[AttributeDict]) -> int:
+    approval_logs = [LegacyApprovalLog(
+        block_number=log.get('blockNumber'),
+        transaction_hash=log.get('transactionHash').hex() if log.get('transactionHash') else '',
+        amount=decode(['uint256'], log['data'])[0],
+        spender='0x' + log['topics'][2].hex()[-40:].lower(),
+        token_address=log.get('address'),
+        log_index=log.get('logIndex')
+    ) for log in logs]
+    latest = {}
+    for log in approval_logs:
+        key = (log.token_address.lower(), log.spender.lower())
+        if key not in latest or (log.block_number, log.log_index or 0) > (latest[key].block_number,
+                                                                          latest[key].log_index or 0):
+            latest[key] = log
+    return len(latest)
+
+
+def fast_decode_and_reduce(logs: List[AttributeDict]) -> int:
+    return len(reduce_latest_approvals(decode_approval_log(log) for log in logs))
+
+
+def pool_decode_and_reduce(logs: List[AttributeDict], workers: int) -> int:
+    return len(asyncio.run(decode_and_reduce_in_pool(logs, workers)))
+
+
+def best_of(repeat: int, fn: Callable[[], int]) -> (float, int):
+    timings = []
+    result = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def get_args() -> Namespace:
+    parser: ArgumentParser = ArgumentParser(description="Compare approval log decoding/reduction paths.")
+    parser.add_argument('--logs', type=int, default=100_000, help='Number of synthetic logs (default: 100000)')
+    parser.add_argument('--tokens', type=int, default=500)
+    parser.add_argument('--spenders', type=int, default=50)
+    parser.add_argument('--workers', type=int, default=4, help='Process pool size for the pool path')
+    parser.add_argument('--repeat', type=int, default=3)
+    return parser.parse_args()
+
+
+def main():
+    args: Namespace = get_args()
+    logs = make_logs(args.logs, args.tokens, args.spenders)
+    print(f"Decoding and reducing {len(logs):,} logs (best of {args.repeat})")
+
+    legacy_seconds, legacy_pairs = best_of(args.repeat, lambda: legacy_decode_and_reduce(logs))
+    print(f"  legacy eth_abi + pydantic : {legacy_seconds * 1000:9.1f} ms  ({legacy_pairs} pairs)")
+    fast_seconds, fast_pairs = best_of(args.repeat, lambda: fast_decode_and_reduce(logs))
+    print(f"  fast int.from_bytes       : {fast_seconds * 1000:9.1f} ms  ({fast_pairs} pairs)  "
+          f"x{legacy_seconds / fast_seconds:.1f}")
+    try:
+        pool_seconds, pool_pairs = best_of(args.repeat, lambda: pool_decode_and_reduce(logs, args.workers))
+    finally:
+        shutdown_process_pool()
+    print(f"  process pool ({args.workers} workers)  : {pool_seconds * 1000:9.1f} ms  ({pool_pairs} pairs)  "
+          f"x{legacy_seconds / pool_seconds:.1f}")
+
+
+if __name__ == "__main__":
+    main()
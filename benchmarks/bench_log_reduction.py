@@ -0,0 +1,103 @@
+import asyncio
+import dataclasses
+import os
+import time
+import tracemalloc
+from argparse import ArgumentParser, Namespace
+from typing import Awaitable, Callable, List, Tuple
+
+from hexbytes import HexBytes
+from web3.datastructures import AttributeDict
+from web3.types import FilterParams, LogReceipt
+
+os.environ.setdefault("INFURA_API_KEY", "benchmark")  # The DAL is driven with a fake eth_getLogs, no RPC is made
+
+from app.dal.approvals import infura_approvals_dal  # noqa: E402
+from app.dal.approvals.block_range_log_fetcher import BlockRangeLogFetcher  # noqa: E402
+from app.dal.approvals.infura_approvals_dal import InfuraDAL  # noqa: E402
+from app.utils.config_loader import config  # noqa: E402
+from app.utils.log_decoder import decode_approval_log, is_erc20_approval  # noqa: E402
+from app.utils.log_processor import reduce_latest_approvals  # noqa: E402
+
+OWNER = "0x28C6c06298d514Db089934071355E5743bf21d60"
+OWNER_TOPIC = HexBytes(b'\x00' * 12 + bytes.fromhex(OWNER[2:]))
+
+
+def make_get_logs(tokens: int, spenders: int, max_results: int) -> Callable[[FilterParams],
+                                                                               Awaitable[List[LogReceipt]]]:
+    """Fake eth_getLogs for a wallet with one Approval per block, built on demand so the fake holds no history."""
+    token_addresses = [f"0x{index:040x}" for index in range(1, tokens + 1)]
+    spender_topics = [HexBytes(b'\x00' * 12 + index.to_bytes(20, 'big')) for index in range(1, spenders + 1)]
+
+    async def get_logs(filter_params: FilterParams) -> List[LogReceipt]:
+        from_block, to_block = filter_params["fromBlock"], filter_params["toBlock"]
+        if to_block - from_block + 1 > max_results:
+            raise ValueError({"code": -32005, "message": f"query returned more than {max_results} results"})
+        await asyncio.sleep(0)
+        return [AttributeDict({
+            'address': token_addresses[block * 7919 % tokens],
+            'blockNumber': block,
+            'logIndex': 0,
+            'transactionHash': HexBytes(block.to_bytes(32, 'big')),
+            'topics': [HexBytes(b'\x8c' * 32), OWNER_TOPIC, spender_topics[block // tokens % spenders]],
+            'data': HexBytes((block * 31337).to_bytes(32, 'big')),
+        }) for block in range(from_block, to_block + 1)]
+    return get_logs
+
+
+async def legacy_fetch_and_reduce(fetcher: BlockRangeLogFetcher, head_block: int) -> int:
+    # What the DAL used to do: every receipt of the history, then every decoded log, then the reduction
+    logs = await fetcher.fetch({"topics": []}, 0, head_block)
+    approval_logs = [decode_approval_log(log) for log in logs if is_erc20_approval(log)]
+    return len(reduce_latest_approvals(approval_logs))
+
+
+async def paged_fetch_and_reduce(dal: InfuraDAL, head_block: int) -> int:
+    approval_logs_by_owner = await dal._get_approval_logs([OWNER], 0, head_block)
+    return len(approval_logs_by_owner[OWNER])
+
+
+def measure(fn: Callable[[], Awaitable[int]]) -> Tuple[float, int, int]:
+    """Wall time, peak traced memory and the number of live approvals."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    approvals = asyncio.run(fn())
+    seconds = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return seconds, peak, approvals
+
+
+def get_args() -> Namespace:
+    parser: ArgumentParser = ArgumentParser(
+        description="Compare peak memory of materializing a wallet's whole Approval history vs folding it by page."
+    )
+    parser.add_argument('--logs', type=int, default=200_000, help='Approval logs in the history (default: 200000)')
+    parser.add_argument('--tokens', type=int, default=200)
+    parser.add_argument('--spenders', type=int, default=10)
+    parser.add_argument('--page-size', type=int, default=10_000, help='Provider result cap and blocks per shard')
+    parser.add_argument('--concurrency', type=int, default=4, help='eth_getLogs calls in flight')
+    return parser.parse_args()
+
+
+def main():
+    args: Namespace = get_args()
+    # No registry or checkpoint files: only the log path is measured
+    infura_approvals_dal.config = dataclasses.replace(config, token_registry_path=None,
+                                                      approvals_checkpoint_db_path=None,
+                                                      log_decode_process_pool_threshold=0)
+    get_logs = make_get_logs(args.tokens, args.spenders, args.page_size)
+    fetcher = BlockRangeLogFetcher(get_logs, shard_size=args.page_size, concurrency_limit=args.concurrency)
+    dal = InfuraDAL()
+    dal._log_fetcher = fetcher
+    head_block = args.logs - 1
+    print(f"Reducing {args.logs:,} Approval logs over {args.tokens} tokens x {args.spenders} spenders, "
+          f"{args.page_size:,} logs per page, {args.concurrency} pages in flight")
+    for label, fn in (("materialize then reduce", lambda: legacy_fetch_and_reduce(fetcher, head_block)),
+                      ("fold page by page", lambda: paged_fetch_and_reduce(dal, head_block))):
+        seconds, peak, approvals = measure(fn)
+        print(f"  {label:<24}: {seconds * 1000:9.1f} ms  peak {peak / 2 ** 20:7.1f} MiB  ({approvals} approvals)")
+
+
+if __name__ == "__main__":
+    main()
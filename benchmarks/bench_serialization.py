@@ -0,0 +1,98 @@
+import json
+import random
+import time
+import tracemalloc
+from argparse import ArgumentParser, Namespace
+from typing import Callable, Dict, List, Tuple
+
+from pydantic import TypeAdapter
+
+from app.models.approvals.approvals import Approval
+from app.models.approvals.approvals_response import ApprovalsResponse
+from app.utils.approvals_json import encode_approvals_response
+
+# (amount, spender, symbol, price) as produced by the log processor before any model is built
+Record = Tuple[str, str, str, float]
+
+
+def make_records(approvals: int, addresses: int) -> Dict[str, List[Record]]:
+    rng = random.Random(7)
+    records: Dict[str, List[Record]] = {"0x" + rng.randbytes(20).hex(): [] for _ in range(addresses)}
+    owners = list(records)
+    for index in range(approvals):
+        records[owners[index % addresses]].append(
+            (f"{rng.getrandbits(64):,}", "0x" + rng.randbytes(20).hex(), f"TKN{index % 500}", rng.random() * 100)
+        )
+    return records
+
+
+def legacy_serialize(records: Dict[str, List[Record]], include_prices: bool) -> bytes:
+    # What the endpoint used to do: validated models, delattr on price fields, then FastAPI's response_model
+    # handling (dump, validate again, dump in JSON mode) and the standard json encoder
+    approvals_by_address = {
+        address: [Approval(amount=amount, spender_address=spender, token_symbol=symbol,
+                           price_usd=price if include_prices else None)
+                  for amount, spender, symbol, price in approvals]
+        for address, approvals in records.items()
+    }
+    if not include_prices:
+        for approvals in approvals_by_address.values():
+            for approval in approvals:
+                for price_field in ('price_usd', 'price_age_seconds'):
+                    delattr(approval, price_field)
+    response = ApprovalsResponse(approvalsByAddress=approvals_by_address, errorsByAddress={})
+    adapter = TypeAdapter(ApprovalsResponse)
+    content = adapter.dump_python(adapter.validate_python(response.model_dump()), mode="json")
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode()
+
+
+def fast_serialize(records: Dict[str, List[Record]], include_prices: bool) -> bytes:
+    approvals_by_address = {
+        address: [Approval(amount=amount, spender_address=spender, token_symbol=symbol,
+                           price_usd=price if include_prices else None)
+                  for amount, spender, symbol, price in approvals]
+        for address, approvals in records.items()
+    }
+    response = ApprovalsResponse.model_construct(approvalsByAddress=approvals_by_address, errorsByAddress={})
+    return encode_approvals_response(response, include_prices)
+
+
+def measure(repeat: int, fn: Callable[[], bytes]) -> Tuple[float, int, int]:
+    """Best wall time, peak traced memory of one run and the body size."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    tracemalloc.start()
+    body = fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return min(timings), peak, len(body)
+
+
+def get_args() -> Namespace:
+    parser: ArgumentParser = ArgumentParser(description="Compare /get_approvals response serialization paths.")
+    parser.add_argument('--approvals', type=int, default=100_000, help='Approvals in the response (default: 100000)')
+    parser.add_argument('--addresses', type=int, default=100)
+    parser.add_argument('--repeat', type=int, default=3)
+    return parser.parse_args()
+
+
+def main():
+    args: Namespace = get_args()
+    records = make_records(args.approvals, args.addresses)
+    print(f"Serializing {args.approvals:,} approvals of {args.addresses} addresses (best of {args.repeat})")
+    for include_prices in (False, True):
+        legacy_seconds, legacy_peak, legacy_size = measure(args.repeat,
+                                                           lambda: legacy_serialize(records, include_prices))
+        fast_seconds, fast_peak, fast_size = measure(args.repeat, lambda: fast_serialize(records, include_prices))
+        print(f" include_prices={include_prices}")
+        print(f"  legacy pydantic + json : {legacy_seconds * 1000:9.1f} ms  peak {legacy_peak / 2 ** 20:7.1f} MiB  "
+              f"({legacy_size:,} bytes)")
+        print(f"  single pass orjson     : {fast_seconds * 1000:9.1f} ms  peak {fast_peak / 2 ** 20:7.1f} MiB  "
+              f"({fast_size:,} bytes)  x{legacy_seconds / fast_seconds:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from argparse import ArgumentParser, Namespace
+from typing import Dict, List, Tuple
+
+import httpx
+
+from benchmarks.e2e.fake_upstreams import FakeCoingecko, FakeJsonRpc, SyntheticChain, UpstreamBehavior
+from benchmarks.e2e.run_e2e import REPO_ROOT, free_port, serve_in_thread
+
+MODES: Dict[str, Dict[str, str]] = {
+    "lazy (first request builds)": {"STARTUP_EAGER_INIT": "0", "STARTUP_WARMUP": "0"},
+    "eager": {"STARTUP_EAGER_INIT": "1", "STARTUP_WARMUP": "0"},
+    "eager + warm-up": {"STARTUP_EAGER_INIT": "1", "STARTUP_WARMUP": "1"},
+}
+OWNER = "0x28C6c06298d514Db089934071355E5743bf21d60"
+
+
+def get_env(rpc_url: str, coingecko_url: str, mode_env: Dict[str, str]) -> Dict[str, str]:
+    return {
+        **os.environ,
+        "INFURA_API_KEY": os.environ.get("INFURA_API_KEY", "benchmark"),
+        "ETH_RPC_URL": rpc_url,
+        "COINGECKO_API_URL": coingecko_url,
+        "PYTHONPATH": REPO_ROOT,
+        **mode_env,
+    }
+
+
+def measure_import(statement: str, env: Dict[str, str], workdir: str, runs: int) -> float:
+    """Median seconds a fresh interpreter spends on `statement`, interpreter start-up excluded."""
+    script = f"import time; start = time.perf_counter(); {statement}; print(time.perf_counter() - start)"
+    return statistics.median(
+        float(subprocess.check_output([sys.executable, "-c", script], cwd=workdir, env=env, text=True))
+        for _ in range(runs)
+    )
+
+
+def measure_first_response(env: Dict[str, str], workdir: str, timeout: float = 60) -> Tuple[float, float]:
+    """Seconds from spawning the server to its first /get_approvals response, and how long that request took."""
+    port = free_port()
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--log-level", "warning"],
+        cwd=workdir, env=env
+    )
+    try:
+        with httpx.Client(timeout=timeout) as client:
+            while time.perf_counter() - started < timeout:
+                request_started = time.perf_counter()
+                try:
+                    response = client.post(f"http://127.0.0.1:{port}/get_approvals", json={"addresses": [OWNER]})
+                except httpx.TransportError:
+                    time.sleep(0.01)
+                    continue
+                response.raise_for_status()
+                now = time.perf_counter()
+                return now - started, now - request_started
+        raise RuntimeError(f"No response within {timeout}s")
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
+
+
+def get_args() -> Namespace:
+    parser: ArgumentParser = ArgumentParser(
+        description="Measure import time and time-to-first-response of the app in each startup mode."
+    )
+    parser.add_argument('--runs', type=int, default=3, help='Repetitions per measurement, the median is reported')
+    parser.add_argument('--rpc-latency-ms', type=float, default=30)
+    parser.add_argument('--coingecko-latency-ms', type=float, default=50)
+    return parser.parse_args()
+
+
+def main():
+    args: Namespace = get_args()
+    chain = SyntheticChain(logs_per_wallet=50)
+    fake_rpc = FakeJsonRpc(chain, UpstreamBehavior(latency_ms=args.rpc_latency_ms))
+    fake_coingecko = FakeCoingecko(chain, UpstreamBehavior(latency_ms=args.coingecko_latency_ms))
+    rpc_port, coingecko_port = free_port(), free_port()
+    servers = [serve_in_thread(fake_rpc.app, rpc_port), serve_in_thread(fake_coingecko.app, coingecko_port)]
+    rpc_url = f"http://127.0.0.1:{rpc_port}/"
+    coingecko_url = f"http://127.0.0.1:{coingecko_port}/api/v3/simple/token_price/ethereum"
+
+    # Runs from a scratch directory so checkpoint and registry files do not leak between runs
+    with tempfile.TemporaryDirectory() as workdir:
+        env = get_env(rpc_url, coingecko_url, {})
+        print(f"Import time, median of {args.runs}:")
+        for label, statement in (("import main", "import main"),
+                                 ("main + Infura DAL module", "import main, app.dal.approvals.infura_approvals_dal"),
+                                 ("main + web3 and eth-abi", "import main, web3, eth_abi")):
+            print(f"  {label:<28}: {measure_import(statement, env, workdir, args.runs) * 1000:8.1f} ms")
+
+        print(f"Time to first /get_approvals response, median of {args.runs}:")
+        for label, mode_env in MODES.items():
+            results: List[Tuple[float, float]] = [
+                measure_first_response(get_env(rpc_url, coingecko_url, mode_env), workdir) for _ in range(args.runs)
+            ]
+            first_response = statistics.median(result[0] for result in results)
+            first_request = statistics.median(result[1] for result in results)
+            print(f"  {label:<28}: {first_response * 1000:8.1f} ms after spawn, "
+                  f"first request {first_request * 1000:7.1f} ms")
+
+    for server in servers:
+        server.should_exit = True
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,232 @@
+import asyncio
+import hashlib
+import json
+import random
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from eth_abi import decode, encode
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route
+
+APPROVAL_TOPIC = "0x8c5be1e5ebec7d5bd14f71427d1e84f3dd0314c0f7b2291e5b200ac8c7c3b925"
+MULTICALL3_ADDRESS = "0xca11bde05977b3631167028862be2a173976ca11"
+TRY_AGGREGATE_SELECTOR = bytes.fromhex("bce38bd7")
+SYMBOL_SELECTOR = bytes.fromhex("95d89b41")
+ALLOWANCE_SELECTOR = bytes.fromhex("dd62ed3e")
+MAX_UINT256 = 2 ** 256 - 1
+
+# (block_number, log_index, token, spender, amount)
+SyntheticLog = Tuple[int, int, str, str, int]
+
+
+def _digest(*parts: object) -> bytes:
+    return hashlib.sha256("|".join(str(part) for part in parts).encode()).digest()
+
+
+def _address(*parts: object) -> str:
+    return "0x" + _digest(*parts)[:20].hex()
+
+
+@dataclass
+class UpstreamBehavior:
+    latency_ms: float = 20.0
+    jitter_ms: float = 10.0
+    error_rate: float = 0.0
+    throttle_rate: float = 0.0
+    retry_after: int = 1
+
+
+@dataclass
+class SyntheticChain:
+    """Deterministic chain with `logs_per_wallet` Approval logs for every owner that is queried."""
+    logs_per_wallet: int = 200
+    tokens: int = 300
+    spenders: int = 25
+    head_block: int = 20_000_000
+    block_interval: float = 12.0
+    result_cap: int = 10_000
+    started_at: float = field(default_factory=time.monotonic)
+    _wallets: Dict[str, List[SyntheticLog]] = field(default_factory=dict)
+
+    def token_address(self, index: int) -> str:
+        return _address("token", index)
+
+    def current_head(self) -> int:
+        if self.block_interval <= 0:
+            return self.head_block
+        return self.head_block + int((time.monotonic() - self.started_at) / self.block_interval)
+
+    def wallet_logs(self, owner: str) -> List[SyntheticLog]:
+        owner = owner.lower()
+        if owner not in self._wallets:
+            rng = random.Random(owner)
+            spenders = [_address("spender", index) for index in range(self.spenders)]
+            logs = []
+            for index in range(self.logs_per_wallet):
+                block_number = rng.randint(1, self.head_block)
+                amount = MAX_UINT256 if rng.random() < 0.3 else rng.randint(0, 10 ** 24)
+                logs.append((block_number, index % 8, self.token_address(rng.randrange(self.tokens)),
+                             rng.choice(spenders), amount))
+            logs.sort()
+            self._wallets[owner] = logs
+        return self._wallets[owner]
+
+    def symbol_return_data(self, token: str) -> Optional[bytes]:
+        index = next((i for i in range(self.tokens) if self.token_address(i) == token.lower()), None)
+        if index is None or index % 50 == 49:
+            return None  # Reverts
+        if index % 25 == 24:
+            return f"B{index}".encode().ljust(32, b"\x00")  # Legacy bytes32 symbol
+        return encode(["string"], [f"TKN{index}"])
+
+
+class FakeJsonRpc:
+    def __init__(self, chain: SyntheticChain, behavior: UpstreamBehavior):
+        self.chain = chain
+        self.behavior = behavior
+        self.calls: Counter = Counter()
+        self.app = Starlette(routes=[Route("/", self.handle, methods=["POST"]),
+                                     Route("/__stats", self.stats, methods=["GET"])])
+
+    async def stats(self, request: Request) -> JSONResponse:
+        return JSONResponse(dict(self.calls))
+
+    async def handle(self, request: Request) -> Response:
+        body = await request.json()
+        await _simulate_latency(self.behavior)
+        if random.random() < self.behavior.throttle_rate:
+            self.calls["throttled"] += 1
+            return Response(status_code=429, headers={"Retry-After": str(self.behavior.retry_after)})
+        if isinstance(body, list):
+            return JSONResponse([self._dispatch(item) for item in body])
+        return JSONResponse(self._dispatch(body))
+
+    def _dispatch(self, payload: dict) -> dict:
+        method = payload.get("method")
+        self.calls[method] += 1
+        result = {"jsonrpc": "2.0", "id": payload.get("id")}
+        if random.random() < self.behavior.error_rate:
+            self.calls["errors"] += 1
+            return {**result, "error": {"code": -32603, "message": "internal error"}}
+        try:
+            if method == "eth_blockNumber":
+                return {**result, "result": hex(self.chain.current_head())}
+            if method == "eth_chainId":
+                return {**result, "result": "0x1"}
+            if method == "eth_getLogs":
+                return {**result, **self._get_logs(payload["params"][0])}
+            if method == "eth_call":
+                return {**result, "result": self._call(payload["params"][0])}
+        except (KeyError, ValueError, IndexError) as e:
+            return {**result, "error": {"code": -32602, "message": f"invalid params: {e}"}}
+        return {**result, "error": {"code": -32601, "message": f"method {method} not supported"}}
+
+    def _get_logs(self, filter_params: dict) -> dict:
+        from_block = _parse_block(filter_params.get("fromBlock", "0x0"), self.chain.current_head())
+        to_block = _parse_block(filter_params.get("toBlock", "latest"), self.chain.current_head())
+        topics = filter_params.get("topics") or []
+        if not topics or topics[0].lower() != APPROVAL_TOPIC:
+            return {"result": []}
+        owner_topics = topics[1] if len(topics) > 1 else None
+        owner_topics = [owner_topics] if isinstance(owner_topics, str) else owner_topics or []
+        logs = []
+        for owner_topic in owner_topics:
+            owner = "0x" + owner_topic[-40:].lower()
+            for block_number, log_index, token, spender, amount in self.chain.wallet_logs(owner):
+                if from_block <= block_number <= to_block:
+                    logs.append(_rpc_log(owner, block_number, log_index, token, spender, amount))
+        if len(logs) > self.chain.result_cap:
+            self.calls["eth_getLogs_capped"] += 1
+            return {"error": {"code": -32005, "message": f"query returned more than {self.chain.result_cap} results"}}
+        logs.sort(key=lambda log: (int(log["blockNumber"], 16), int(log["logIndex"], 16)))
+        return {"result": logs}
+
+    def _call(self, transaction: dict) -> str:
+        to = transaction["to"].lower()
+        data = bytes.fromhex((transaction.get("data") or transaction.get("input"))[2:])
+        if to == MULTICALL3_ADDRESS and data[:4] == TRY_AGGREGATE_SELECTOR:
+            _, calls = decode(["bool", "(address,bytes)[]"], data[4:])
+            self.calls["multicall_subcalls"] += len(calls)
+            results = [self._single_call(target, call_data) for target, call_data in calls]
+            return "0x" + encode(["(bool,bytes)[]"], [[(r is not None, r or b"") for r in results]]).hex()
+        result = self._single_call(to, data)
+        if result is None:
+            raise ValueError("execution reverted")
+        return "0x" + result.hex()
+
+    def _single_call(self, target: str, call_data: bytes) -> Optional[bytes]:
+        if call_data[:4] == SYMBOL_SELECTOR:
+            return self.chain.symbol_return_data(target)
+        if call_data[:4] == ALLOWANCE_SELECTOR:
+            owner, spender = decode(["address", "address"], call_data[4:])
+            latest = [amount for _, _, token, log_spender, amount in self.chain.wallet_logs(owner)
+                      if token == target.lower() and log_spender == spender.lower()]
+            remaining = latest[-1] if latest else 0
+            # Pretend a third of the finite allowances have been fully spent through transferFrom
+            if remaining != MAX_UINT256 and _digest(owner, target, spender)[0] % 3 == 0:
+                remaining = 0
+            return encode(["uint256"], [remaining])
+        return None
+
+
+class FakeCoingecko:
+    def __init__(self, chain: SyntheticChain, behavior: UpstreamBehavior):
+        self.chain = chain
+        self.behavior = behavior
+        self.calls: Counter = Counter()
+        self.app = Starlette(routes=[Route("/{path:path}", self.handle, methods=["GET"])])
+
+    async def handle(self, request: Request) -> Response:
+        if request.url.path == "/__stats":
+            return JSONResponse(dict(self.calls))
+        await _simulate_latency(self.behavior)
+        self.calls["requests"] += 1
+        if random.random() < self.behavior.throttle_rate:
+            self.calls["throttled"] += 1
+            return Response(status_code=429, headers={"Retry-After": str(self.behavior.retry_after)})
+        if random.random() < self.behavior.error_rate:
+            self.calls["errors"] += 1
+            return Response(status_code=500)
+        addresses = [a.strip().lower() for a in request.query_params.get("contract_addresses", "").split(",") if a]
+        self.calls["addresses"] += len(addresses)
+        prices = {}
+        for address in addresses:
+            digest = _digest("price", address)
+            if digest[0] % 10:  # ~10% of tokens have no price
+                prices[address] = {"usd": int.from_bytes(digest[1:4], "big") / 1000}
+        return Response(json.dumps(prices), media_type="application/json")
+
+
+async def _simulate_latency(behavior: UpstreamBehavior) -> None:
+    delay = behavior.latency_ms + random.uniform(-behavior.jitter_ms, behavior.jitter_ms)
+    if delay > 0:
+        await asyncio.sleep(delay / 1000)
+
+
+def _parse_block(value, head: int) -> int:
+    if isinstance(value, int):
+        return value
+    if value in ("latest", "safe", "finalized", "pending"):
+        return head
+    if value == "earliest":
+        return 0
+    return int(value, 16)
+
+
+def _rpc_log(owner: str, block_number: int, log_index: int, token: str, spender: str, amount: int) -> dict:
+    return {
+        "address": token,
+        "blockHash": "0x" + _digest("block", block_number).hex(),
+        "blockNumber": hex(block_number),
+        "data": "0x" + amount.to_bytes(32, "big").hex(),
+        "logIndex": hex(log_index),
+        "removed": False,
+        "topics": [APPROVAL_TOPIC, "0x" + "00" * 12 + owner[2:], "0x" + "00" * 12 + spender[2:]],
+        "transactionHash": "0x" + _digest("tx", owner, block_number, log_index).hex(),
+        "transactionIndex": hex(log_index),
+    }
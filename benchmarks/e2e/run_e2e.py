@@ -0,0 +1,219 @@
+import asyncio
+import json
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from argparse import ArgumentParser, Namespace
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+import httpx
+import uvicorn
+
+from benchmarks.e2e.fake_upstreams import FakeCoingecko, FakeJsonRpc, SyntheticChain, UpstreamBehavior
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+RESULTS_DIR = os.path.join(REPO_ROOT, "benchmarks", "results")
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def serve_in_thread(app, port: int) -> uvicorn.Server:
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+
+def start_app(rpc_url: str, coingecko_url: str, port: int, workers: int, workdir: str) -> subprocess.Popen:
+    env = {
+        **os.environ,
+        "INFURA_API_KEY": os.environ.get("INFURA_API_KEY", "benchmark"),
+        "ETH_RPC_URL": rpc_url,
+        "COINGECKO_API_URL": coingecko_url,
+        "PYTHONPATH": REPO_ROOT,
+    }
+    # Runs from a scratch directory so checkpoint and registry files do not leak between runs
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(workers), "--log-level", "warning"],
+        cwd=workdir, env=env
+    )
+
+
+async def wait_until_ready(base_url: str, timeout: float = 30) -> None:
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            try:
+                await client.get(f"{base_url}/docs")
+                return
+            except httpx.TransportError:
+                await asyncio.sleep(0.1)
+    raise RuntimeError(f"App at {base_url} did not start within {timeout}s")
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+async def drive_load(base_url: str, args: Namespace) -> Dict:
+    rng = random.Random(args.seed)
+    wallets = ["0x" + rng.randbytes(20).hex() for _ in range(args.wallets)]
+    latencies: List[float] = []
+    statuses: Dict[str, int] = {}
+    request_budget = iter(range(args.requests))
+
+    async def client_loop(client: httpx.AsyncClient):
+        for _ in request_budget:
+            body = {"addresses": rng.sample(wallets, min(args.addresses_per_request, len(wallets))),
+                    "include_prices": args.include_prices}
+            start = time.perf_counter()
+            try:
+                response = await client.post(f"{base_url}/get_approvals", json=body)
+                status = str(response.status_code)
+            except httpx.HTTPError as e:
+                status = type(e).__name__
+            latencies.append(time.perf_counter() - start)
+            statuses[status] = statuses.get(status, 0) + 1
+
+    limits = httpx.Limits(max_connections=args.concurrency)
+    async with httpx.AsyncClient(timeout=args.request_timeout, limits=limits) as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(client_loop(client) for _ in range(args.concurrency)))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "elapsed_seconds": elapsed,
+        "throughput_rps": len(latencies) / elapsed if elapsed else 0.0,
+        "latency_ms": {
+            "mean": statistics.fmean(latencies) * 1000 if latencies else 0.0,
+            "p50": percentile(latencies, 0.50) * 1000,
+            "p95": percentile(latencies, 0.95) * 1000,
+            "p99": percentile(latencies, 0.99) * 1000,
+            "max": latencies[-1] * 1000 if latencies else 0.0,
+        },
+        "statuses": statuses,
+    }
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(result: Dict, baseline: Dict) -> None:
+    print(f"\nCompared to {baseline.get('label')} ({baseline.get('revision')}):")
+    rows = [("throughput_rps", result["throughput_rps"], baseline["throughput_rps"])]
+    rows += [(f"latency {key}", result["latency_ms"][key], baseline["latency_ms"][key])
+             for key in ("p50", "p95", "p99")]
+    for upstream in ("rpc", "coingecko"):
+        for key, value in result["upstream_calls"][upstream].items():
+            rows.append((f"{upstream} {key}", value, baseline["upstream_calls"].get(upstream, {}).get(key, 0)))
+    for name, current, previous in rows:
+        change = f"{(current - previous) / previous * 100:+.1f}%" if previous else "n/a"
+        print(f"  {name:<32} {previous:>12.1f} -> {current:>12.1f}  {change}")
+
+
+def get_args() -> Namespace:
+    parser: ArgumentParser = ArgumentParser(
+        description="Benchmark POST /get_approvals against local fake JSON-RPC and CoinGecko servers."
+    )
+    parser.add_argument('--label', default=datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S"),
+                        help='Name of the stored result file')
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=10)
+    parser.add_argument('--wallets', type=int, default=50, help='Size of the wallet pool requests sample from')
+    parser.add_argument('--addresses-per-request', type=int, default=5)
+    parser.add_argument('--include-prices', action='store_true')
+    parser.add_argument('--logs-per-wallet', type=int, default=200)
+    parser.add_argument('--tokens', type=int, default=300)
+    parser.add_argument('--rpc-latency-ms', type=float, default=30)
+    parser.add_argument('--rpc-error-rate', type=float, default=0.0)
+    parser.add_argument('--rpc-429-rate', type=float, default=0.0)
+    parser.add_argument('--coingecko-latency-ms', type=float, default=50)
+    parser.add_argument('--coingecko-error-rate', type=float, default=0.0)
+    parser.add_argument('--coingecko-429-rate', type=float, default=0.0)
+    parser.add_argument('--app-workers', type=int, default=1)
+    parser.add_argument('--request-timeout', type=float, default=60)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--compare', help='Result JSON to compare against')
+    return parser.parse_args()
+
+
+async def run(args: Namespace) -> Dict:
+    chain = SyntheticChain(logs_per_wallet=args.logs_per_wallet, tokens=args.tokens)
+    fake_rpc = FakeJsonRpc(chain, UpstreamBehavior(latency_ms=args.rpc_latency_ms, error_rate=args.rpc_error_rate,
+                                                   throttle_rate=args.rpc_429_rate))
+    fake_coingecko = FakeCoingecko(chain, UpstreamBehavior(latency_ms=args.coingecko_latency_ms,
+                                                           error_rate=args.coingecko_error_rate,
+                                                           throttle_rate=args.coingecko_429_rate))
+    rpc_port, coingecko_port, app_port = free_port(), free_port(), free_port()
+    servers = [serve_in_thread(fake_rpc.app, rpc_port), serve_in_thread(fake_coingecko.app, coingecko_port)]
+
+    with tempfile.TemporaryDirectory() as workdir:
+        app_process = start_app(f"http://127.0.0.1:{rpc_port}/",
+                                f"http://127.0.0.1:{coingecko_port}/api/v3/simple/token_price/ethereum",
+                                app_port, args.app_workers, workdir)
+        try:
+            base_url = f"http://127.0.0.1:{app_port}"
+            await wait_until_ready(base_url)
+            metrics = await drive_load(base_url, args)
+        finally:
+            app_process.terminate()
+            app_process.wait(timeout=10)
+            for server in servers:
+                server.should_exit = True
+
+    return {
+        "label": args.label,
+        "revision": git_revision(),
+        "recorded_at": datetime.now(timezone.utc).isoformat(),
+        "parameters": {key: value for key, value in vars(args).items() if key not in ("label", "compare")},
+        **metrics,
+        "upstream_calls": {"rpc": dict(fake_rpc.calls), "coingecko": dict(fake_coingecko.calls)},
+    }
+
+
+def main():
+    args: Namespace = get_args()
+    result = asyncio.run(run(args))
+
+    latency = result["latency_ms"]
+    print(f"{result['requests']} requests in {result['elapsed_seconds']:.2f}s "
+          f"({result['throughput_rps']:.1f} req/s), statuses {result['statuses']}")
+    print(f"latency ms: p50 {latency['p50']:.1f}  p95 {latency['p95']:.1f}  p99 {latency['p99']:.1f}  "
+          f"max {latency['max']:.1f}")
+    print(f"upstream calls: rpc {result['upstream_calls']['rpc']}  coingecko {result['upstream_calls']['coingecko']}")
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    path = os.path.join(RESULTS_DIR, f"{args.label}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(result, f, indent=2)
+    print(f"Stored results in {path}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            compare(result, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,103 @@
+import os
+
 API_KEY = "your-api-key-here"
 
+# Directory for on-disk state: token registry, approvals checkpoints and the sqlite shared cache. Unset, the
+# registry and checkpoints are disabled and nothing is written to the working directory. Point it at a volume that
+# outlives the container so the state survives restarts.
+APPROVALS_DATA_DIR = os.environ.get("APPROVALS_DATA_DIR")
+
+
+def _data_path(file_name: str):
+    return os.path.join(APPROVALS_DATA_DIR, file_name) if APPROVALS_DATA_DIR else None
+
+
 LRU_CACHE_MAXSIZE = 1000
 
 APPROVALS_API_RETRIES = 3
-APPROVALS_SERVICE_CONCURRENCY_LIMIT = 5  # Renamed from APPROVALS_API_CONCURRENCY_LIMIT
-LOG_PROCESSOR_CONCURRENCY_LIMIT = 5
-APPROVALS_API_RETRY_DELAY = 1
+APPROVALS_API_RETRY_DELAY = 1  # Base of the exponential backoff with jitter, a Retry-After from the upstream wins
+APPROVALS_API_RETRY_MAX_DELAY = 10
+APPROVALS_STREAM_MAX_IN_FLIGHT = 5  # Addresses processed concurrently for one streaming request
+APPROVALS_STREAM_QUEUE_SIZE = 16  # Finished addresses buffered before workers wait for the client to read
+APPROVALS_BATCH_PRIORITY_MIN_ADDRESSES = 100  # Requests this large without an explicit priority are scheduled as batch
+APPROVALS_REQUEST_TIMEOUT = None  # Deadline in seconds of requests that set none, None for no deadline
+APPROVALS_DEADLINE_MARGIN = 0.05  # Seconds of a deadline kept to encode and send the partial response
+
+COINGECKO_API_URL = os.environ.get("COINGECKO_API_URL",
+                                   "https://api.coingecko.com/api/v3/simple/token_price/ethereum")
+COINGECKO_MAX_ADDRESSES_PER_REQUEST = 100  # Lower this if the CoinGecko plan limits contract_addresses per call
+COINGECKO_MAX_URL_LENGTH = 2000
+COINGECKO_MAX_CONNECTIONS = 10
+COINGECKO_TIMEOUT = 10
+COINGECKO_RETRIES = 2  # Retries of a rate limited or failed price request
+
+PRICE_CACHE_TTL = 60  # Seconds a price is served as fresh
+PRICE_CACHE_NEGATIVE_TTL = 600  # Seconds a "no price" result is served as fresh
+PRICE_CACHE_STALE_GRACE = 240  # Seconds past the TTL a price is still served while it refreshes in the background
+PRICE_HOT_REFRESH_INTERVAL = 30
+PRICE_HOT_REFRESH_TOP_N = 200
+
+GET_LOGS_SHARD_SIZE = 2_500_000  # Blocks per eth_getLogs shard, oversized shards are bisected on provider caps
+GET_LOGS_CONCURRENCY_LIMIT = 4
+GET_LOGS_OWNER_BATCH_SIZE = 100  # Owners OR-ed into topic[1] of a single eth_getLogs filter
+APPROVALS_BATCH_MIN_ADDRESSES = 10  # Requests with at least this many addresses prefetch logs in batches
+
+LOG_DECODE_PROCESS_POOL_THRESHOLD = 0  # Decode log sets at least this large in a process pool (multi-core hosts), 0 disables
+LOG_DECODE_PROCESS_POOL_WORKERS = 4
+
+TOKEN_REGISTRY_PATH = _data_path("token_registry.bin")  # Build with `python -m app.cli.build_token_registry`
+MULTICALL_BATCH_SIZE = 200  # symbol() calls aggregated into one Multicall3 tryAggregate eth_call
+
+APPROVALS_CHECKPOINT_DB_PATH = _data_path("approvals_checkpoints.sqlite3")  # None disables incremental scanning
+APPROVALS_CHECKPOINT_CONFIRMATIONS = 12
+
+# Extra JSON-RPC endpoints, comma separated; with any set, calls are routed over a pool together with Infura
+ETH_RPC_URLS = [url.strip() for url in os.environ.get("ETH_RPC_URLS", "").split(",") if url.strip()]
+RPC_HEDGE_PERCENTILE = 0.95  # Duplicate a read call to a second endpoint once it is slower than this percentile
+RPC_HEDGE_MIN_DELAY = 0.05
+RPC_EWMA_ALPHA = 0.2
+RPC_CIRCUIT_FAILURE_THRESHOLD = 5  # Consecutive failures before an endpoint is skipped
+RPC_CIRCUIT_COOLDOWN = 30
+RPC_REQUEST_TIMEOUT = 10  # Seconds per JSON-RPC call, with or without extra endpoints; web3 does not retry on its own
+
+# Adaptive (AIMD) concurrency limits per upstream, shared by all requests of a worker process
+INFURA_CONCURRENCY_INITIAL = 8
+INFURA_CONCURRENCY_MIN = 1
+INFURA_CONCURRENCY_MAX = 64
+COINGECKO_CONCURRENCY_INITIAL = 4
+COINGECKO_CONCURRENCY_MIN = 1
+COINGECKO_CONCURRENCY_MAX = 10
+ADAPTIVE_LIMIT_BACKOFF_RATIO = 0.5  # Limit multiplier on a 429, 503, timeout or latency spike
+ADAPTIVE_LIMIT_LATENCY_TOLERANCE = 2.0  # Recent latency over this multiple of the long-term latency counts as congestion
+INFURA_RATE_LIMIT = 0  # Calls per second across all requests of a worker process, 0 disables the token bucket
+INFURA_RATE_BURST = 20
+COINGECKO_RATE_LIMIT = 0
+COINGECKO_RATE_BURST = 5
+
+RESPONSE_CACHE_ENABLED = True  # Reuse serialized /get_approvals responses until a new block arrives
+RESPONSE_CACHE_MAXSIZE = 1000
+RESPONSE_CACHE_MAX_BLOCK_LAG = 0  # Blocks the head may advance before a cached response is recomputed
+RESPONSE_CACHE_HEAD_TTL = 2  # Seconds the head block number is reused between requests
+
+# Second-level token symbol and price cache behind the per-process caches: "none", "memory" (in-process),
+# "sqlite" (file shared by the workers of a host) or "redis" (any Redis-protocol server, shared across hosts)
+SHARED_CACHE_BACKEND = os.environ.get("SHARED_CACHE_BACKEND", "none")
+SHARED_CACHE_MAXSIZE = 100_000  # Entries of the memory and sqlite backends, Redis is bounded by its maxmemory policy
+SHARED_CACHE_SQLITE_PATH = _data_path("shared_cache.sqlite3")  # Required by the sqlite backend
+SHARED_CACHE_REDIS_URL = os.environ.get("SHARED_CACHE_REDIS_URL", "redis://localhost:6379/0")
+SHARED_CACHE_REDIS_POOL_SIZE = 4
+SHARED_CACHE_TIMEOUT = 0.5  # Seconds before a Redis lookup counts as a miss
+SHARED_CACHE_KEY_PREFIX = "approvals:"
+
+APPROVALS_DAL = "infura"  # "offline" serves from OFFLINE_APPROVALS_INDEX_PATH without RPC calls
+OFFLINE_APPROVALS_INDEX_PATH = "approvals_index.bin"  # Build with `python -m app.cli.backfill_approvals`
+
+# Build the DALs, the service and their connection pools in the app lifespan instead of on the first request
+STARTUP_EAGER_INIT = os.environ.get("STARTUP_EAGER_INIT", "0") == "1"
+STARTUP_WARMUP = os.environ.get("STARTUP_WARMUP", "0") == "1"  # Read the head block once at startup to open connections
+STARTUP_WARMUP_TIMEOUT = 10  # Seconds the warm-up may delay startup; a failed warm-up is only logged
 
-COINGECKO_API_URL = "https://api.coingecko.com/api/v3/simple/token_price/ethereum"
+APPROVALS_INDEXER_ENABLED = False  # Keep the approvals of a watch-set of owners in memory, following new blocks
+APPROVALS_INDEXER_WATCHLIST_PATH = None  # Text file with one watched owner address per line
+APPROVALS_INDEXER_POLL_INTERVAL = 12
+APPROVALS_INDEXER_REORG_DEPTH = 12  # Blocks re-fetched on every poll so reorged logs are dropped
@@ -1,5 +1,53 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
-from app.controllers.approvals_controller import router as approvals_router
+from app.controllers.approvals_controller import (get_approvals_dal, get_approvals_response_cache,
+                                                  get_approvals_service, router as approvals_router)
+from app.controllers.metrics_controller import router as metrics_router
+from app.dal.cache.shared_cache import close_cache_backend
+from app.dal.token_price.coingecko_token_price_dal import CoingeckoTokenPriceDAL
+from app.services.approvals_indexer import ApprovalsIndexer, read_watchlist
+from app.utils.config_loader import config
+from app.utils.log_decoder import shutdown_process_pool
+from app.utils.metrics import MetricsMiddleware
+
+logger = logging.getLogger(__name__)
+
+
+async def warm_up() -> None:
+    """One cheap upstream call so the first request finds the RPC connection open; failures are only logged."""
+    try:
+        head_block = await asyncio.wait_for(get_approvals_dal().get_block_number(), config.startup_warmup_timeout)
+        logger.info(f"Warm-up read head block {head_block}")
+    except Exception as e:
+        logger.warning(f"Warm-up call failed, the first request opens the connections instead: {e!r}")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if config.startup_eager_init:
+        # Built here rather than by the first request's Depends, which would otherwise pay for imports and pools
+        get_approvals_service()
+        get_approvals_response_cache()
+        if config.startup_warmup:
+            await warm_up()
+    CoingeckoTokenPriceDAL.get_instance().start_background_refresh()
+    indexer = ApprovalsIndexer.get_instance(get_approvals_dal()) if config.approvals_indexer_enabled else None
+    if indexer is not None:
+        if config.approvals_indexer_watchlist_path:
+            indexer.watch(read_watchlist(config.approvals_indexer_watchlist_path))
+        indexer.start()
+    yield
+    if indexer is not None:
+        await indexer.stop()
+    await CoingeckoTokenPriceDAL.get_instance().aclose()
+    await close_cache_backend()
+    shutdown_process_pool()
+
 
-app = FastAPI()
-app.include_router(approvals_router)
\ No newline at end of file
+app = FastAPI(lifespan=lifespan)
+app.add_middleware(MetricsMiddleware)
+app.include_router(approvals_router)
+app.include_router(metrics_router)
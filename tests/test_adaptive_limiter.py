@@ -0,0 +1,165 @@
+import asyncio
+
+import httpx
+import pytest
+
+from app.utils.adaptive_limiter import LIMIT_CHANGES, AdaptiveLimiter
+from app.utils.backoff import OverloadedError, backoff_delay, get_retry_after, is_overload_error, parse_retry_after
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+async def run_call(limiter, clock, latency, error=None, kind="default"):
+    async with limiter.slot(kind):
+        await asyncio.sleep(0)
+        clock.now += latency
+        if error is not None:
+            raise error
+
+
+@pytest.mark.asyncio
+async def test_limit_grows_while_saturated_and_latency_is_stable():
+    # Arrange
+    clock = FakeClock()
+    limiter = AdaptiveLimiter("test", initial_limit=2, min_limit=1, max_limit=10, clock=clock)
+
+    # Act
+    for _ in range(20):
+        await asyncio.gather(*(run_call(limiter, clock, 0.0) for _ in range(limiter.limit)))
+
+    # Assert
+    assert limiter.limit > 2
+
+
+@pytest.mark.asyncio
+async def test_overload_halves_the_limit_once_per_round():
+    # Arrange
+    clock = FakeClock()
+    limiter = AdaptiveLimiter("test", initial_limit=8, min_limit=1, max_limit=10, clock=clock)
+    await limiter.acquire()
+    await limiter.acquire()
+
+    # Act: both calls started before the first 429 arrived, only one decrease is applied
+    limiter.release(started=0.0, overloaded=True)
+    clock.now = 1.0
+    limiter.release(started=0.0, overloaded=True)
+
+    # Assert
+    assert limiter.limit == 4
+
+
+@pytest.mark.asyncio
+async def test_latency_spike_reduces_the_limit():
+    # Arrange
+    clock = FakeClock()
+    limiter = AdaptiveLimiter("test", initial_limit=8, min_limit=1, max_limit=10, latency_tolerance=2.0, clock=clock)
+    for _ in range(10):
+        await run_call(limiter, clock, 0.1)
+
+    # Act
+    for _ in range(5):
+        await run_call(limiter, clock, 2.0)
+
+    # Assert
+    assert limiter.limit < 8
+
+
+@pytest.mark.asyncio
+async def test_slow_call_kind_does_not_look_like_congestion_of_fast_kind():
+    # Arrange
+    clock = FakeClock()
+    limiter = AdaptiveLimiter("test_mixed", initial_limit=8, min_limit=1, max_limit=10, latency_tolerance=2.0,
+                              clock=clock)
+    decreases = LIMIT_CHANGES.labels("test_mixed", "latency")
+    for _ in range(20):
+        await run_call(limiter, clock, 0.05, kind="eth_call")
+
+    # Act
+    for _ in range(5):
+        await run_call(limiter, clock, 3.0, kind="get_logs")
+        await run_call(limiter, clock, 0.05, kind="eth_call")
+
+    # Assert
+    assert decreases.value == 0
+    assert limiter.limit == 8
+
+
+@pytest.mark.asyncio
+async def test_waiters_are_released_in_order_and_bounded_by_the_limit():
+    # Arrange
+    limiter = AdaptiveLimiter("test", initial_limit=1, min_limit=1, max_limit=1)
+    order = []
+    release = asyncio.Event()
+
+    async def call(index):
+        async with limiter.slot():
+            order.append(index)
+            assert limiter.in_flight == 1
+            await release.wait()
+
+    # Act
+    tasks = [asyncio.create_task(call(index)) for index in range(3)]
+    await asyncio.sleep(0)
+    waiting = limiter.waiting
+    release.set()
+    await asyncio.gather(*tasks)
+
+    # Assert
+    assert waiting == 2
+    assert order == [0, 1, 2]
+    assert limiter.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_does_not_leak_a_slot():
+    # Arrange
+    limiter = AdaptiveLimiter("test", initial_limit=1, min_limit=1, max_limit=1)
+    await limiter.acquire()
+    waiter = asyncio.create_task(limiter.acquire())
+    await asyncio.sleep(0)
+
+    # Act
+    waiter.cancel()
+    await asyncio.gather(waiter, return_exceptions=True)
+    limiter.release(started=0.0)
+
+    # Assert
+    assert limiter.waiting == 0
+    assert limiter.in_flight == 0
+
+
+def test_overload_errors_are_recognised_through_the_cause_chain():
+    # Arrange
+    response = httpx.Response(429, headers={"Retry-After": "3"}, request=httpx.Request("GET", "http://x"))
+    try:
+        try:
+            raise httpx.HTTPStatusError("rate limited", request=response.request, response=response)
+        except httpx.HTTPStatusError as e:
+            raise RuntimeError("Error fetching logs") from e
+    except RuntimeError as e:
+        wrapped = e
+
+    # Act / Assert
+    assert is_overload_error(wrapped)
+    assert get_retry_after(wrapped) == 3.0
+    assert is_overload_error(asyncio.TimeoutError())
+    assert is_overload_error(ValueError({"code": -32005, "message": "project ID request rate exceeded"}))
+    assert not is_overload_error(ValueError("query returned more than 10000 results"))
+    assert get_retry_after(OverloadedError("busy", retry_after=1.5)) == 1.5
+
+
+def test_backoff_delay_is_jittered_capped_and_honors_retry_after():
+    # Act / Assert
+    assert backoff_delay(0, 1.0, 10.0, rand=lambda: 1.0) == 1.0
+    assert backoff_delay(3, 1.0, 10.0, rand=lambda: 1.0) == 8.0
+    assert backoff_delay(10, 1.0, 10.0, rand=lambda: 1.0) == 10.0
+    assert backoff_delay(10, 1.0, 10.0, rand=lambda: 0.5) == 5.0
+    assert backoff_delay(0, 1.0, 10.0, retry_after=30.0, rand=lambda: 1.0) == 30.0
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:10 GMT", now=lambda: 1445412480) == 10.0
+    assert parse_retry_after("soon") is None
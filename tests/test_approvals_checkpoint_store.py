@@ -0,0 +1,47 @@
+from app.dal.approvals.approvals_checkpoint_store import ApprovalsCheckpointStore
+from app.models.approvals.approvals import ApprovalLog
+from app.utils.log_processor import reduce_latest_approvals
+
+
+def make_log(block_number, amount, spender="0xSp1", log_index=0):
+    return ApprovalLog(block_number=block_number, transaction_hash="0xtx", spender=spender, amount=amount,
+                       token_address="0xTkn", log_index=log_index)
+
+
+def test_load_unknown_owner(tmp_path):
+    # Arrange
+    store = ApprovalsCheckpointStore(str(tmp_path / "checkpoints.sqlite3"))
+
+    # Act
+    last_scanned_block, approval_logs = store.load("0xabc")
+
+    # Assert
+    assert last_scanned_block is None
+    assert approval_logs == []
+
+
+def test_save_and_load_merges_latest(tmp_path):
+    # Arrange
+    store = ApprovalsCheckpointStore(str(tmp_path / "checkpoints.sqlite3"))
+    store.save("0xABC", 100, [make_log(10, 2 ** 256 - 1)])
+
+    # Act
+    store.save("0xabc", 200, [make_log(150, 5, spender="0xsp1")])
+    last_scanned_block, approval_logs = store.load("0xAbC")
+
+    # Assert
+    assert last_scanned_block == 200
+    assert len(approval_logs) == 1
+    assert approval_logs[0].block_number == 150
+    assert approval_logs[0].amount == 5
+
+
+def test_reduce_latest_approvals_merges_into_existing_state():
+    # Arrange
+    latest = reduce_latest_approvals([make_log(10, 1), make_log(10, 2, log_index=3)])
+
+    # Act
+    reduce_latest_approvals([make_log(5, 7), make_log(20, 9, spender="0xsp2")], latest)
+
+    # Assert
+    assert {key: log.amount for key, log in latest.items()} == {("0xtkn", "0xsp1"): 2, ("0xtkn", "0xsp2"): 9}
@@ -0,0 +1,109 @@
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+from app.models.approvals.approvals import ApprovalLog
+from app.services.approvals_indexer import ApprovalsIndexer, read_watchlist
+
+OWNER = "0x00000000000000000000000000000000000000aa"
+
+
+def log(block_number, spender="0xsp1", amount=1, token="0xtoken"):
+    return ApprovalLog(block_number=block_number, transaction_hash=f"0x{block_number:x}", spender=spender,
+                       amount=amount, token_address=token, log_index=0)
+
+
+class FakeChain:
+    def __init__(self, head, logs):
+        self.head = head
+        self.logs = logs
+        self.ranges = []
+
+    def get_dal(self):
+        dal = MagicMock()
+        dal.get_block_number = AsyncMock(side_effect=lambda: self.head)
+        dal.fetch_approval_logs_range = AsyncMock(side_effect=self.fetch_range)
+        dal.get_token_symbol = AsyncMock(return_value="TKN")
+        dal.get_token_symbols = AsyncMock(side_effect=lambda addresses: {address: "TKN" for address in addresses})
+        return dal
+
+    async def fetch_range(self, owners, from_block, to_block, split_block=None):
+        self.ranges.append((tuple(owners), from_block, to_block))
+        return {owner: [entry for entry in self.logs if from_block <= entry.block_number <= to_block]
+                for owner in owners}
+
+
+@pytest.fixture(autouse=True)
+def reorg_config(monkeypatch):
+    config = MagicMock()
+    config.approvals_indexer_reorg_depth = 5
+    monkeypatch.setattr("app.services.approvals_indexer.config", config)
+
+
+@pytest.mark.asyncio
+async def test_backfills_watched_owner_then_scans_incrementally():
+    # Arrange
+    chain = FakeChain(head=100, logs=[log(10, amount=1), log(50, amount=2)])
+    indexer = ApprovalsIndexer(chain.get_dal())
+    indexer.watch(["0x" + OWNER[2:].upper()])
+
+    # Act
+    assert indexer.get_approvals(OWNER) is None
+    await indexer.poll()
+    chain.head = 110
+    chain.logs.append(log(108, amount=3))
+    await indexer.poll()
+
+    # Assert
+    assert chain.ranges == [((OWNER,), 0, 100), ((OWNER,), 96, 110)]
+    assert indexer.head_block == 110
+    assert [entry.amount for entry in indexer.get_approval_logs(OWNER)] == [3]
+    assert indexer.get_approvals(OWNER)[0].amount == "3"
+
+
+@pytest.mark.asyncio
+async def test_logs_dropped_by_a_reorg_disappear():
+    # Arrange
+    chain = FakeChain(head=100, logs=[log(10, amount=1), log(99, amount=2)])
+    indexer = ApprovalsIndexer(chain.get_dal())
+    indexer.watch([OWNER])
+    await indexer.poll()
+
+    # Act
+    chain.logs = [log(10, amount=1)]
+    chain.head = 101
+    await indexer.poll()
+
+    # Assert
+    assert [entry.amount for entry in indexer.get_approval_logs(OWNER)] == [1]
+
+
+@pytest.mark.asyncio
+async def test_unwatched_owner_is_not_served():
+    # Arrange
+    chain = FakeChain(head=100, logs=[log(10)])
+    indexer = ApprovalsIndexer(chain.get_dal())
+    indexer.watch([OWNER])
+    await indexer.poll()
+
+    # Act
+    indexer.unwatch([OWNER])
+
+    # Assert
+    assert not indexer.is_indexed(OWNER)
+    assert indexer.get_approvals(OWNER) is None
+
+
+def test_read_watchlist(tmp_path):
+    # Arrange
+    path = tmp_path / "watchlist.txt"
+    path.write_text(f"# whales\n{OWNER}\n\n0xbb  # exchange\n")
+
+    # Act
+    owners = read_watchlist(str(path))
+
+    # Assert
+    assert owners == [OWNER, "0xbb"]
+
+
+def teardown_function():
+    ApprovalsIndexer._instance = None
@@ -0,0 +1,54 @@
+import json
+
+from app.models.approvals.approvals import Approval
+from app.models.approvals.approvals_response import ApprovalsResponse
+from app.models.approvals.approvals_stream_event import ApprovalsStreamEvent
+from app.utils.approvals_json import encode_approvals_response, encode_stream_event
+
+
+def get_response():
+    return ApprovalsResponse(
+        approvalsByAddress={"0xabc": [Approval(amount="Unlimited", spender_address="0xsp", token_symbol="TKN",
+                                               price_usd=1.25, price_age_seconds=3.5)]},
+        errorsByAddress={"0xdef": "boom"}
+    )
+
+
+def test_encode_without_prices_matches_pydantic_and_drops_price_fields():
+    # Arrange
+    response = get_response()
+    exclude = {"approvalsByAddress": {"__all__": {"__all__": {"price_usd", "price_age_seconds"}}}}
+
+    # Act
+    body = encode_approvals_response(response, include_prices=False)
+
+    # Assert
+    assert json.loads(body) == json.loads(response.model_dump_json(exclude=exclude))
+    assert b"price_usd" not in body
+    assert response.approvalsByAddress["0xabc"][0].price_usd == 1.25
+
+
+def test_encode_with_prices_matches_pydantic():
+    # Arrange
+    response = get_response()
+
+    # Act
+    body = encode_approvals_response(response, include_prices=True)
+
+    # Assert
+    assert body == response.model_dump_json().encode()
+
+
+def test_encode_stream_event():
+    # Arrange
+    event = ApprovalsStreamEvent(address="0xabc", approvals=get_response().approvalsByAddress["0xabc"])
+
+    # Act
+    body = encode_stream_event(event, include_prices=False)
+
+    # Assert
+    assert json.loads(body) == {
+        "address": "0xabc",
+        "approvals": [{"amount": "Unlimited", "spender_address": "0xsp", "token_symbol": "TKN"}],
+        "error": None,
+    }
@@ -0,0 +1,163 @@
+import json
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.controllers.approvals_controller import get_approvals_response_cache, get_approvals_service
+from app.models.approvals.approvals import Approval
+from app.models.approvals.approvals_request import ApprovalsRequest
+from app.models.approvals.approvals_response import ApprovalsResponse
+from app.services.approvals_response_cache import ApprovalsResponseCache
+from app.utils.config_loader import config
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def get_cache(head_block=100):
+    dal = MagicMock()
+    dal.get_block_number = AsyncMock(return_value=head_block)
+    clock = FakeClock()
+    return ApprovalsResponseCache(dal, clock=clock), dal, clock
+
+
+def get_compute(errors=None):
+    return AsyncMock(return_value=ApprovalsResponse(
+        approvalsByAddress={"0xabc": [Approval(amount="1", spender_address="0xsp", token_symbol="TKN")]},
+        errorsByAddress=errors or {}
+    ))
+
+
+def test_key_ignores_address_order_duplicates_and_priority():
+    # Act
+    first = ApprovalsResponseCache.get_key(ApprovalsRequest(addresses=["0xb", "0xa"]))
+    second = ApprovalsResponseCache.get_key(ApprovalsRequest(addresses=["0xa", "0xb", "0xa"], priority="batch"))
+    with_prices = ApprovalsResponseCache.get_key(ApprovalsRequest(addresses=["0xa", "0xb"], include_prices=True))
+
+    # Assert
+    assert first == second
+    assert first != with_prices
+
+
+@pytest.mark.asyncio
+async def test_response_is_reused_until_the_head_moves():
+    # Arrange
+    cache, dal, clock = get_cache()
+    compute = get_compute()
+    request = ApprovalsRequest(addresses=["0xabc"])
+    key = cache.get_key(request)
+
+    # Act
+    first = await cache.get_response(key, request, 100, compute)
+    second = await cache.get_response(key, request, 100, compute)
+    third = await cache.get_response(key, request, 100 + config.response_cache_max_block_lag + 1, compute)
+
+    # Assert
+    assert compute.await_count == 2
+    assert second is first
+    assert json.loads(first.body)["approvalsByAddress"]["0xabc"][0]["token_symbol"] == "TKN"
+    assert first.etag != third.etag
+
+
+@pytest.mark.asyncio
+async def test_responses_with_errors_are_not_cached():
+    # Arrange
+    cache, dal, clock = get_cache()
+    compute = get_compute(errors={"0xabc": "boom"})
+    request = ApprovalsRequest(addresses=["0xabc"])
+    key = cache.get_key(request)
+
+    # Act
+    await cache.get_response(key, request, 100, compute)
+    await cache.get_response(key, request, 100, compute)
+
+    # Assert
+    assert compute.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_if_none_match_is_honored_while_the_etag_is_fresh():
+    # Arrange
+    cache, dal, clock = get_cache()
+    request = ApprovalsRequest(addresses=["0xabc"])
+    key = cache.get_key(request)
+    cached = await cache.get_response(key, request, 100, get_compute())
+
+    # Act
+    not_modified = cache.get_not_modified_etag(key, f'W/{cached.etag}, "other"', 100)
+    moved_on = cache.get_not_modified_etag(key, cached.etag, 100 + config.response_cache_max_block_lag + 1)
+    other_request = cache.get_not_modified_etag(cache.get_key(ApprovalsRequest(addresses=["0xdef"])), cached.etag, 100)
+
+    # Assert
+    assert not_modified == cached.etag
+    assert moved_on is None
+    assert other_request is None
+
+
+def test_error_response_has_no_etag_and_is_not_revalidated():
+    # Arrange
+    from main import app
+    cache, dal, clock = get_cache()
+    service = MagicMock()
+    service.get_latest_approvals = get_compute(errors={"0xabc": "boom"})
+    app.dependency_overrides[get_approvals_service] = lambda: service
+    app.dependency_overrides[get_approvals_response_cache] = lambda: cache
+    client = TestClient(app)
+    stale_etag = cache.get_etag(cache.get_key(ApprovalsRequest(addresses=["0xabc"])), 100)
+
+    # Act
+    try:
+        failed = client.post("/get_approvals", json={"addresses": ["0xabc"]})
+        service.get_latest_approvals = get_compute()
+        retried = client.post("/get_approvals", json={"addresses": ["0xabc"]}, headers={"If-None-Match": stale_etag})
+        revalidated = client.post("/get_approvals", json={"addresses": ["0xabc"]},
+                                  headers={"If-None-Match": retried.headers["ETag"]})
+    finally:
+        app.dependency_overrides.clear()
+
+    # Assert
+    assert failed.status_code == 200
+    assert "ETag" not in failed.headers
+    assert retried.status_code == 200
+    assert retried.json()["errorsByAddress"] == {}
+    assert revalidated.status_code == 304
+
+
+@pytest.mark.asyncio
+async def test_head_block_is_reused_for_a_short_time():
+    # Arrange
+    cache, dal, clock = get_cache()
+
+    # Act
+    first = await cache.get_head_block()
+    dal.get_block_number.return_value = 101
+    reused = await cache.get_head_block()
+    clock.now += config.response_cache_head_ttl
+    refreshed = await cache.get_head_block()
+
+    # Assert
+    assert (first, reused, refreshed) == (100, 100, 101)
+    assert dal.get_block_number.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_unreadable_head_block_disables_caching():
+    # Arrange
+    cache, dal, clock = get_cache()
+    dal.get_block_number.side_effect = ConnectionError("down")
+
+    # Act
+    head_block = await cache.get_head_block()
+
+    # Assert
+    assert head_block is None
+
+
+def teardown_function():
+    ApprovalsResponseCache._instance = None
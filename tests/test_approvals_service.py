@@ -1,9 +1,15 @@
+import asyncio
+import dataclasses
 import pytest
 from unittest.mock import AsyncMock, MagicMock
-from app.services.approvals_service import ApprovalsService
+from app.services import approvals_service
+from app.services.approvals_service import DEADLINE_EXCEEDED_ERROR, ApprovalsService
 from app.models.approvals.approvals_request import ApprovalsRequest
 from app.models.approvals.approvals_response import ApprovalsResponse
-from app.models.approvals.approvals import Approval
+from app.models.approvals.approvals import Approval, ApprovalLog
+from app.utils.backoff import OverloadedError
+from app.utils.config_loader import config
+from app.utils.fair_scheduler import BATCH, INTERACTIVE, current_flow
 
 def get_mocks(concurrency=1, retries=1, retry_delay=0):
     mock_approvals_dal = MagicMock()
@@ -97,5 +103,199 @@ async def test_get_latest_approvals_include_prices(monkeypatch):
     assert response.approvalsByAddress["0xdef"] == [Approval(amount="300", spender_address="0xsp3", token_symbol="TKN3", price_usd=1.23)]
     assert response.errorsByAddress == {}
 
+@pytest.mark.asyncio
+async def test_get_latest_approvals_uses_batched_logs(monkeypatch):
+    # Arrange
+    service, mock_dal, mock_config, mock_token_price_dal = get_mocks()
+    addresses = [f"0x{i:040x}" for i in range(12)]
+    mock_dal.fetch_approval_logs_batch = AsyncMock(return_value={addr: [] for addr in addresses})
+    mock_dal.fetch_approval_logs = AsyncMock(return_value=[])
+    monkeypatch.setattr("app.services.approvals_service.process_approval_logs", AsyncMock(return_value=[]))
+    request = ApprovalsRequest(addresses=addresses)
+
+    # Act
+    response = await service.get_latest_approvals(request)
+
+    # Assert
+    mock_dal.fetch_approval_logs_batch.assert_awaited_once_with(addresses)
+    mock_dal.fetch_approval_logs.assert_not_awaited()
+    assert set(response.approvalsByAddress.keys()) == set(addresses)
+
+@pytest.mark.asyncio
+async def test_get_latest_approvals_falls_back_when_batch_fails(monkeypatch):
+    # Arrange
+    service, mock_dal, mock_config, mock_token_price_dal = get_mocks()
+    addresses = [f"0x{i:040x}" for i in range(12)]
+    mock_dal.fetch_approval_logs_batch = AsyncMock(side_effect=RuntimeError("batch error"))
+    mock_dal.fetch_approval_logs = AsyncMock(return_value=[])
+    monkeypatch.setattr("app.services.approvals_service.process_approval_logs", AsyncMock(return_value=[]))
+    request = ApprovalsRequest(addresses=addresses)
+
+    # Act
+    response = await service.get_latest_approvals(request)
+
+    # Assert
+    assert mock_dal.fetch_approval_logs.await_count == len(addresses)
+    assert response.errorsByAddress == {}
+
+@pytest.mark.asyncio
+async def test_stream_latest_approvals_yields_every_address(monkeypatch):
+    # Arrange
+    service, mock_dal, mock_config, mock_token_price_dal = get_mocks()
+    async def fetch_approval_logs(owner_address):
+        if owner_address == "0xbad":
+            raise Exception("fetch error")
+        return []
+    mock_dal.fetch_approval_logs = fetch_approval_logs
+    monkeypatch.setattr("app.services.approvals_service.process_approval_logs",
+                        AsyncMock(return_value=[Approval(amount="1", spender_address="0xsp1", token_symbol="TKN")]))
+    request = ApprovalsRequest(addresses=["0x123", "0xbad", "0x456", "0x123"])
+
+    # Act
+    events = [event async for event in service.stream_latest_approvals(request)]
+
+    # Assert
+    assert sorted(event.address for event in events) == ["0x123", "0x456", "0xbad"]
+    by_address = {event.address: event for event in events}
+    assert by_address["0x123"].approvals[0].token_symbol == "TKN"
+    assert by_address["0xbad"].approvals == []
+    assert "fetch error" in by_address["0xbad"].error
+
+@pytest.mark.asyncio
+async def test_stream_latest_approvals_stops_workers_when_closed(monkeypatch):
+    # Arrange
+    service, mock_dal, mock_config, mock_token_price_dal = get_mocks()
+    fetched = []
+    async def fetch_approval_logs(owner_address):
+        fetched.append(owner_address)
+        return []
+    mock_dal.fetch_approval_logs = fetch_approval_logs
+    monkeypatch.setattr("app.services.approvals_service.process_approval_logs", AsyncMock(return_value=[]))
+    request = ApprovalsRequest(addresses=[f"0x{i:040x}" for i in range(500)])
+
+    # Act
+    stream = service.stream_latest_approvals(request)
+    await stream.__anext__()
+    await stream.aclose()
+
+    # Assert
+    assert len(fetched) < 100
+
+@pytest.mark.asyncio
+async def test_get_latest_approvals_serves_watched_addresses_from_indexer(monkeypatch):
+    # Arrange
+    mock_dal = MagicMock()
+    mock_dal.fetch_approval_logs = AsyncMock(return_value=[])
+    indexer = MagicMock()
+    indexed = [Approval(amount="5", spender_address="0xsp1", token_symbol="IDX")]
+    indexer.get_approvals = lambda address: indexed if address == "0xwatched" else None
+    indexer.is_indexed = lambda address: address == "0xwatched"
+    service = ApprovalsService(mock_dal, MagicMock(), indexer=indexer)
+    monkeypatch.setattr("app.services.approvals_service.process_approval_logs", AsyncMock(return_value=[]))
+    request = ApprovalsRequest(addresses=["0xwatched", "0xother"])
+
+    # Act
+    response = await service.get_latest_approvals(request)
+
+    # Assert
+    mock_dal.fetch_approval_logs.assert_awaited_once_with("0xother")
+    assert response.approvalsByAddress["0xwatched"][0].token_symbol == "IDX"
+    assert response.approvalsByAddress["0xother"] == []
+
+@pytest.mark.asyncio
+async def test_upstream_calls_run_in_the_request_priority_class(monkeypatch):
+    # Arrange
+    service, mock_dal, mock_config, mock_token_price_dal = get_mocks()
+    priorities = {}
+    async def fetch_approval_logs(owner_address):
+        priorities[owner_address] = current_flow().priority
+        return []
+    mock_dal.fetch_approval_logs = fetch_approval_logs
+    mock_dal.fetch_approval_logs_batch = AsyncMock(return_value={})
+    monkeypatch.setattr("app.services.approvals_service.process_approval_logs", AsyncMock(return_value=[]))
+    large_request = ApprovalsRequest(
+        addresses=[f"0x{i:040x}" for i in range(config.approvals_batch_priority_min_addresses)]
+    )
+
+    # Act
+    await service.get_latest_approvals(ApprovalsRequest(addresses=["0xsmall"]))
+    await service.get_latest_approvals(ApprovalsRequest(addresses=["0xforced"], priority="batch"))
+    await service.get_latest_approvals(large_request)
+
+    # Assert
+    assert priorities["0xsmall"] == INTERACTIVE
+    assert priorities["0xforced"] == BATCH
+    assert {priorities[address] for address in large_request.addresses} == {BATCH}
+
+@pytest.mark.asyncio
+async def test_verify_allowances_reads_allowances_at_one_pinned_block():
+    # Arrange
+    service, mock_dal, mock_config, mock_token_price_dal = get_mocks()
+    logs = [
+        ApprovalLog(block_number=90, transaction_hash="0xtx", spender="0xsp1", amount=10, token_address="0xT1"),
+        ApprovalLog(block_number=95, transaction_hash="0xtx", spender="0xsp2", amount=20, token_address="0xT1"),
+        ApprovalLog(block_number=120, transaction_hash="0xtx", spender="0xsp1", amount=30, token_address="0xT2"),
+    ]
+    mock_dal.fetch_approval_logs = AsyncMock(return_value=logs)
+    mock_dal.get_block_number = AsyncMock(return_value=100)
+    mock_dal.get_allowances = AsyncMock(return_value={("0xT1", "0xsp1"): 0, ("0xT1", "0xsp2"): 7})
+    mock_dal.get_token_symbol = AsyncMock(return_value="TKN")
+    mock_dal.get_token_symbols = AsyncMock(return_value={})
+
+    # Act
+    response = await service.get_latest_approvals(ApprovalsRequest(addresses=["0xa", "0xb"], verify_allowances=True))
+
+    # Assert
+    mock_dal.get_block_number.assert_awaited_once()
+    # The approval emitted after the pinned block is not checked there and keeps its event amount
+    mock_dal.get_allowances.assert_awaited_with("0xb", [("0xT1", "0xsp1"), ("0xT1", "0xsp2")], 100)
+    assert [(a.spender_address, a.amount) for a in response.approvalsByAddress["0xa"]] == [("0xsp2", "7"),
+                                                                                          ("0xsp1", "30")]
+
+@pytest.mark.asyncio
+async def test_deadline_returns_finished_addresses_and_cancels_the_rest(monkeypatch):
+    # Arrange
+    service, mock_dal, mock_config, mock_token_price_dal = get_mocks()
+    monkeypatch.setattr(approvals_service, "config", dataclasses.replace(config, approvals_deadline_margin=0))
+    cancelled = []
+    async def fetch_approval_logs(address):
+        if address == "0xslow":
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.append(address)
+                raise
+        return []
+    mock_dal.fetch_approval_logs = fetch_approval_logs
+    monkeypatch.setattr("app.services.approvals_service.process_approval_logs",
+                        AsyncMock(return_value=[Approval(amount="1", spender_address="0xsp", token_symbol="TKN")]))
+
+    # Act
+    response = await service.get_latest_approvals(ApprovalsRequest(addresses=["0xfast", "0xslow"],
+                                                                    timeout_seconds=0.1))
+
+    # Assert
+    assert response.approvalsByAddress["0xfast"] == [Approval(amount="1", spender_address="0xsp", token_symbol="TKN")]
+    assert response.approvalsByAddress["0xslow"] == []
+    assert response.errorsByAddress == {"0xslow": DEADLINE_EXCEEDED_ERROR}
+    assert cancelled == ["0xslow"]
+
+@pytest.mark.asyncio
+async def test_retry_that_cannot_finish_before_the_deadline_is_skipped(monkeypatch):
+    # Arrange
+    service, mock_dal, mock_config, mock_token_price_dal = get_mocks()
+    monkeypatch.setattr(approvals_service, "config", dataclasses.replace(config, approvals_api_retries=3))
+    mock_dal.fetch_approval_logs = AsyncMock(side_effect=OverloadedError("rate limited", retry_after=5))
+    loop = asyncio.get_running_loop()
+
+    # Act
+    started = loop.time()
+    response = await service.get_latest_approvals(ApprovalsRequest(addresses=["0xa"], timeout_seconds=1))
+
+    # Assert
+    assert loop.time() - started < 1
+    assert mock_dal.fetch_approval_logs.await_count == 1
+    assert response.errorsByAddress == {"0xa": "rate limited"}
+
 def teardown_function():
     ApprovalsService._instance = None
@@ -0,0 +1,138 @@
+import asyncio
+
+import pytest
+
+from app.dal.approvals.block_range_log_fetcher import BlockRangeLogFetcher
+
+
+def make_get_logs(logs, max_results, calls):
+    async def get_logs(filter_params):
+        calls.append((filter_params["fromBlock"], filter_params["toBlock"]))
+        matched = [log for log in logs if filter_params["fromBlock"] <= log["blockNumber"] <= filter_params["toBlock"]]
+        if len(matched) > max_results:
+            raise ValueError({"code": -32005, "message": f"query returned more than {max_results} results"})
+        # Providers do not guarantee ordering across shards, reverse to make sure the fetcher sorts
+        return list(reversed(matched))
+    return get_logs
+
+
+def test_shards_cover_range():
+    # Arrange
+    fetcher = BlockRangeLogFetcher(make_get_logs([], 1, []), shard_size=10, concurrency_limit=2)
+
+    # Act
+    shards = fetcher.shards(0, 25)
+
+    # Assert
+    assert shards == [(0, 9), (10, 19), (20, 25)]
+
+
+@pytest.mark.asyncio
+async def test_fetch_bisects_oversized_shards_and_orders_output():
+    # Arrange
+    logs = [{"blockNumber": block, "logIndex": index} for block in range(0, 40, 3) for index in (1, 0)]
+    calls = []
+    fetcher = BlockRangeLogFetcher(make_get_logs(logs, 4, calls), shard_size=20, concurrency_limit=2)
+
+    # Act
+    result = await fetcher.fetch({"topics": []}, 0, 39)
+
+    # Assert
+    assert result == sorted(logs, key=lambda log: (log["blockNumber"], log["logIndex"]))
+    assert (0, 19) in calls and (0, 9) in calls
+
+
+@pytest.mark.asyncio
+async def test_fetch_propagates_other_errors():
+    # Arrange
+    async def get_logs(filter_params):
+        raise ConnectionError("connection reset")
+    fetcher = BlockRangeLogFetcher(get_logs, shard_size=10, concurrency_limit=1)
+
+    # Act / Assert
+    with pytest.raises(ConnectionError):
+        await fetcher.fetch({"topics": []}, 0, 5)
+
+
+@pytest.mark.asyncio
+async def test_rate_limits_are_raised_instead_of_bisected():
+    # Arrange
+    calls = []
+    async def get_logs(filter_params):
+        calls.append((filter_params["fromBlock"], filter_params["toBlock"]))
+        raise ValueError({"code": -32005, "message": "daily request count limit exceeded, too many requests"})
+    fetcher = BlockRangeLogFetcher(get_logs, shard_size=10, concurrency_limit=1)
+
+    # Act / Assert
+    with pytest.raises(ValueError):
+        await fetcher.fetch({"topics": []}, 0, 9)
+    assert calls == [(0, 9)]
+
+
+@pytest.mark.asyncio
+async def test_timeout_is_retried_once_before_bisecting():
+    # Arrange
+    calls = []
+    async def get_logs(filter_params):
+        calls.append((filter_params["fromBlock"], filter_params["toBlock"]))
+        if filter_params["toBlock"] - filter_params["fromBlock"] >= 5:
+            raise asyncio.TimeoutError()
+        return []
+    fetcher = BlockRangeLogFetcher(get_logs, shard_size=10, concurrency_limit=1)
+
+    # Act
+    await fetcher.fetch({"topics": []}, 0, 9)
+
+    # Assert
+    assert calls == [(0, 9), (0, 9), (0, 4), (5, 9)]
+
+
+@pytest.mark.asyncio
+async def test_iter_pages_yields_capped_pages_with_bounded_concurrency():
+    # Arrange
+    logs = [{"blockNumber": block, "logIndex": 0} for block in range(100)]
+    calls = []
+    in_flight = max_in_flight = 0
+    get_logs = make_get_logs(logs, 10, calls)
+    async def tracked_get_logs(filter_params):
+        nonlocal in_flight, max_in_flight
+        in_flight += 1
+        max_in_flight = max(max_in_flight, in_flight)
+        try:
+            await asyncio.sleep(0)
+            return await get_logs(filter_params)
+        finally:
+            in_flight -= 1
+    fetcher = BlockRangeLogFetcher(tracked_get_logs, shard_size=25, concurrency_limit=2)
+
+    # Act
+    pages = [page async for page in fetcher.iter_pages({"topics": []}, 0, 99)]
+
+    # Assert
+    assert all(len(page) <= 10 for page in pages)
+    assert sorted(log["blockNumber"] for page in pages for log in page) == list(range(100))
+    assert max_in_flight == 2
+
+
+@pytest.mark.asyncio
+async def test_iter_pages_cancels_calls_in_flight_when_closed_early():
+    # Arrange
+    cancelled = []
+    async def get_logs(filter_params):
+        if filter_params["fromBlock"] == 0:
+            return [{"blockNumber": 0}]
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(filter_params["fromBlock"])
+            raise
+    fetcher = BlockRangeLogFetcher(get_logs, shard_size=10, concurrency_limit=3)
+    pages = fetcher.iter_pages({"topics": []}, 0, 29)
+
+    # Act
+    first_page = await pages.__anext__()
+    await pages.aclose()
+
+    # Assert
+    assert first_page == [{"blockNumber": 0}]
+    assert sorted(cancelled) == [10, 20]
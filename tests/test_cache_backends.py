@@ -0,0 +1,179 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+from unittest.mock import AsyncMock
+
+from app.dal.cache import sqlite_cache_backend
+from app.dal.cache.memory_cache_backend import MemoryCacheBackend
+from app.dal.cache.redis_cache_backend import RedisCacheBackend, RedisError, _read_reply
+from app.dal.cache.shared_cache import SharedCache
+from app.dal.cache.sqlite_cache_backend import SqliteCacheBackend
+from app.dal.token_price.coingecko_token_price_dal import CoingeckoTokenPriceDAL
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeRedisServer:
+    """Local stand-in speaking enough of the Redis protocol for the cache backend: AUTH, SELECT, MGET and SET."""
+
+    def __init__(self):
+        self.data = {}
+        self.commands = []
+        self.connections = 0
+        self._server = None
+
+    async def start(self) -> int:
+        self._server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        return self._server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        self._server.close()
+        await self._server.wait_closed()
+
+    async def _handle(self, reader, writer):
+        self.connections += 1
+        try:
+            while True:
+                command = await _read_reply(reader)
+                self.commands.append(command)
+                writer.write(self._reply(command))
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            writer.close()
+
+    def _reply(self, command) -> bytes:
+        name = command[0].upper()
+        if name in (b"AUTH", b"SELECT"):
+            return b"+OK\r\n"
+        if name == b"MGET":
+            values = [self.data.get(key) for key in command[1:]]
+            return b"*%d\r\n" % len(values) + b"".join(
+                b"$-1\r\n" if value is None else b"$%d\r\n%s\r\n" % (len(value), value) for value in values
+            )
+        if name == b"SET":
+            self.data[command[1]] = command[2]
+            return b"+OK\r\n"
+        return b"-ERR unknown command\r\n"
+
+
+@pytest.mark.asyncio
+async def test_memory_backend_expires_entries():
+    # Arrange
+    clock = FakeClock()
+    backend = MemoryCacheBackend(maxsize=10, clock=clock)
+    await backend.set_many({"a": b"1"}, ttl=5)
+    await backend.set_many({"b": b"2"})
+
+    # Act
+    clock.now += 6
+    values = await backend.get_many(["a", "b", "c"])
+
+    # Assert
+    assert values == {"b": b"2"}
+
+
+@pytest.mark.asyncio
+async def test_sqlite_backend_is_shared_between_instances_and_pruned(tmp_path, monkeypatch):
+    # Arrange
+    monkeypatch.setattr(sqlite_cache_backend, "_PRUNE_EVERY", 3)
+    clock = FakeClock()
+    path = str(tmp_path / "cache.sqlite3")
+    writer = SqliteCacheBackend(path, maxsize=2, clock=clock)
+    reader = SqliteCacheBackend(path, maxsize=2, clock=clock)
+    await writer.set_many({"a": b"1", "b": b"2"}, ttl=5)
+
+    # Act
+    shared = await reader.get_many(["a", "b"])
+    clock.now += 6
+    expired = await reader.get_many(["a", "b"])
+    await writer.set_many({"c": b"3", "d": b"4", "e": b"5"})
+    pruned = await reader.get_many(["c", "d", "e"])
+    await writer.aclose()
+    await reader.aclose()
+
+    # Assert
+    assert shared == {"a": b"1", "b": b"2"}
+    assert expired == {}
+    assert pruned == {"d": b"4", "e": b"5"}
+
+
+@pytest.mark.asyncio
+async def test_redis_backend_against_local_stand_in():
+    # Arrange
+    server = FakeRedisServer()
+    port = await server.start()
+    backend = RedisCacheBackend(f"redis://:secret@127.0.0.1:{port}/2", pool_size=2, timeout=1)
+
+    # Act
+    await backend.set_many({"a": b"1", "b": b"\r\n"}, ttl=1.5)
+    values = await backend.get_many(["a", "b", "c"])
+    with pytest.raises(RedisError):
+        await backend._execute([("FLUSHALL",)])
+    values_after_error = await backend.get_many(["a"])
+    await backend.aclose()
+    await server.stop()
+
+    # Assert
+    assert values == {"a": b"1", "b": b"\r\n"}
+    assert values_after_error == {"a": b"1"}
+    assert server.connections == 1
+    assert server.commands[:2] == [[b"AUTH", b"secret"], [b"SELECT", b"2"]]
+    assert server.commands[2] == [b"SET", b"a", b"1", b"PX", b"1500"]
+
+
+@pytest.mark.asyncio
+async def test_shared_cache_namespaces_keys_and_treats_failures_as_misses():
+    # Arrange
+    backend = MemoryCacheBackend(maxsize=10)
+    cache = SharedCache(backend, "price")
+    failing_backend = AsyncMock()
+    failing_backend.get_many.side_effect = ConnectionError("down")
+    failing_backend.set_many.side_effect = ConnectionError("down")
+    failing_cache = SharedCache(failing_backend, "price")
+
+    # Act
+    await cache.set_many({"0xAbC": [1.5, 10.0]})
+    values = await cache.get_many(["0xAbC", "0xdef"])
+    await failing_cache.set_many({"0xAbC": [1.5, 10.0]})
+    failed_values = await failing_cache.get_many(["0xAbC"])
+
+    # Assert
+    assert values == {"0xAbC": [1.5, 10.0]}
+    assert list(backend._entries) == ["approvals:price:0xabc"]
+    assert failed_values == {}
+
+
+@pytest.mark.asyncio
+async def test_price_dal_reads_other_workers_prices_from_shared_cache():
+    # Arrange
+    requested = []
+    def handler(request: httpx.Request) -> httpx.Response:
+        addresses = request.url.params["contract_addresses"].split(",")
+        requested.append(addresses)
+        return httpx.Response(200, json={address.lower(): {"usd": 3.0} for address in addresses})
+    dal = CoingeckoTokenPriceDAL()
+    dal._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    dal._shared_cache = SharedCache(MemoryCacheBackend(maxsize=10), "price")
+    await dal._shared_cache.set_many({"0xAaa": [2.5, time.time() - 10]})
+
+    # Act
+    prices = await dal.get_token_prices_usd(["0xAaa", "0xBbb"])
+    written = await dal._shared_cache.get_many(["0xBbb"])
+
+    # Assert
+    assert prices == {"0xAaa": 2.5, "0xBbb": 3.0}
+    assert requested == [["0xBbb"]]
+    assert dal.get_price_ages(["0xAaa"])["0xAaa"] >= 10
+    assert written["0xBbb"][0] == 3.0
+
+
+def teardown_function():
+    CoingeckoTokenPriceDAL._instance = None
@@ -0,0 +1,143 @@
+import asyncio
+
+import httpx
+import pytest
+
+from app.dal.token_price.coingecko_token_price_dal import CoingeckoTokenPriceDAL
+from app.utils.config_loader import config
+
+
+def get_dal(handler):
+    dal = CoingeckoTokenPriceDAL()
+    dal._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return dal
+
+
+@pytest.mark.asyncio
+async def test_get_token_prices_usd_chunks_and_caches(monkeypatch):
+    # Arrange
+    requested = []
+    def handler(request: httpx.Request) -> httpx.Response:
+        addresses = request.url.params["contract_addresses"].split(",")
+        requested.append(addresses)
+        return httpx.Response(200, json={address.lower(): {"usd": 2.5} for address in addresses[:-1]})
+    dal = get_dal(handler)
+    monkeypatch.setattr(dal, "_chunk_addresses",
+                        lambda addresses: [chunk for chunk in (addresses[:2], addresses[2:]) if chunk])
+    tokens = ["0xAaa", "0xBbb", "0xCcc"]
+
+    # Act
+    prices = await dal.get_token_prices_usd(tokens)
+    cached_prices = await dal.get_token_prices_usd(tokens)
+
+    # Assert
+    assert prices == {"0xAaa": 2.5, "0xBbb": None, "0xCcc": None}
+    assert cached_prices == prices
+    assert sorted(requested) == [["0xAaa", "0xBbb"], ["0xCcc"]]
+
+
+@pytest.mark.asyncio
+async def test_get_token_prices_usd_does_not_cache_errors(monkeypatch):
+    # Arrange
+    calls = []
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request)
+        return httpx.Response(429)
+    dal = get_dal(handler)
+    monkeypatch.setattr("app.dal.token_price.coingecko_token_price_dal.backoff_delay", lambda *args: 0)
+
+    # Act
+    await dal.get_token_prices_usd(["0xAaa"])
+    price = await dal.get_token_price_usd("0xAaa")
+
+    # Assert
+    assert price is None
+    assert len(calls) == 2 * (config.coingecko_retries + 1)
+
+
+@pytest.mark.asyncio
+async def test_rate_limited_request_is_retried_after_retry_after(monkeypatch):
+    # Arrange
+    responses = iter([httpx.Response(429, headers={"Retry-After": "7"}),
+                      httpx.Response(200, json={"0xaaa": {"usd": 3.0}})])
+    dal = get_dal(lambda request: next(responses))
+    delays = []
+    def backoff_delay(attempt, base_delay, max_delay, retry_after=None):
+        delays.append(retry_after)
+        return 0
+    monkeypatch.setattr("app.dal.token_price.coingecko_token_price_dal.backoff_delay", backoff_delay)
+    initial_limit = dal._limiter.limit
+
+    # Act
+    prices = await dal.get_token_prices_usd(["0xAaa"])
+
+    # Assert
+    assert prices == {"0xAaa": 3.0}
+    assert delays == [7.0]
+    assert dal._limiter.limit <= max(config.coingecko_concurrency_min, initial_limit // 2)
+
+
+@pytest.mark.asyncio
+async def test_stale_prices_are_served_and_refreshed_in_background():
+    # Arrange
+    responses = iter([1.0, 2.0])
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, json={"0xaaa": {"usd": next(responses)}})
+    dal = get_dal(handler)
+    await dal.get_token_prices_usd(["0xAaa"])
+    entry = dal._price_cache._entries["0xAaa"]
+    entry.expires_at -= config.price_cache_ttl + 1
+
+    # Act
+    stale_prices = await dal.get_token_prices_usd(["0xAaa"])
+    await asyncio.gather(*dal._background_tasks)
+    refreshed_prices = await dal.get_token_prices_usd(["0xAaa"])
+
+    # Assert
+    assert stale_prices == {"0xAaa": 1.0}
+    assert refreshed_prices == {"0xAaa": 2.0}
+    assert dal.get_price_ages(["0xAaa"])["0xAaa"] < 1
+
+
+@pytest.mark.asyncio
+async def test_chunks_are_fetched_concurrently(monkeypatch):
+    # Arrange
+    in_flight = []
+    peak = 0
+    async def fake_fetch_prices(chunk):
+        nonlocal peak
+        in_flight.append(chunk)
+        peak = max(peak, len(in_flight))
+        await asyncio.sleep(0)
+        in_flight.remove(chunk)
+        return {address: 1.0 for address in chunk}
+    dal = CoingeckoTokenPriceDAL()
+    monkeypatch.setattr(dal, "_fetch_prices", fake_fetch_prices)
+    monkeypatch.setattr(dal, "_chunk_addresses", lambda addresses: [[address] for address in addresses])
+
+    # Act
+    prices = await dal.get_token_prices_usd(["0xAaa", "0xBbb", "0xCcc"])
+
+    # Assert
+    assert prices == {"0xAaa": 1.0, "0xBbb": 1.0, "0xCcc": 1.0}
+    assert peak == 3
+
+
+def test_chunk_addresses_respects_url_length():
+    # Arrange
+    dal = CoingeckoTokenPriceDAL()
+    tokens = [f"0x{i:040x}" for i in range(250)]
+
+    # Act
+    chunks = dal._chunk_addresses(tokens)
+
+    # Assert
+    assert sum(len(chunk) for chunk in chunks) == len(tokens)
+    for chunk in chunks:
+        url = httpx.URL(config.coingecko_api_url,
+                        params={"contract_addresses": ",".join(chunk), "vs_currencies": "usd"})
+        assert len(str(url)) <= config.coingecko_max_url_length
+
+
+def teardown_function():
+    CoingeckoTokenPriceDAL._instance = None
@@ -0,0 +1,121 @@
+import asyncio
+
+import pytest
+
+from app.utils.adaptive_limiter import AdaptiveLimiter
+from app.utils.fair_scheduler import (BATCH, INTERACTIVE, FairQueue, Flow, TokenBucket, current_flow, flow_context,
+                                      flow_scope)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_fair_queue_round_robins_between_flows():
+    # Arrange
+    queue = FairQueue()
+    large, small = Flow(1, INTERACTIVE), Flow(2, INTERACTIVE)
+    for index in range(3):
+        queue.push(f"large-{index}", large)
+    queue.push("small-0", small)
+
+    # Act
+    order = [queue.pop() for _ in range(len(queue))]
+
+    # Assert
+    assert order == ["large-0", "small-0", "large-1", "large-2"]
+
+
+def test_fair_queue_weights_priority_classes():
+    # Arrange
+    queue = FairQueue({INTERACTIVE: 4, BATCH: 1})
+    for index in range(10):
+        queue.push(("batch", index), Flow(1, BATCH))
+        queue.push(("interactive", index), Flow(2, INTERACTIVE))
+
+    # Act
+    first_round = [queue.pop()[0] for _ in range(5)]
+
+    # Assert
+    assert first_round.count("interactive") == 4
+    assert first_round.count("batch") == 1
+
+
+def test_fair_queue_remove():
+    # Arrange
+    queue = FairQueue()
+    flow = Flow(1, BATCH)
+    queue.push("a", flow)
+    queue.push("b", flow)
+
+    # Act
+    queue.remove("a", flow)
+
+    # Assert
+    assert len(queue) == 1
+    assert queue.pop() == "b"
+
+
+def test_token_bucket_spaces_calls_after_the_burst():
+    # Arrange
+    clock = FakeClock()
+    bucket = TokenBucket(rate=10, burst=2, clock=clock)
+
+    # Act
+    delays = [bucket.reserve() for _ in range(4)]
+    clock.now = 1.0
+    after_refill = bucket.reserve()
+
+    # Assert
+    assert delays == pytest.approx([0.0, 0.0, 0.1, 0.2])
+    assert after_refill == 0.0
+
+
+def test_flow_scope_is_restored():
+    # Act
+    with flow_scope(BATCH) as flow:
+        inner = current_flow()
+    outer = current_flow()
+
+    # Assert
+    assert inner == flow and inner.priority == BATCH
+    assert outer != flow
+
+
+def test_unknown_priority_is_rejected():
+    # Act / Assert
+    with pytest.raises(ValueError):
+        with flow_scope("urgent"):
+            pass
+
+
+@pytest.mark.asyncio
+async def test_small_request_is_not_starved_by_a_large_one():
+    # Arrange
+    limiter = AdaptiveLimiter("test", initial_limit=1, min_limit=1, max_limit=1)
+    order = []
+    gate = asyncio.Event()
+
+    async def call(label):
+        async with limiter.slot():
+            order.append(label)
+            await gate.wait()
+
+    async def request(label, calls):
+        await asyncio.gather(*(call(label) for _ in range(calls)))
+
+    # Act
+    large = asyncio.create_task(request("large", 20), context=flow_context(BATCH))
+    await asyncio.sleep(0)
+    small = asyncio.create_task(request("small", 2), context=flow_context(INTERACTIVE))
+    await asyncio.sleep(0)
+    gate.set()
+    await asyncio.gather(large, small)
+
+    # Assert
+    assert order.index("small") == 1
+    assert [index for index, label in enumerate(order) if label == "small"][-1] <= 3
@@ -0,0 +1,108 @@
+import os
+import subprocess
+import sys
+
+import pytest
+from eth_abi import encode
+from eth_utils import keccak
+from hexbytes import HexBytes
+
+from app.utils.log_decoder import (APPROVAL_EVENT_TOPIC, decode_and_reduce_in_pool, decode_approval_log,
+                                   is_erc20_approval, shutdown_process_pool)
+
+OWNER_TOPIC = b'\x00' * 12 + b'\x11' * 20
+
+
+def make_raw_log(block_number, amount, spender=b'\xAB' * 20, token="0x" + "22" * 20, log_index=0):
+    return {
+        'blockNumber': block_number,
+        'logIndex': log_index,
+        'transactionHash': HexBytes(b'\x01' * 32),
+        'address': token,
+        'topics': [HexBytes(b'\x00' * 32), HexBytes(OWNER_TOPIC), HexBytes(b'\x00' * 12 + spender)],
+        'data': HexBytes(encode(['uint256'], [amount])),
+    }
+
+
+def test_precomputed_approval_topic_matches_event_signature():
+    # Act
+    topic = "0x" + keccak(text="Approval(address,address,uint256)").hex()
+
+    # Assert
+    assert APPROVAL_EVENT_TOPIC == topic
+
+
+def test_importing_the_app_defers_web3():
+    # Arrange
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    script = ("import sys, main, app.dal.approvals.infura_approvals_dal; "
+              "print(sorted(m for m in ('web3', 'eth_abi', 'eth_utils') if m in sys.modules))")
+
+    # Act
+    result = subprocess.run([sys.executable, "-c", script], cwd=root, capture_output=True, text=True,
+                            env={**os.environ, "INFURA_API_KEY": ""})
+
+    # Assert
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == "[]"
+
+
+def test_decode_approval_log():
+    # Act
+    approval_log = decode_approval_log(make_raw_log(7, 2 ** 256 - 1, log_index=3))
+
+    # Assert
+    assert approval_log.block_number == 7
+    assert approval_log.log_index == 3
+    assert approval_log.amount == 2 ** 256 - 1
+    assert approval_log.spender == "0x" + "ab" * 20
+    assert approval_log.transaction_hash == "01" * 32
+
+
+def test_is_erc20_approval_skips_erc721():
+    # Arrange
+    erc721_log = make_raw_log(1, 0)
+    erc721_log['topics'] = erc721_log['topics'] + [HexBytes(b'\x00' * 32)]
+
+    # Assert
+    assert is_erc20_approval(make_raw_log(1, 0))
+    assert not is_erc20_approval(erc721_log)
+
+
+@pytest.mark.asyncio
+async def test_approval_logs_with_short_data_are_skipped():
+    # Arrange
+    short_log = make_raw_log(2, 0)
+    short_log['data'] = HexBytes(b'\x01' * 31)
+    empty_log = make_raw_log(3, 0)
+    empty_log['data'] = HexBytes(b'')
+
+    # Act
+    try:
+        reduced = await decode_and_reduce_in_pool([make_raw_log(1, 0), short_log, empty_log], workers=1)
+    finally:
+        shutdown_process_pool()
+
+    # Assert
+    assert not is_erc20_approval(short_log)
+    assert not is_erc20_approval(empty_log)
+    assert [approval_log.block_number for _, approval_log in reduced] == [1]
+    with pytest.raises(ValueError):
+        decode_approval_log(short_log)
+
+
+@pytest.mark.asyncio
+async def test_decode_and_reduce_in_pool_keeps_split_sides():
+    # Arrange
+    logs = [make_raw_log(block, block) for block in range(1, 21)]
+    logs += [make_raw_log(5, 99, spender=b'\xCD' * 20)]
+
+    # Act
+    try:
+        reduced = await decode_and_reduce_in_pool(logs, workers=2, split_block=10)
+    finally:
+        shutdown_process_pool()
+
+    # Assert
+    assert sorted((log.spender[-2:], log.amount) for _, log in reduced) == [("ab", 10), ("ab", 20), ("cd", 99)]
+    assert all(owner_topic == OWNER_TOPIC for owner_topic, _ in reduced)
@@ -0,0 +1,47 @@
+import pytest
+from unittest.mock import AsyncMock
+
+from app.models.approvals.approvals import ApprovalLog
+from app.utils.log_processor import process_approval_logs
+
+
+def make_log(token, spender, block_number, amount):
+    return ApprovalLog(block_number=block_number, transaction_hash="0xtx", spender=spender, amount=amount,
+                       token_address=token, log_index=0)
+
+
+@pytest.mark.asyncio
+async def test_process_approval_logs_uses_bulk_lookups():
+    # Arrange
+    logs = [make_log("0xT1", "0xs1", 1, 10), make_log("0xT1", "0xs1", 2, 20), make_log("0xT2", "0xs1", 1, 2 ** 256 - 1)]
+    get_token_symbol = AsyncMock(side_effect=lambda token: {"0xT1": "ONE", "0xT2": "TWO"}[token])
+    get_token_symbols = AsyncMock(return_value={})
+    get_token_price_usd = AsyncMock()
+    get_token_prices_usd = AsyncMock(return_value={"0xT1": 1.5, "0xT2": None})
+
+    # Act
+    approvals = await process_approval_logs(logs, get_token_symbol, get_token_price_usd=get_token_price_usd,
+                                            include_prices=True, get_token_symbols=get_token_symbols,
+                                            get_token_prices_usd=get_token_prices_usd)
+
+    # Assert
+    get_token_symbols.assert_awaited_once_with(["0xT1", "0xT2"])
+    get_token_prices_usd.assert_awaited_once_with(["0xT1", "0xT2"])
+    get_token_price_usd.assert_not_awaited()
+    assert [(a.token_symbol, a.amount, a.price_usd) for a in approvals] == [("ONE", "20", 1.5), ("TWO", "Unlimited", None)]
+
+
+@pytest.mark.asyncio
+async def test_process_approval_logs_applies_live_allowances():
+    # Arrange
+    logs = [make_log("0xT1", "0xs1", 1, 10), make_log("0xT2", "0xs1", 2, 20), make_log("0xT3", "0xs1", 3, 30)]
+    get_token_symbol = AsyncMock(side_effect=lambda token: token[-2:])
+    # T1 was partly spent, T2 fully spent and T3's allowance() reverted
+    get_allowances = AsyncMock(return_value={("0xt1", "0xs1"): 4, ("0xt2", "0xs1"): 0, ("0xt3", "0xs1"): None})
+
+    # Act
+    approvals = await process_approval_logs(logs, get_token_symbol, get_allowances=get_allowances)
+
+    # Assert
+    assert [(a.token_symbol, a.amount) for a in approvals] == [("T1", "4"), ("T3", "30")]
+    assert get_token_symbol.await_count == 2
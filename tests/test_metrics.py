@@ -0,0 +1,95 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.utils.metrics import Counter, Gauge, Histogram, InstrumentedLRUCache, MetricsMiddleware, MetricsRegistry, \
+    HTTP_REQUEST_DURATION
+
+
+def test_render_counters_and_gauges():
+    # Arrange
+    registry = MetricsRegistry()
+    counter = Counter("test_events_total", "Events.", ["kind"], registry=registry)
+    gauge = Gauge("test_in_flight", "In flight.", registry=registry)
+
+    # Act
+    counter.labels("a").inc()
+    counter.labels("a").inc(2)
+    counter.labels('b"c').inc()
+    with gauge.labels().track_inprogress():
+        in_progress = gauge.labels().value
+    rendered = registry.render()
+
+    # Assert
+    assert in_progress == 1
+    assert "# TYPE test_events_total counter" in rendered
+    assert 'test_events_total{kind="a"} 3' in rendered
+    assert 'test_events_total{kind="b\\"c"} 1' in rendered
+    assert "test_in_flight 0" in rendered
+
+
+def test_histogram_buckets_are_cumulative():
+    # Arrange
+    registry = MetricsRegistry()
+    histogram = Histogram("test_duration_seconds", "Duration.", ["stage"], buckets=(0.1, 1), registry=registry)
+
+    # Act
+    for value in (0.05, 0.1, 0.5, 3):
+        histogram.labels("get_logs").observe(value)
+    rendered = registry.render()
+
+    # Assert
+    assert 'test_duration_seconds_bucket{stage="get_logs",le="0.1"} 2' in rendered
+    assert 'test_duration_seconds_bucket{stage="get_logs",le="1"} 3' in rendered
+    assert 'test_duration_seconds_bucket{stage="get_logs",le="+Inf"} 4' in rendered
+    assert 'test_duration_seconds_count{stage="get_logs"} 4' in rendered
+    assert 'test_duration_seconds_sum{stage="get_logs"} 3.65' in rendered
+
+
+def test_duplicate_registration_and_wrong_labels_raise():
+    # Arrange
+    registry = MetricsRegistry()
+    counter = Counter("test_total", "Test.", ["kind"], registry=registry)
+
+    # Act / Assert
+    for action in (lambda: Counter("test_total", "Again.", registry=registry), lambda: counter.labels("a", "b")):
+        try:
+            action()
+            assert False, "expected ValueError"
+        except ValueError:
+            pass
+
+
+def test_instrumented_lru_cache_counts_evictions():
+    # Arrange
+    registry = MetricsRegistry()
+    evictions = Counter("test_evictions_total", "Evictions.", registry=registry).labels()
+    cache = InstrumentedLRUCache(maxsize=2, evictions=evictions)
+
+    # Act
+    for key in ("a", "b", "c", "d"):
+        cache[key] = key
+
+    # Assert
+    assert evictions.value == 2
+    assert list(cache) == ["c", "d"]
+
+
+def test_middleware_labels_requests_by_route_template():
+    # Arrange
+    app = FastAPI()
+    app.add_middleware(MetricsMiddleware)
+
+    @app.get("/items/{item_id}")
+    async def get_item(item_id: int):
+        return {"item_id": item_id}
+
+    client = TestClient(app)
+
+    # Act
+    client.get("/items/1")
+    client.get("/items/2")
+    client.get("/missing")
+
+    # Assert
+    assert HTTP_REQUEST_DURATION.labels("GET", "/items/{item_id}", "200").count == 2
+    assert HTTP_REQUEST_DURATION.labels("GET", "unmatched", "404").count == 1
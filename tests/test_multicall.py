@@ -0,0 +1,62 @@
+from eth_abi import decode, encode
+
+from app.dal.approvals.multicall import (ALLOWANCE_SELECTOR, SYMBOL_SELECTOR, TRY_AGGREGATE_SELECTOR, decode_allowance,
+                                         decode_symbol, decode_try_aggregate, encode_allowance_call,
+                                         encode_try_aggregate)
+
+TOKEN = "0x" + "11" * 20
+
+
+def test_encode_try_aggregate_round_trips():
+    # Act
+    call_data = encode_try_aggregate([(TOKEN, SYMBOL_SELECTOR)])
+
+    # Assert
+    assert call_data[:4] == TRY_AGGREGATE_SELECTOR
+    require_success, calls = decode(['bool', '(address,bytes)[]'], call_data[4:])
+    assert require_success is False
+    assert calls == ((TOKEN, SYMBOL_SELECTOR),)
+
+
+def test_decode_try_aggregate():
+    # Arrange
+    return_data = encode(['(bool,bytes)[]'], [[(True, b'abc'), (False, b'')]])
+
+    # Act
+    results = decode_try_aggregate(return_data)
+
+    # Assert
+    assert results == [(True, b'abc'), (False, b'')]
+
+
+def test_decode_symbol_string():
+    assert decode_symbol(True, encode(['string'], ["USDT"])) == "USDT"
+
+
+def test_decode_symbol_bytes32():
+    assert decode_symbol(True, b"MKR".ljust(32, b'\x00')) == "MKR"
+
+
+def test_decode_symbol_revert_empty_and_garbage():
+    assert decode_symbol(False, encode(['string'], ["USDT"])) is None
+    assert decode_symbol(True, b'') is None
+    assert decode_symbol(True, b'\x00' * 32) is None
+    assert decode_symbol(True, b'\xff' * 40) is None
+
+
+def test_encode_allowance_call():
+    # Arrange
+    owner, spender = "0x" + "22" * 20, "0x" + "33" * 20
+
+    # Act
+    call_data = encode_allowance_call(owner, spender)
+
+    # Assert
+    assert call_data[:4] == ALLOWANCE_SELECTOR
+    assert decode(['address', 'address'], call_data[4:]) == (owner, spender)
+
+
+def test_decode_allowance():
+    assert decode_allowance(True, encode(['uint256'], [1234])) == 1234
+    assert decode_allowance(False, encode(['uint256'], [1234])) is None
+    assert decode_allowance(True, b'') is None
@@ -0,0 +1,128 @@
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from eth_abi import encode
+from hexbytes import HexBytes
+
+from app.cli.backfill_approvals import backfill, get_block_ranges
+from app.dal.approvals.approvals_backfill_store import ApprovalsBackfillStore
+from app.dal.approvals.offline_approvals_dal import OfflineApprovalsDAL
+from app.dal.approvals.offline_approvals_index import OfflineApprovalsIndex
+
+OWNER_A = b'\x11' * 20
+OWNER_B = b'\x22' * 20
+TOKEN = "0x" + "33" * 20
+SPENDER = b'\xab' * 20
+
+
+def make_raw_log(block_number, amount, owner=OWNER_A, spender=SPENDER, token=TOKEN, log_index=0):
+    return {
+        'blockNumber': block_number,
+        'logIndex': log_index,
+        'transactionHash': HexBytes(block_number.to_bytes(32, 'big')),
+        'address': token,
+        'topics': [HexBytes(b'\x00' * 32), HexBytes(b'\x00' * 12 + owner), HexBytes(b'\x00' * 12 + spender)],
+        'data': HexBytes(encode(['uint256'], [amount])),
+    }
+
+
+def get_w3(logs):
+    async def get_logs(filter_params):
+        return [log for log in logs if filter_params["fromBlock"] <= log['blockNumber'] <= filter_params["toBlock"]]
+    w3 = MagicMock()
+    w3.eth.get_logs = AsyncMock(side_effect=get_logs)
+    return w3
+
+
+def test_get_block_ranges():
+    # Assert
+    assert get_block_ranges(0, 25, 10) == [(0, 9), (10, 19), (20, 25)]
+
+
+@pytest.mark.asyncio
+async def test_backfill_reduces_to_latest_and_resumes(tmp_path):
+    # Arrange
+    logs = [make_raw_log(5, 100), make_raw_log(15, 0, log_index=1), make_raw_log(25, 7, owner=OWNER_B)]
+    store = ApprovalsBackfillStore(str(tmp_path / "backfill.sqlite3"))
+    w3 = get_w3(logs)
+    await backfill(w3, store, 0, 19, range_size=10, workers=2, shard_size=10)
+
+    # Act
+    w3.eth.get_logs.reset_mock()
+    ingested = await backfill(w3, store, 0, 29, range_size=10, workers=2, shard_size=10)
+    rows = list(store.iter_rows(0, 29))
+
+    # Assert
+    assert ingested == 1
+    assert w3.eth.get_logs.await_count == 1
+    assert store.contiguous_to_block(0) == 29
+    assert [(row[0], row[3], int.from_bytes(row[6], 'big')) for row in rows] == [(OWNER_A, 15, 0), (OWNER_B, 25, 7)]
+
+
+def test_contiguous_to_block_stops_at_gap(tmp_path):
+    # Arrange
+    store = ApprovalsBackfillStore(str(tmp_path / "backfill.sqlite3"))
+    for from_block, to_block in ((0, 9), (10, 19), (30, 39)):
+        store.save_range(from_block, to_block, [])
+
+    # Assert
+    assert store.contiguous_to_block(0) == 19
+    assert store.contiguous_to_block(20) is None
+
+
+@pytest.mark.asyncio
+async def test_index_leaves_out_rows_outside_contiguous_range(tmp_path):
+    # Arrange
+    store = ApprovalsBackfillStore(str(tmp_path / "backfill.sqlite3"))
+    logs = [make_raw_log(3, 4), make_raw_log(15, 100), make_raw_log(35, 0), make_raw_log(36, 7, owner=OWNER_B)]
+    w3 = get_w3(logs)
+    await backfill(w3, store, 0, 9, range_size=10, workers=1, shard_size=10)
+    await backfill(w3, store, 10, 19, range_size=10, workers=1, shard_size=10)
+    await backfill(w3, store, 30, 39, range_size=10, workers=1, shard_size=10)
+    indexed_to = store.contiguous_to_block(10)
+    path = str(tmp_path / "approvals_index.bin")
+
+    # Act
+    count = OfflineApprovalsIndex.build(path, store.iter_rows(10, indexed_to), 10, indexed_to)
+    index = OfflineApprovalsIndex(path)
+
+    # Assert
+    assert indexed_to == 19
+    assert (count, index.owner_count, index.row_count) == (1, 1, 1)
+    assert [(row[0], row[3], int.from_bytes(row[6], 'big')) for row in store.iter_rows(10, indexed_to)] == [
+        (OWNER_A, 15, 100)
+    ]
+
+
+@pytest.mark.asyncio
+async def test_index_round_trip_and_offline_dal(tmp_path, monkeypatch):
+    # Arrange
+    store = ApprovalsBackfillStore(str(tmp_path / "backfill.sqlite3"))
+    await backfill(get_w3([make_raw_log(5, 2 ** 256 - 1, log_index=3), make_raw_log(7, 9, spender=b'\xcd' * 20),
+                           make_raw_log(8, 1, owner=OWNER_B)]), store, 0, 9, range_size=10, workers=1, shard_size=10)
+    path = str(tmp_path / "approvals_index.bin")
+    OfflineApprovalsIndex.build(path, store.iter_rows(0, 9), 0, 9)
+    monkeypatch.setattr("app.dal.approvals.offline_approvals_dal.config", MagicMock(token_registry_path=None))
+
+    # Act
+    index = OfflineApprovalsIndex(path)
+    dal = OfflineApprovalsDAL(index_path=path)
+    logs = await dal.fetch_approval_logs("0x" + OWNER_A.hex())
+    missing = await dal.fetch_approval_logs("0x" + "44" * 20)
+    with pytest.raises(RuntimeError):
+        await dal.fetch_approval_logs_range(["0x" + OWNER_A.hex()], 0, 9)
+
+    # Assert
+    assert (index.owner_count, index.row_count, index.to_block) == (2, 3, 9)
+    assert len(list(index)) == 3
+    assert [(log.block_number, log.log_index, log.amount, log.spender) for log in logs] == [
+        (5, 3, 2 ** 256 - 1, "0x" + "ab" * 20), (7, 0, 9, "0x" + "cd" * 20)
+    ]
+    assert logs[0].token_address.lower() == TOKEN
+    assert logs[0].transaction_hash == (5).to_bytes(32, 'big').hex()
+    assert missing == []
+    assert await dal.get_block_number() == 9
+    assert await dal.get_token_symbol(TOKEN) == "UnknownERC20"
+
+
+def teardown_function():
+    OfflineApprovalsDAL._instance = None
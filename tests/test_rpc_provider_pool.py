@@ -0,0 +1,159 @@
+import asyncio
+
+import pytest
+
+from app.dal.approvals.rpc_provider_pool import CLOSED, HALF_OPEN, OPEN, RpcEndpoint, RpcProviderPool
+
+
+class FakeProvider:
+    def __init__(self, name, delay=0.0, error=None, rpc_error=None):
+        self.name = name
+        self.delay = delay
+        self.error = error
+        self.rpc_error = rpc_error
+        self.calls = 0
+
+    async def make_request(self, method, params):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.error is not None:
+            raise self.error
+        if self.rpc_error is not None:
+            return {"jsonrpc": "2.0", "id": 1, "error": self.rpc_error}
+        return {"jsonrpc": "2.0", "id": 1, "result": self.name}
+
+
+def get_pool(*providers, **kwargs):
+    by_url = {f"http://{provider.name}": provider for provider in providers}
+    return RpcProviderPool(list(by_url), provider_factory=by_url.__getitem__, **kwargs)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.mark.asyncio
+async def test_routes_to_the_fastest_endpoint():
+    # Arrange
+    slow, fast = FakeProvider("slow"), FakeProvider("fast")
+    pool = get_pool(slow, fast)
+    pool.endpoints[0].record_success(0.5)
+    pool.endpoints[1].record_success(0.05)
+
+    # Act
+    response = await pool.make_request("eth_chainId", [])
+
+    # Assert
+    assert response["result"] == "fast"
+    assert slow.calls == 0
+
+
+@pytest.mark.asyncio
+async def test_fails_over_to_the_next_endpoint():
+    # Arrange
+    broken, healthy = FakeProvider("broken", error=ConnectionError("down")), FakeProvider("healthy")
+    pool = get_pool(broken, healthy)
+    pool.endpoints[0].record_success(0.01)
+    pool.endpoints[1].record_success(0.02)
+
+    # Act
+    response = await pool.make_request("eth_sendRawTransaction", [])
+
+    # Assert
+    assert response["result"] == "healthy"
+    assert broken.calls == 1
+    assert pool.endpoints[0].error_rate > 0
+
+
+@pytest.mark.asyncio
+async def test_slow_read_is_hedged_to_a_second_endpoint():
+    # Arrange
+    stalled, backup = FakeProvider("stalled", delay=1.0), FakeProvider("backup")
+    pool = get_pool(stalled, backup, hedge_min_delay=0.01)
+    pool.endpoints[0].record_success(0.01)
+    pool.endpoints[1].record_success(0.02)
+
+    # Act
+    response = await asyncio.wait_for(pool.make_request("eth_getLogs", [{}]), timeout=0.5)
+
+    # Assert
+    assert response["result"] == "backup"
+    assert stalled.calls == backup.calls == 1
+
+
+@pytest.mark.asyncio
+async def test_all_endpoints_failing_raises_the_last_error():
+    # Arrange
+    pool = get_pool(FakeProvider("a", error=ConnectionError("a down")), FakeProvider("b", error=ConnectionError("b down")))
+
+    # Act / Assert
+    with pytest.raises(ConnectionError):
+        await pool.make_request("eth_blockNumber", [])
+
+
+@pytest.mark.asyncio
+async def test_error_payloads_fail_over_unless_the_request_is_at_fault():
+    # Arrange
+    throttled = FakeProvider("throttled", rpc_error={"code": -32005, "message": "daily request count limit exceeded"})
+    reverting = FakeProvider("reverting", rpc_error={"code": 3, "message": "execution reverted"})
+    healthy = FakeProvider("healthy")
+    pool = get_pool(throttled, reverting, healthy)
+    pool.endpoints[0].record_success(0.01)
+    pool.endpoints[1].record_success(0.02)
+    pool.endpoints[2].record_success(0.03)
+
+    # Act
+    first = await pool.make_request("eth_sendRawTransaction", [])
+    await pool.make_request("eth_sendRawTransaction", [])
+    only_throttled = await get_pool(FakeProvider("a", rpc_error={"code": -32000, "message": "header not found"})
+                                    ).make_request("eth_blockNumber", [])
+
+    # Assert
+    assert first["error"]["message"] == "execution reverted"
+    assert throttled.calls == 1 and reverting.calls == 2 and healthy.calls == 0
+    assert pool.endpoints[0].error_rate > 0 and pool.endpoints[1].error_rate == 0
+    assert only_throttled["error"]["code"] == -32000
+
+
+def test_circuit_opens_after_consecutive_failures_and_half_opens_after_cooldown():
+    # Arrange
+    clock = FakeClock()
+    endpoint = RpcEndpoint("http://a", "a", FakeProvider("a"), ewma_alpha=0.2, failure_threshold=3, cooldown=10,
+                           clock=clock)
+
+    # Act
+    for _ in range(3):
+        endpoint.record_failure()
+    open_state, open_available = endpoint.state, endpoint.is_available()
+    clock.now = 10
+    trial_available = endpoint.is_available()
+    endpoint.started()
+    second_trial_available = endpoint.is_available()
+    endpoint.record_success(0.01)
+
+    # Assert
+    assert (open_state, open_available) == (OPEN, False)
+    assert trial_available and not second_trial_available
+    assert endpoint.state == CLOSED
+
+
+def test_failed_trial_reopens_the_circuit():
+    # Arrange
+    clock = FakeClock()
+    endpoint = RpcEndpoint("http://a", "a", FakeProvider("a"), ewma_alpha=0.2, failure_threshold=1, cooldown=10,
+                           clock=clock)
+    endpoint.record_failure()
+    clock.now = 10
+    assert endpoint.is_available() and endpoint.state == HALF_OPEN
+
+    # Act
+    endpoint.started()
+    endpoint.record_failure()
+
+    # Assert
+    assert endpoint.state == OPEN
+    assert not endpoint.is_available()
@@ -0,0 +1,95 @@
+import csv
+import io
+
+import orjson
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+from app.cli.scan_approvals import CsvWriter, NdjsonWriter, Progress, read_addresses, read_done_addresses, scan
+from app.models.approvals.approvals import Approval
+from app.models.approvals.approvals_response import ApprovalsResponse
+
+
+def get_service(failing=()):
+    async def get_latest_approvals(request):
+        return ApprovalsResponse.model_construct(
+            approvalsByAddress={address: [] if address in failing else
+                                [Approval(amount="1", spender_address="0xspender", token_symbol=address[-1])]
+                                for address in request.addresses},
+            errorsByAddress={address: "upstream down" for address in request.addresses if address in failing}
+        )
+    service = MagicMock()
+    service.get_latest_approvals = AsyncMock(side_effect=get_latest_approvals)
+    return service
+
+
+class Buffer(io.BytesIO):
+    def close(self):
+        # Keep the contents readable after the writer is closed
+        pass
+
+
+def test_read_addresses_skips_blanks_comments_and_duplicates():
+    # Arrange
+    lines = ["0xA\n", "\n", "# header\n", "0xb  # hot wallet\n", "0xa\n"]
+
+    # Act
+    addresses = list(read_addresses(lines))
+
+    # Assert
+    assert addresses == ["0xA", "0xb"]
+
+
+@pytest.mark.asyncio
+async def test_scan_writes_ndjson_and_records_only_successful_addresses():
+    # Arrange
+    service = get_service(failing={"0x3"})
+    output = Buffer()
+    done_file = io.StringIO()
+    progress = Progress(5, interval=3600, stream=io.StringIO())
+
+    # Act
+    await scan(service, ["0x1", "0x2", "0x3", "0x4", "0x5"], NdjsonWriter(output, include_prices=False), done_file,
+               progress, include_prices=False, batch_size=2, concurrency=2)
+    events = [orjson.loads(line) for line in output.getvalue().splitlines()]
+
+    # Assert
+    assert service.get_latest_approvals.await_count == 3
+    assert all(call.args[0].priority == "batch" for call in service.get_latest_approvals.await_args_list)
+    assert sorted(event["address"] for event in events) == ["0x1", "0x2", "0x3", "0x4", "0x5"]
+    assert next(event for event in events if event["address"] == "0x3")["error"] == "upstream down"
+    assert events[0]["approvals"][0].keys() == {"amount", "spender_address", "token_symbol"}
+    assert sorted(done_file.getvalue().split()) == ["0x1", "0x2", "0x4", "0x5"]
+    assert (progress.done, progress.approvals, progress.errors) == (5, 4, 1)
+
+
+@pytest.mark.asyncio
+async def test_scan_writes_one_csv_row_per_approval():
+    # Arrange
+    service = get_service(failing={"0x2"})
+    output = Buffer()
+    writer = CsvWriter(output, include_prices=True, write_header=True)
+
+    # Act
+    await scan(service, ["0x1", "0x2"], writer, None, Progress(2, interval=3600, stream=io.StringIO()),
+               include_prices=True, batch_size=10, concurrency=1)
+    rows = list(csv.DictReader(io.StringIO(output.getvalue().decode())))
+
+    # Assert
+    assert [(row["address"], row["token_symbol"], row["error"]) for row in rows] == [
+        ("0x1", "1", ""), ("0x2", "", "upstream down")
+    ]
+    assert "price_usd" in rows[0]
+
+
+def test_read_done_addresses_is_case_insensitive(tmp_path):
+    # Arrange
+    path = tmp_path / "scan.ndjson.done"
+    path.write_text("0xAbC\n\n0xdef\n")
+
+    # Act
+    done = read_done_addresses(str(path))
+
+    # Assert
+    assert done == {"0xabc", "0xdef"}
+    assert read_done_addresses(str(tmp_path / "missing")) == set()
@@ -0,0 +1,102 @@
+import asyncio
+
+import pytest
+
+from app.utils.single_flight import SingleFlight
+
+
+@pytest.mark.asyncio
+async def test_do_coalesces_concurrent_calls():
+    # Arrange
+    flights = SingleFlight()
+    calls = []
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "USDT"
+
+    # Act
+    results = await asyncio.gather(*(flights.do("0xdac17f", fetch) for _ in range(5)))
+
+    # Assert
+    assert results == ["USDT"] * 5
+    assert len(calls) == 1
+    assert "0xdac17f" not in flights
+
+
+@pytest.mark.asyncio
+async def test_do_shares_errors():
+    # Arrange
+    flights = SingleFlight()
+    async def fetch():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("upstream down")
+
+    # Act
+    results = await asyncio.gather(*(flights.do("key", fetch) for _ in range(2)), return_exceptions=True)
+
+    # Assert
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+
+@pytest.mark.asyncio
+async def test_do_many_only_fetches_keys_not_in_flight():
+    # Arrange
+    flights = SingleFlight()
+    batches = []
+    async def fetch(keys):
+        batches.append(keys)
+        await asyncio.sleep(0.01)
+        return {key: key.upper() for key in keys}
+
+    # Act
+    first, second = await asyncio.gather(flights.do_many(["a", "b"], fetch), flights.do_many(["b", "c"], fetch))
+
+    # Assert
+    assert first == {"a": "A", "b": "B"}
+    assert second == {"b": "B", "c": "C"}
+    assert batches == [["a", "b"], ["c"]]
+
+
+@pytest.mark.asyncio
+async def test_cancelling_one_waiter_keeps_shared_call_running():
+    # Arrange
+    flights = SingleFlight()
+    started = asyncio.Event()
+    async def fetch():
+        started.set()
+        await asyncio.sleep(0.02)
+        return 42
+    impatient = asyncio.ensure_future(flights.do("key", fetch))
+    patient = asyncio.ensure_future(flights.do("key", fetch))
+    await started.wait()
+
+    # Act
+    impatient.cancel()
+    result = await patient
+
+    # Assert
+    assert result == 42
+    assert impatient.cancelled()
+
+
+@pytest.mark.asyncio
+async def test_cancelling_last_waiter_cancels_shared_call():
+    # Arrange
+    flights = SingleFlight()
+    cancelled = asyncio.Event()
+    async def fetch():
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+    waiter = asyncio.ensure_future(flights.do("key", fetch))
+    await asyncio.sleep(0)
+
+    # Act
+    waiter.cancel()
+    await asyncio.wait_for(cancelled.wait(), 1)
+
+    # Assert
+    assert "key" not in flights
@@ -0,0 +1,78 @@
+import json
+import os
+
+from app.cli.build_token_registry import read_token_list
+from app.dal.token_metadata.token_registry import TokenMetadata, TokenRegistry
+
+USDT = "0xdAC17F958D2ee523a2206206994597C13D831ec7"
+USDC = "0xA0b86991c6218b36c1d19D4a2e9Eb0cE3606eB48"
+MKR = "0x9f8F72aA9304c8B593d555F12eF6589cC3A579A2"
+
+
+def test_build_and_lookup(tmp_path):
+    # Arrange
+    path = str(tmp_path / "tokens.bin")
+    TokenRegistry.build(path, [(USDT, "USDT", 6), (USDC, "USDC", 6), (MKR, "MKR", 18)])
+
+    # Act
+    registry = TokenRegistry(path)
+
+    # Assert
+    assert len(registry) == 3
+    assert registry.get(USDT.lower()) == TokenMetadata("USDT", 6)
+    assert registry.get_symbol(MKR) == "MKR"
+    assert registry.get("0x" + "00" * 20) is None
+
+
+def test_appended_symbols_survive_reopen(tmp_path):
+    # Arrange
+    path = str(tmp_path / "tokens.bin")
+    registry = TokenRegistry(path)
+    registry.append(USDT, "USDT")
+
+    # Act
+    reopened = TokenRegistry(path)
+
+    # Assert
+    assert registry.get_symbol(USDT) == "USDT"
+    assert reopened.get(USDT) == TokenMetadata("USDT", None)
+    assert len(reopened) == 1
+
+
+def test_concurrent_file_creation_keeps_a_single_header(tmp_path, monkeypatch):
+    # Arrange
+    path = str(tmp_path / "tokens.bin")
+    registry, other_worker = TokenRegistry(path), TokenRegistry(path)
+    link = os.link
+
+    def link_after_other_worker(source, destination):
+        # The other worker creates the file and appends between this worker's header write and its link
+        monkeypatch.setattr(os, "link", link)
+        other_worker.append(USDC, "USDC", 6)
+        link(source, destination)
+    monkeypatch.setattr(os, "link", link_after_other_worker)
+
+    # Act
+    registry.append(USDT, "USDT", 6)
+    reopened = TokenRegistry(path)
+
+    # Assert
+    assert reopened.get(USDT) == TokenMetadata("USDT", 6)
+    assert reopened.get(USDC) == TokenMetadata("USDC", 6)
+    assert len(reopened) == 2
+    assert os.listdir(tmp_path) == ["tokens.bin"]
+
+
+def test_read_token_list_filters_chain(tmp_path):
+    # Arrange
+    path = tmp_path / "list.json"
+    path.write_text(json.dumps({"tokens": [
+        {"chainId": 1, "address": USDT, "symbol": "USDT", "decimals": 6},
+        {"chainId": 10, "address": USDC, "symbol": "USDC", "decimals": 6},
+    ]}))
+
+    # Act
+    tokens = list(read_token_list(str(path), chain_id=1))
+
+    # Assert
+    assert tokens == [(USDT, "USDT", 6)]
@@ -0,0 +1,100 @@
+from app.utils.ttl_cache import FRESH, MISS, STALE, StaleWhileRevalidateCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def get_cache(clock, maxsize=10):
+    return StaleWhileRevalidateCache(maxsize=maxsize, ttl=10, negative_ttl=100, stale_grace=5, clock=clock)
+
+
+def test_lookup_fresh_stale_and_expired():
+    # Arrange
+    clock = FakeClock()
+    cache = get_cache(clock)
+    cache.set("usdt", 1.0)
+
+    # Act
+    clock.now = 3
+    fresh = cache.lookup("usdt")
+    clock.now = 12
+    stale = cache.lookup("usdt")
+    clock.now = 15
+    expired = cache.lookup("usdt")
+
+    # Assert
+    assert fresh == (FRESH, 1.0, 3)
+    assert stale == (STALE, 1.0, 12)
+    assert expired == (MISS, None, None)
+
+
+def test_negative_results_use_negative_ttl():
+    # Arrange
+    clock = FakeClock()
+    cache = get_cache(clock)
+    cache.set("unpriced", None)
+
+    # Act
+    clock.now = 50
+    state, value, _ = cache.lookup("unpriced")
+
+    # Assert
+    assert (state, value) == (FRESH, None)
+
+
+def test_evicts_least_recently_used():
+    # Arrange
+    clock = FakeClock()
+    cache = get_cache(clock, maxsize=2)
+    cache.set("a", 1.0)
+    cache.set("b", 2.0)
+    cache.lookup("a")
+
+    # Act
+    cache.set("c", 3.0)
+
+    # Assert
+    assert "a" in cache and "c" in cache
+    assert "b" not in cache
+
+
+def test_hot_keys_orders_by_hits_and_decays():
+    # Arrange
+    clock = FakeClock()
+    cache = get_cache(clock)
+    cache.set("a", 1.0)
+    cache.set("b", 2.0)
+    cache.set("c", None)
+    for _ in range(3):
+        cache.lookup("b")
+    cache.lookup("a")
+    cache.lookup("c")
+
+    # Act
+    clock.now = 8
+    hot = cache.hot_keys(limit=5, expiring_within=5)
+    hot_after_decay = cache.hot_keys(limit=5, expiring_within=5)
+
+    # Assert
+    assert hot == ["b", "a"]
+    assert hot_after_decay == ["b"]
+
+
+def test_on_evict_is_called_for_lru_evictions():
+    # Arrange
+    evictions = []
+    cache = StaleWhileRevalidateCache(maxsize=2, ttl=10, negative_ttl=100, stale_grace=5, clock=FakeClock(),
+                                      on_evict=lambda: evictions.append(1))
+
+    # Act
+    for key in ("a", "b", "c"):
+        cache.set(key, 1.0)
+    cache.set("c", 2.0)
+
+    # Assert
+    assert len(evictions) == 1